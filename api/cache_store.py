@@ -0,0 +1,348 @@
+"""
+cache_store.py — pluggable key/value persistence for the service caches.
+
+Values are JSON documents grouped by namespace (``repos``, ``user_locations``,
+...). Two backends implement the same ``CacheStore`` interface:
+  - SQLiteCacheStore   indexed per-key reads, per-row upserts, WAL mode so
+                       several gunicorn workers can share one database
+  - JSONCacheStore     one whole-file JSON document per namespace (legacy)
+
+``StoreMapping`` exposes one namespace as a dict-style object, so callers
+keep using ``cache[key]`` / ``key in cache`` while reads hit single rows.
+"""
+
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+
+logger = logging.getLogger(__name__)
+
+# Sentinel for missing keys (None is a valid stored value)
+MISSING = object()
+
+# SQLite caps bound parameters per statement; stay well below it
+_SQL_CHUNK = 500
+
+
+# ---------------------------------------------------------------------------
+# Disk-backed JSON helpers
+# ---------------------------------------------------------------------------
+
+def load_json(filename: str) -> dict:
+    """Load a JSON file from disk, returning an empty dict on any failure."""
+    if os.path.exists(filename):
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            logger.warning("Could not load %s — starting fresh.", filename)
+    return {}
+
+
+def save_json(filename: str, data: dict) -> None:
+    """Persist *data* as JSON to *filename*, silently failing in read-only envs."""
+    try:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except Exception:
+        logger.warning("Could not save %s (read-only filesystem?).", filename)
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class CacheStore(abc.ABC):
+    """Interface shared by the cache backends. All methods are thread-safe."""
+
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str, default=None):
+        """Return the value stored under *key*, or *default*."""
+
+    @abc.abstractmethod
+    def get_many(self, namespace: str, keys) -> dict:
+        """Return ``{key: value}`` for the *keys* that are present."""
+
+    @abc.abstractmethod
+    def set(self, namespace: str, key: str, value) -> None:
+        """Store *value* under *key*."""
+
+    @abc.abstractmethod
+    def set_many(self, namespace: str, items: dict) -> None:
+        """Store every ``key: value`` of *items*."""
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove *key*; a no-op when it is absent."""
+
+    @abc.abstractmethod
+    def keys(self, namespace: str) -> list[str]:
+        """Every key stored in *namespace*."""
+
+    @abc.abstractmethod
+    def count(self, namespace: str) -> int:
+        """Number of keys stored in *namespace*."""
+
+    def flush(self) -> None:
+        """Persist buffered writes; a no-op for backends that write through."""
+
+
+class SQLiteCacheStore(CacheStore):
+    """
+    SQLite backend: one ``entries`` row per (namespace, key).
+
+    Each thread gets its own connection; WAL journaling lets readers in any
+    worker proceed while another worker writes.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def get_many(self, namespace, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[i:i + _SQL_CHUNK]
+            rows = self._conn().execute(
+                "SELECT key, value FROM entries WHERE namespace = ? AND key IN (%s)"
+                % ",".join("?" * len(chunk)),
+                (namespace, *chunk),
+            )
+            for key, value in rows:
+                found[key] = json.loads(value)
+        return found
+
+    # Writes are best effort, like save_json: a locked, full or read-only
+    # database costs the cache entry, never the request being served.
+
+    def set(self, namespace, key, value):
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time()),
+            )
+        except sqlite3.Error as exc:
+            logger.warning("Could not save %s/%s to %s (%s).", namespace, key, self.path, exc)
+
+    def set_many(self, namespace, items):
+        try:
+            self._upsert(namespace, items)
+        except sqlite3.Error as exc:
+            logger.warning("Could not save %s %s entries to %s (%s).", len(items), namespace, self.path, exc)
+
+    def _upsert(self, namespace, items):
+        """Store *items* in one transaction, raising ``sqlite3.Error`` on failure."""
+        if not items:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                [(namespace, key, json.dumps(value), now) for key, value in items.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            # SQLite may already have rolled back (e.g. on a full disk)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, namespace, key):
+        try:
+            self._conn().execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+        except sqlite3.Error as exc:
+            logger.warning("Could not delete %s/%s from %s (%s).", namespace, key, self.path, exc)
+
+    def keys(self, namespace):
+        rows = self._conn().execute("SELECT key FROM entries WHERE namespace = ?", (namespace,))
+        return [key for (key,) in rows]
+
+    def count(self, namespace):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+    def migrate_json(self, namespace: str, filename: str, transform=None) -> int:
+        """
+        One-time import of a legacy JSON cache file into *namespace*.
+
+        *transform* may reshape the loaded document into ``{key: value}``.
+        The file is left in place; a marker row prevents re-importing it.
+        Returns the number of imported entries.
+        """
+        name = f"{namespace}:{os.path.abspath(filename)}"
+        conn = self._conn()
+        if not os.path.exists(filename):
+            return 0
+        if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+            return 0
+        items = load_json(filename)
+        if transform is not None:
+            items = transform(items)
+        # Raises, so open_cache_store falls back to JSON rather than marking a failed import done
+        self._upsert(namespace, items)
+        conn.execute("INSERT OR IGNORE INTO migrations (name) VALUES (?)", (name,))
+        if items:
+            logger.info("Migrated %s entries from %s into %s.", len(items), filename, namespace)
+        return len(items)
+
+
+class JSONCacheStore(CacheStore):
+    """
+    Legacy backend: each namespace is one JSON file, loaded on first use and
+    rewritten whole on ``flush``.
+    """
+
+    def __init__(self, files: dict[str, str]):
+        self.files = files
+        self._data: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.RLock()
+
+    def _namespace(self, namespace):
+        if namespace not in self._data:
+            self._data[namespace] = load_json(self.files[namespace])
+        return self._data[namespace]
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            return self._namespace(namespace).get(key, default)
+
+    def get_many(self, namespace, keys):
+        with self._lock:
+            data = self._namespace(namespace)
+            return {key: data[key] for key in keys if key in data}
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._namespace(namespace)[key] = value
+            self._dirty.add(namespace)
+
+    def set_many(self, namespace, items):
+        with self._lock:
+            self._namespace(namespace).update(items)
+            self._dirty.add(namespace)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._namespace(namespace).pop(key, None)
+            self._dirty.add(namespace)
+
+    def keys(self, namespace):
+        with self._lock:
+            return list(self._namespace(namespace))
+
+    def count(self, namespace):
+        with self._lock:
+            return len(self._namespace(namespace))
+
+    def flush(self):
+        with self._lock:
+            for namespace in sorted(self._dirty):
+                save_json(self.files[namespace], self._data[namespace])
+            self._dirty.clear()
+
+
+class StoreMapping(MutableMapping):
+    """Dict-style view of one namespace of a ``CacheStore``."""
+
+    def __init__(self, store: CacheStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def __getitem__(self, key):
+        value = self.store.get(self.namespace, key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return self.store.get(self.namespace, key, default)
+
+    def get_many(self, keys) -> dict:
+        return self.store.get_many(self.namespace, keys)
+
+    def __contains__(self, key):
+        return self.store.get(self.namespace, key, MISSING) is not MISSING
+
+    def __setitem__(self, key, value):
+        self.store.set(self.namespace, key, value)
+
+    def update_many(self, items: dict) -> None:
+        self.store.set_many(self.namespace, items)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.store.delete(self.namespace, key)
+
+    def __iter__(self):
+        return iter(self.store.keys(self.namespace))
+
+    def __len__(self):
+        return self.store.count(self.namespace)
+
+    def __repr__(self):
+        return f"StoreMapping({self.namespace!r})"
+
+
+def open_cache_store(
+    backend: str,
+    db_path: str,
+    json_files: dict[str, str],
+    transforms: dict | None = None,
+) -> CacheStore:
+    """
+    Open the configured backend, importing legacy JSON files into SQLite.
+
+    *json_files* maps each namespace to its JSON file; *transforms* optionally
+    maps a namespace to a function reshaping its legacy document on import.
+    Falls back to the JSON backend if the database cannot be opened
+    (e.g. a read-only filesystem).
+    """
+    if backend == "sqlite":
+        try:
+            store = SQLiteCacheStore(db_path)
+            for namespace, filename in json_files.items():
+                store.migrate_json(namespace, filename, (transforms or {}).get(namespace))
+            return store
+        except sqlite3.Error as exc:
+            logger.warning("Could not open cache database %s (%s) — using JSON files.", db_path, exc)
+    return JSONCacheStore(json_files)
@@ -0,0 +1,185 @@
+"""
+country_index.py — offline-built country / subdivision search index.
+
+Replaces ``pycountry.countries.search_fuzzy`` on the request path. The index
+is built from pycountry ahead of time and shipped as
+``static/country_index.json``, so loading it needs no pycountry import:
+
+    python api/country_index.py        # rebuild after upgrading pycountry
+
+Scoring mirrors pycountry's search_fuzzy, so results are unchanged:
+  1. Exact match on a country code or name       +50
+  2. Exact match on any subdivision field        +49 per subdivision
+  3. Substring of a country name                 +5..30 (earlier is better)
+  4. Substring of a subdivision name             +1..5 per subdivision
+Ties go to the alphabetically first alpha-2 code.
+"""
+
+import json
+import logging
+import os
+import unicodedata
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = os.path.join(os.path.dirname(__file__), "static", "country_index.json")
+
+# Bumped when the on-disk layout changes
+INDEX_FORMAT = 1
+
+# Joins indexed strings into one searchable text; never part of a query
+_SEP = "\x00"
+
+
+def remove_accents(text: str) -> str:
+    """Strip combining marks the same way pycountry normalizes queries."""
+    if text.isascii():
+        return text
+    nfkd_form = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in nfkd_form if not unicodedata.combining(c))
+
+
+class _Haystack:
+    """Many short strings joined into one text, searched with ``str.find``."""
+
+    def __init__(self, strings):
+        self.text = _SEP.join(strings)
+        self.starts = []
+        pos = 0
+        for s in strings:
+            self.starts.append(pos)
+            pos += len(s) + 1
+
+    def find_all(self, query: str):
+        """Yield ``(string index, offset)`` of the first match in each string."""
+        text, starts = self.text, self.starts
+        i = text.find(query)
+        while i != -1:
+            idx = bisect_right(starts, i) - 1
+            yield idx, i - starts[idx]
+            if idx + 1 >= len(starts):
+                return
+            i = text.find(query, starts[idx + 1])
+
+
+class CountryIndex:
+    """Fuzzy country lookup over a prebuilt index (see module docstring)."""
+
+    def __init__(self, data: dict):
+        self.version = data["version"]
+        self.lookup: dict[str, str] = data["lookup"]
+        self.subdivision_exact: dict[str, dict[str, int]] = data["subdivision_exact"]
+        self.country_names: list[list[str]] = data["country_names"]
+
+        countries = data["countries"]
+        self._country_codes = [row[0] for row in countries]
+        self._country_fields = [
+            _Haystack([row[i] for row in countries]) for i in range(1, len(countries[0]))
+        ]
+
+        subdivisions = data["subdivision_names"]
+        self._subdivision_codes = [row[0] for row in subdivisions]
+        self._subdivision_names = _Haystack([row[1] for row in subdivisions])
+
+    def search(self, query: str) -> str | None:
+        """Return the best-scoring lowercase alpha-2 code for *query*, or None."""
+        query = remove_accents(query.strip().lower())
+        if not query or _SEP in query:
+            return None
+
+        points: dict[str, int] = {}
+
+        # 1. Exact country match
+        code = self.lookup.get(query)
+        if code:
+            points[code] = 50
+
+        # 2. Exact subdivision match
+        for code, count in self.subdivision_exact.get(query, {}).items():
+            points[code] = points.get(code, 0) + 49 * count
+
+        # 3. Partial country match — only the first matching field counts
+        seen: set[int] = set()
+        for haystack in self._country_fields:
+            for idx, pos in haystack.find_all(query):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                code = self._country_codes[idx]
+                points[code] = points.get(code, 0) + max(5, 30 - 2 * pos)
+
+        # 4. Partial subdivision match
+        for idx, pos in self._subdivision_names.find_all(query):
+            code = self._subdivision_codes[idx]
+            points[code] = points.get(code, 0) + max(1, 5 - pos)
+
+        if not points:
+            return None
+        return min(points.items(), key=lambda item: (-item[1], item[0]))[0].lower()
+
+    def name_in(self, text: str) -> str | None:
+        """Return the code of the first country whose name appears in *text*."""
+        for name, code in self.country_names:
+            if name in text:
+                return code.lower()
+        return None
+
+
+def build_country_index() -> dict:
+    """Build the index data from pycountry (build-time only)."""
+    import pycountry
+
+    countries = list(pycountry.countries)
+
+    # Prio 1 follows Database.lookup: indices in load order, first hit wins
+    lookup: dict[str, str] = {}
+    for index in pycountry.countries.indices.values():
+        for value, country in index.items():
+            lookup.setdefault(value, country.alpha_2)
+
+    # Prio 2 counts a subdivision once per field value that matches exactly
+    subdivision_exact: dict[str, dict[str, int]] = {}
+    subdivision_names: list[list[str]] = []
+    for subdivision in pycountry.subdivisions:
+        code = subdivision.country_code
+        for value in subdivision._fields.values():
+            if value is None:
+                continue
+            for part in set(remove_accents(value.lower()).split(";")):
+                counts = subdivision_exact.setdefault(part, {})
+                counts[code] = counts.get(code, 0) + 1
+        subdivision_names.append([code, remove_accents(subdivision._fields["name"].lower())])
+
+    fields = ("name", "official_name", "comment")
+    return {
+        "format": INDEX_FORMAT,
+        "version": f"{INDEX_FORMAT}-{pycountry.__version__}",
+        "lookup": lookup,
+        "subdivision_exact": subdivision_exact,
+        "countries": [
+            [c.alpha_2] + [remove_accents((c._fields.get(f) or "").lower()) for f in fields]
+            for c in countries
+        ],
+        "subdivision_names": subdivision_names,
+        "country_names": [[c.name.lower(), c.alpha_2] for c in countries],
+    }
+
+
+def load_country_index(path: str = INDEX_FILE) -> CountryIndex:
+    """Load the prebuilt index, rebuilding it from pycountry if it is missing."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") == INDEX_FORMAT:
+            return CountryIndex(data)
+    except (OSError, ValueError):
+        pass
+    logger.warning("Country index %s missing or outdated — building from pycountry.", path)
+    return CountryIndex(build_country_index())
+
+
+if __name__ == "__main__":
+    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump(build_country_index(), f, ensure_ascii=False, separators=(",", ":"))
+    print(f"Wrote {INDEX_FILE}")
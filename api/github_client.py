@@ -0,0 +1,296 @@
+"""
+github_client.py — pooled HTTP transport for the GitHub REST API.
+
+One ``requests.Session`` per process keeps TLS connections alive across
+page and profile fetches. It is created, and ``requests`` imported, on the
+first request, so processes that only serve cached data never pay for
+either. Transient failures (connection errors, timeouts,
+5xx) are retried with jittered exponential backoff; anything still failing
+after the last attempt raises ``GitHubError`` so callers never mistake an
+outage for an empty result.
+
+Every request also goes through a ``RateBudget`` fed by GitHub's
+``X-RateLimit-*`` / ``Retry-After`` headers. Interactive requests may
+spend the budget down to zero; background requests stop at a reserve, so
+a refresh never starves the visitors. Requests the budget cannot cover
+raise ``RateLimitError`` without touching the network.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import metrics
+import timing
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+GITHUB_REQUESTS = metrics.Counter(
+    "heatmap_github_requests_total",
+    "GitHub API requests sent, by response status (error: no response).",
+    ("status",),
+)
+
+# Responses worth retrying — GitHub returns these for transient outages
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+# Request priorities
+INTERACTIVE = "interactive"  # a visitor is waiting for the result
+BACKGROUND = "background"    # refreshes that can wait for the next window
+
+
+class GitHubError(Exception):
+    """A GitHub request failed after all retries."""
+
+
+class RateLimitError(GitHubError):
+    """The rate-limit budget cannot cover a request before *reset_at*."""
+
+    def __init__(self, message: str, reset_at: float):
+        super().__init__(message)
+        self.reset_at = reset_at
+
+
+class RateBudget:
+    """
+    Thread-safe view of the API budget left in the current rate-limit window.
+
+    Updated from each response's headers; requests in flight are counted
+    against the budget until their response arrives. Until GitHub reports
+    a limit the budget is unknown and nothing is held back.
+    """
+
+    def __init__(self, background_reserve: float = 0.2):
+        self.background_reserve = background_reserve
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        # Secondary limits (Retry-After) block every request until this time
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _expire_window(self, now: float) -> None:
+        if self.remaining is not None and now >= self.reset_at:
+            self.remaining = None
+
+    def available(self, priority: str = INTERACTIVE) -> int | None:
+        """Requests *priority* may still start now, or None if unbounded."""
+        with self._lock:
+            return self._available(priority, time.time())
+
+    def _available(self, priority: str, now: float) -> int | None:
+        if now < self.blocked_until:
+            return 0
+        self._expire_window(now)
+        if self.remaining is None:
+            return None
+        floor = 0
+        if priority == BACKGROUND and self.limit:
+            floor = math.ceil(self.limit * self.background_reserve)
+        return max(0, self.remaining - self.in_flight - floor)
+
+    def acquire(self, priority: str = INTERACTIVE) -> None:
+        """Claim one request, raising ``RateLimitError`` if none is available."""
+        with self._lock:
+            now = time.time()
+            if self._available(priority, now) == 0:
+                reset_at = max(self.blocked_until, self.reset_at if now < self.reset_at else now)
+                raise RateLimitError(
+                    f"GitHub rate-limit budget exhausted for {priority} requests "
+                    f"until {time.strftime('%H:%M:%S', time.gmtime(reset_at))} UTC",
+                    reset_at,
+                )
+            self.in_flight += 1
+
+    def release(self, resp: "requests.Response | None" = None) -> None:
+        """Return a claimed request, recording the budget *resp* reports."""
+        with self._lock:
+            self.in_flight -= 1
+            if resp is None:
+                return
+            headers = resp.headers
+            try:
+                remaining = int(headers["X-RateLimit-Remaining"])
+                reset_at = float(headers["X-RateLimit-Reset"])
+            except (KeyError, ValueError):
+                return
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if reset_at != self.reset_at or self.remaining is None:
+                # New window — its first report replaces the old one
+                if reset_at >= self.reset_at:
+                    self.reset_at, self.remaining = reset_at, remaining
+            else:
+                # Concurrent responses arrive out of order; the budget only shrinks
+                self.remaining = min(self.remaining, remaining)
+
+    def block(self, until: float) -> None:
+        """Hold back every request until *until* (a secondary rate limit)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, until)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._expire_window(time.time())
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+                "blocked_until": self.blocked_until,
+            }
+
+
+def response_validators(resp: "requests.Response") -> dict:
+    """Cache validators (ETag / Last-Modified) a response can be revalidated with."""
+    validators = {}
+    if resp.headers.get("ETag"):
+        validators["etag"] = resp.headers["ETag"]
+    if resp.headers.get("Last-Modified"):
+        validators["last_modified"] = resp.headers["Last-Modified"]
+    return validators
+
+
+def conditional_headers(validators: dict | None) -> dict:
+    """Request headers that turn a GET into a conditional GET (304 if unchanged)."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+class GitHubClient:
+    """
+    Thread-safe GitHub API client over a pooled keep-alive session.
+
+    *pool_size* should cover the number of threads sharing the client so
+    concurrent fetches each keep their own connection open. A rate-limited
+    response asking to retry within *max_rate_wait* seconds is waited out
+    and retried; longer waits raise ``RateLimitError``.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        timeout: float = 10,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        pool_size: int = 10,
+        background_reserve: float = 0.2,
+        max_rate_wait: float = 5,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_rate_wait = max_rate_wait
+        self.budget = RateBudget(background_reserve)
+        self.token = token
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session, created on first use."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._new_session()
+        return self._session
+
+    def _new_session(self) -> "requests.Session":
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.headers["Accept"] = "application/vnd.github+json"
+        if self.token:
+            session.headers["Authorization"] = f"token {self.token}"
+
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _sleep_before_retry(self, attempt: int) -> None:
+        """Exponential backoff with full-range jitter around the base delay."""
+        time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def _rate_limit_wait(self, resp: "requests.Response") -> float | None:
+        """Seconds a rate-limited *resp* asks us to wait, or None if not rate-limited."""
+        if resp.status_code not in (403, 429):
+            return None
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                return 60.0
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            return max(0.0, float(resp.headers.get("X-RateLimit-Reset", 0)) - time.time())
+        if resp.status_code == 429:
+            return 60.0
+        return None
+
+    def get(
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        timeout: float | None = None,
+        priority: str = INTERACTIVE,
+    ) -> "requests.Response":
+        """
+        GET *url*, retrying transient failures.
+
+        Returns the response for any non-retryable status (including 4xx),
+        and raises ``GitHubError`` once retries are exhausted, or
+        ``RateLimitError`` if the budget for *priority* is spent.
+        """
+        import requests
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._sleep_before_retry(attempt - 1)
+            self.budget.acquire(priority)
+            timing.count("github")
+            resp = None
+            try:
+                resp = self.session.get(
+                    url, params=params, headers=headers,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            except requests.RequestException as exc:
+                GITHUB_REQUESTS.inc(status="error")
+                last_error = str(exc)
+                logger.warning("GitHub request to %s failed (attempt %s): %s", url, attempt + 1, exc)
+                continue
+            finally:
+                self.budget.release(resp)
+            GITHUB_REQUESTS.inc(status=str(resp.status_code))
+
+            wait = self._rate_limit_wait(resp)
+            if wait is not None:
+                self.budget.block(time.time() + wait)
+                if wait > self.max_rate_wait or attempt == self.max_retries:
+                    raise RateLimitError(f"GitHub rate limit hit for {url}; retry in {wait:.0f}s",
+                                         time.time() + wait)
+                logger.warning("GitHub rate limit hit for %s, retrying in %.1fs", url, wait)
+                time.sleep(wait)
+                continue
+            if resp.status_code not in RETRY_STATUSES:
+                return resp
+            last_error = f"HTTP {resp.status_code}"
+            logger.warning("GitHub returned %s for %s (attempt %s)", resp.status_code, url, attempt + 1)
+
+        raise GitHubError(f"GET {url} failed after {self.max_retries + 1} attempts: {last_error}")
@@ -0,0 +1,274 @@
+"""
+map_lod.py — offline-built simplified levels of detail for the world map.
+
+The bundled map is full-precision geometry, far more than a README card
+displays. Coarser levels are simplified ahead of time (Douglas-Peucker per
+ring, coordinates rounded) and shipped next to the original:
+
+    python api/map_lod.py        # rebuild after replacing the map
+
+Levels, from most to least detailed:
+  full   the original ``static/sirlisko-world-map.svg``
+  high   ``sirlisko-world-map.high.svg`` — 0.5 map units, 1 decimal
+  low    ``sirlisko-world-map.low.svg``  — 2 map units, whole numbers
+
+Only path data changes; ids, attributes and the license header are kept.
+Paths with curves or arcs are left as they are.
+"""
+
+import logging
+import math
+import os
+import re
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+MAP_FILE = os.path.join(STATIC_DIR, "sirlisko-world-map.svg")
+
+# detail -> (tolerance in map units, coordinate decimals); "full" is the original
+LOD_LEVELS = {
+    "high": (0.5, 1),
+    "low": (2.0, 0),
+}
+DETAIL_LEVELS = ("full", *LOD_LEVELS)
+
+_PATH_TOKEN = re.compile(r"[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_SVG_PATH = "{http://www.w3.org/2000/svg}path"
+
+
+def lod_path(detail: str) -> str:
+    """File holding the map at *detail*."""
+    if detail == "full":
+        return MAP_FILE
+    return os.path.join(STATIC_DIR, f"sirlisko-world-map.{detail}.svg")
+
+
+# ---------------------------------------------------------------------------
+# Path data
+# ---------------------------------------------------------------------------
+
+def parse_path(d: str) -> list[list[tuple[float, float]]] | None:
+    """
+    Absolute point rings of a polygon path (``M L H V Z``, either case).
+
+    Returns None for paths using any other command, which are not simplified.
+    """
+    tokens = _PATH_TOKEN.findall(d)
+    rings: list[list[tuple[float, float]]] = []
+    ring: list[tuple[float, float]] = []
+    x = y = start_x = start_y = 0.0
+    command = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.isalpha():
+            command = token
+            i += 1
+            if command in "zZ":
+                if ring:
+                    rings.append(ring)
+                ring = []
+                x, y = start_x, start_y
+            elif command not in "mMlLhHvV":
+                return None
+            continue
+        if command is None or command in "zZ":
+            return None
+
+        relative = command.islower()
+        if command in "hH":
+            x = x + float(token) if relative else float(token)
+            i += 1
+        elif command in "vV":
+            y = y + float(token) if relative else float(token)
+            i += 1
+        else:
+            if i + 1 >= len(tokens) or tokens[i + 1].isalpha():
+                return None
+            dx, dy = float(token), float(tokens[i + 1])
+            x, y = (x + dx, y + dy) if relative else (dx, dy)
+            i += 2
+
+        if command in "mM":
+            if ring:
+                rings.append(ring)
+            ring = []
+            start_x, start_y = x, y
+            # Further pairs after a moveto are implicit linetos
+            command = "l" if relative else "L"
+        ring.append((x, y))
+    if ring:
+        rings.append(ring)
+    return rings
+
+
+def _fmt(value: float, decimals: int) -> str:
+    text = f"{value:.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def format_path(rings: list[list[tuple[float, float]]], decimals: int) -> str:
+    """
+    Closed relative path data for *rings*, rounded to *decimals*.
+
+    Offsets are taken between already-rounded points, so rounding errors do
+    not accumulate along a ring.
+    """
+    scale = 10 ** decimals
+    parts = []
+    x = y = 0
+    for ring in rings:
+        points = [(round(px * scale), round(py * scale)) for px, py in ring]
+        coords = []
+        for px, py in points:
+            coords.append(f"{_fmt((px - x) / scale, decimals)},{_fmt((py - y) / scale, decimals)}")
+            x, y = px, py
+        parts.append("m " + " ".join(coords) + " z")
+        # After "z" the current point is the ring's first point
+        x, y = points[0]
+    return " ".join(parts)
+
+
+def _short_number(token: str) -> str:
+    if "." in token and "e" not in token.lower():
+        token = token.rstrip("0").rstrip(".") or "0"
+    if token.startswith("0.") or token.startswith("-0."):
+        token = token.replace("0.", ".", 1)
+    return "0" if token in ("-0", "-.", ".") else token
+
+
+def compact_path(d: str) -> str:
+    """
+    Minified path data: no redundant zeros, and separators only where the
+    next number does not start with a sign.
+    """
+    out = []
+    previous_number = False
+    for token in _PATH_TOKEN.findall(d):
+        if token.isalpha():
+            out.append(token)
+            previous_number = False
+            continue
+        token = _short_number(token)
+        if previous_number and not token.startswith("-"):
+            out.append(" ")
+        out.append(token)
+        previous_number = True
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Simplification
+# ---------------------------------------------------------------------------
+
+def segment_distance(p, a, b) -> float:
+    """Distance from point *p* to segment *a*–*b*."""
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _douglas_peucker(points, tolerance):
+    """Keep the end points and every point needed to stay within *tolerance*."""
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        farthest, index = 0.0, None
+        for i in range(first + 1, last):
+            distance = segment_distance(points[i], points[first], points[last])
+            if distance > farthest:
+                farthest, index = distance, i
+        if index is not None and farthest > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+def simplify_ring(ring, tolerance):
+    """
+    Simplify one closed ring, keeping at least a triangle.
+
+    The ring is split at its first point and the point farthest from it,
+    and both halves are simplified separately, so the closing edge is
+    simplified like any other.
+    """
+    if len(ring) <= 3:
+        return list(ring)
+    first = ring[0]
+    split = max(range(1, len(ring)), key=lambda i: math.hypot(ring[i][0] - first[0], ring[i][1] - first[1]))
+    head = _douglas_peucker(ring[:split + 1], tolerance)
+    tail = _douglas_peucker(ring[split:] + [first], tolerance)
+    simplified = head + tail[1:-1]
+    if len(simplified) < 3:
+        # The whole ring hugs one chord — keep a triangle rather than a line
+        third = max(
+            (i for i in range(1, len(ring)) if i != split),
+            key=lambda i: segment_distance(ring[i], first, ring[split]),
+        )
+        simplified = [first, ring[third], ring[split]] if third < split else [first, ring[split], ring[third]]
+    return simplified
+
+
+def ring_extent(ring) -> float:
+    xs, ys = [p[0] for p in ring], [p[1] for p in ring]
+    return max(max(xs) - min(xs), max(ys) - min(ys))
+
+
+def simplify_rings(rings, tolerance):
+    """
+    Simplify every ring of one shape.
+
+    Rings smaller than *tolerance* in both directions are dropped, except
+    the largest one, so small countries never disappear.
+    """
+    largest = max(range(len(rings)), key=lambda i: ring_extent(rings[i]))
+    return [
+        simplify_ring(ring, tolerance)
+        for i, ring in enumerate(rings)
+        if i == largest or ring_extent(ring) >= tolerance
+    ]
+
+
+def simplify_map(root, tolerance: float, decimals: int):
+    """Return a copy of the map *root* with every polygon path simplified."""
+    root = etree.fromstring(etree.tostring(root))
+    for node in root.iter(_SVG_PATH):
+        rings = parse_path(node.get("d", ""))
+        if rings:
+            node.set("d", format_path(simplify_rings(rings, tolerance), decimals))
+    return root
+
+
+def build_lod(detail: str) -> bytes:
+    """Serialized map document at *detail* (build-time, or a missing file)."""
+    tolerance, decimals = LOD_LEVELS[detail]
+    tree = etree.parse(MAP_FILE)
+    simplified = simplify_map(tree.getroot(), tolerance, decimals)
+    # Keep the comments (the map's license) that precede the root element
+    prolog = []
+    node = tree.getroot().getprevious()
+    while node is not None:
+        prolog.insert(0, etree.tostring(node).strip())
+        node = node.getprevious()
+    body = etree.tostring(simplified, encoding="utf-8")
+    return b'<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n' + b"\n".join(prolog + [body]) + b"\n"
+
+
+if __name__ == "__main__":
+    for level in LOD_LEVELS:
+        data = build_lod(level)
+        with open(lod_path(level), "wb") as f:
+            f.write(data)
+        print(f"Wrote {lod_path(level)} ({len(data)} bytes)")
@@ -0,0 +1,189 @@
+"""
+metrics.py — in-process counters, gauges and histograms for ``/api/metrics``.
+
+Metrics are declared where they are fed (utils.py, github_client.py,
+widget.py) and rendered together in the Prometheus text exposition format:
+
+    REQUESTS = metrics.Counter("heatmap_requests_total", "Requests served.", ("status",))
+    REQUESTS.inc(status="200")
+
+Every metric guards its samples with its own lock, so request threads can
+update them concurrently. Values are per process: under gunicorn each
+worker keeps its own, and a scrape reports the worker that answered it.
+Ratios and latency distributions remain representative; for exact
+totals, scrape each worker (or run a single worker with threads).
+
+Recording is off unless METRICS=1, in which case each update costs one
+lock acquisition; gauges that mirror live state are refreshed by
+collector callbacks just before rendering.
+"""
+
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+
+ENABLED = os.getenv("METRICS", "0") == "1"
+
+# Latency buckets (seconds) from a warm cache hit to a cold crawl
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: dict[str, "_Metric"] = {}
+_collectors: list = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry[name] = self
+
+    def _key(self, labels: dict) -> tuple:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        """``(suffix, labels, value)`` rows of the exposition."""
+        with self._lock:
+            return [("", _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples()]
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, one series per label combination."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not ENABLED or not amount:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    """Point-in-time value; usually refreshed by a collector callback."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket distribution of observed values (seconds, typically)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum]
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._values.items())
+        rows = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                rows.append(("_bucket", _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            rows.append(("_sum", labels, total))
+            rows.append(("_count", labels, cumulative))
+        return rows
+
+
+def add_collector(fn) -> None:
+    """Call *fn* before every render, e.g. to refresh gauges from live state."""
+    with _registry_lock:
+        if fn not in _collectors:
+            _collectors.append(fn)
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format (version 0.0.4)."""
+    with _registry_lock:
+        collectors = list(_collectors)
+        registered = sorted(_registry.values(), key=lambda metric: metric.name)
+    for collect in collectors:
+        collect()
+    lines = []
+    for metric in registered:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Forget every recorded sample (tests)."""
+    with _registry_lock:
+        registered = list(_registry.values())
+    for metric in registered:
+        metric.clear()
@@ -0,0 +1,233 @@
+"""
+profiling.py — operator-only profiles of slow ``/api/heatmap`` requests.
+
+Off unless PROFILE_DIR is set. Then:
+  - every request is watched by a stack sampler (one background thread,
+    sampling the request thread every PROFILE_SAMPLE_INTERVAL_MS); a
+    request slower than PROFILE_THRESHOLD_MS keeps its samples as a
+    ``.folded`` file (collapsed stacks, flame-graph ready)
+  - a request passing ``profile=<PROFILE_SECRET>`` runs under cProfile
+    instead, kept as a ``.prof`` file (pstats / snakeviz) whatever its speed
+
+Only the newest PROFILE_KEEP files are kept. List and read them with
+
+    python api/profiling.py              # newest first
+    python api/profiling.py NAME         # top functions of one profile
+
+or, when PROFILE_SECRET is set, ``GET /api/profiles?secret=...``.
+
+Both profilers follow the request thread; time spent in crawl worker
+threads shows up as the request thread waiting on their results.
+"""
+
+import cProfile
+import collections
+import contextlib
+import hmac
+import io
+import logging
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+# Sampled requests at least this slow are kept (0: only forced profiles)
+PROFILE_THRESHOLD_MS = int(os.getenv("PROFILE_THRESHOLD_MS", "2000"))
+PROFILE_SAMPLE_INTERVAL_MS = 5
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+_PROFILE_NAME = re.compile(r"^[\w.-]+\.(?:prof|folded)$")
+_UNSAFE = re.compile(r"[^A-Za-z0-9.-]+")
+
+
+def is_forced(token: str | None) -> bool:
+    """Whether *token* is the profiling secret (compared in constant time)."""
+    return bool(PROFILE_SECRET) and hmac.compare_digest((token or "").encode(), PROFILE_SECRET.encode())
+
+
+# ---------------------------------------------------------------------------
+# Sampling profiler
+# ---------------------------------------------------------------------------
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled every *interval* seconds."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: collections.Counter = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """Collapsed stacks, one ``root;...;leaf count`` line each."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+# ---------------------------------------------------------------------------
+# Ring buffer on disk
+# ---------------------------------------------------------------------------
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first."""
+    try:
+        entries = [e for e in os.scandir(PROFILE_DIR) if _PROFILE_NAME.match(e.name)]
+    except OSError:
+        return []
+    rows = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue  # pruned meanwhile
+        rows.append({"name": entry.name, "size": stat.st_size, "mtime": stat.st_mtime})
+    return sorted(rows, key=lambda row: (row["mtime"], row["name"]), reverse=True)
+
+
+def profile_path(name: str) -> str | None:
+    """Path of stored profile *name*, or None if there is no such profile."""
+    if not _PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def save_profile(label: str, elapsed: float, suffix: str, data: bytes) -> str | None:
+    """Store one profile and prune the oldest past PROFILE_KEEP; returns its name."""
+    name = f"{int(time.time() * 1000)}-{os.getpid()}-{_UNSAFE.sub('_', label)[:60]}-{elapsed * 1000:.0f}ms{suffix}"
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        tmp_path = os.path.join(PROFILE_DIR, f"{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(PROFILE_DIR, name))
+        for row in list_profiles()[PROFILE_KEEP:]:
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(PROFILE_DIR, row["name"]))
+    except OSError:
+        logger.warning("Could not write profile to %s", PROFILE_DIR)
+        return None
+    logger.info("Profiled %s (%.0f ms) into %s", label, elapsed * 1000, name)
+    return name
+
+
+def _pstats_bytes(profiler: cProfile.Profile) -> bytes:
+    # Same bytes as Profile.dump_stats(), which only writes to a path
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+@contextlib.contextmanager
+def profile_request(label: str, token: str | None = None):
+    """
+    Profile the block if profiling is enabled.
+
+    *token* matching PROFILE_SECRET forces a cProfile capture; otherwise
+    the block is sampled and kept only past PROFILE_THRESHOLD_MS.
+    """
+    if not PROFILE_DIR or not (PROFILE_THRESHOLD_MS or is_forced(token)):
+        yield
+        return
+
+    start = time.perf_counter()
+    if is_forced(token):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            save_profile(label, time.perf_counter() - start, ".prof", _pstats_bytes(profiler))
+        return
+
+    sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000).start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        if elapsed * 1000 >= PROFILE_THRESHOLD_MS:
+            save_profile(label, elapsed, ".folded", sampler.folded().encode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+# Reading profiles
+# ---------------------------------------------------------------------------
+
+def summarize(path: str, limit: int = 30) -> str:
+    """Top functions of a stored profile, as text."""
+    if path.endswith(".prof"):
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    inclusive: collections.Counter = collections.Counter()
+    own: collections.Counter = collections.Counter()
+    total = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, n = line.rstrip("\n").rpartition(" ")
+            frames = stack.split(";")
+            total += int(n)
+            own[frames[-1]] += int(n)
+            for frame in set(frames):
+                inclusive[frame] += int(n)
+    lines = [f"{total} samples"]
+    if not total:
+        return lines[0] + "\n"
+    for title, counter in (("inclusive", inclusive), ("self", own)):
+        lines.append(f"\n{title:>9}  function")
+        lines += [f"{n / total:9.1%}  {frame}" for frame, n in counter.most_common(limit)]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if not PROFILE_DIR:
+        print("PROFILE_DIR is not set", file=sys.stderr)
+        return 1
+    if not args:
+        for row in list_profiles():
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["mtime"]))
+            print(f"{stamp}  {row['size']:>9}  {row['name']}")
+        return 0
+    path = profile_path(args[0])
+    if path is None:
+        print(f"No profile named {args[0]}", file=sys.stderr)
+        return 1
+    print(summarize(path), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
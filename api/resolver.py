@@ -0,0 +1,144 @@
+"""
+resolver.py — compiled location → country code resolver.
+
+Builds the lookup structures for a location table once, so resolving a
+contributor's location no longer scans the whole table per pass:
+  - a dict for exact and per-token matches
+  - an Aho-Corasick automaton for the longest-substring pass
+  - a prebuilt country index (see country_index.py) for the fuzzy passes
+"""
+
+import hashlib
+
+# Rank used for automaton states that complete no pattern
+_NO_MATCH = float("inf")
+
+
+class CountryResolver:
+    """
+    Resolve free-text locations against an ordered ``(key, code)`` table.
+
+    The table order is the match priority: when several keys match, the one
+    listed first wins, exactly as a linear scan over the table would pick it.
+    """
+
+    # Bump when a change to this class changes how it resolves; keys the
+    # resolver in the startup snapshot (see snapshot.py)
+    FORMAT = 1
+
+    def __init__(self, country_map, blocklist=(), fuzzy_index=None):
+        self.blocklist = frozenset(blocklist)
+        self.codes = [code for _, code in country_map]
+        self.fuzzy = fuzzy_index
+
+        # Identifies the rules in effect so persisted results can be invalidated
+        fuzzy_version = fuzzy_index.version if fuzzy_index else None
+        rules = repr((list(country_map), sorted(self.blocklist), fuzzy_version))
+        self.version = hashlib.sha1(rules.encode("utf-8")).hexdigest()[:12]
+
+        # Exact lookup — first occurrence of a key keeps priority
+        self.exact: dict[str, str] = {}
+        for key, code in country_map:
+            self.exact.setdefault(key, code)
+
+        self._goto, self._fail, self._best = self._build_automaton(
+            [key for key, _ in country_map]
+        )
+
+    @staticmethod
+    def _build_automaton(keys):
+        """
+        Build an Aho-Corasick automaton over *keys*.
+
+        ``best[state]`` holds the lowest table rank of any key that ends at
+        *state*, including keys reached through failure links, so a single
+        pass over the text finds the highest-priority substring match.
+        """
+        goto: list[dict[str, int]] = [{}]
+        best: list[float] = [_NO_MATCH]
+
+        for rank, key in enumerate(keys):
+            state = 0
+            for ch in key:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    best.append(_NO_MATCH)
+                    nxt = len(goto) - 1
+                    goto[state][ch] = nxt
+                state = nxt
+            if rank < best[state]:
+                best[state] = rank
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if best[fail[nxt]] < best[nxt]:
+                    best[nxt] = best[fail[nxt]]
+                queue.append(nxt)
+
+        return goto, fail, best
+
+    def match_substring(self, text: str) -> str | None:
+        """Return the code of the highest-priority key contained in *text*."""
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = _NO_MATCH
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+        if found == _NO_MATCH:
+            return None
+        return self.codes[found]
+
+    def resolve(self, location: str | None) -> str | None:
+        """
+        Map a free-text location string to an ISO 3166-1 alpha-2 country code.
+
+        Resolution order:
+          1. Exact match in the table
+          2. Substring match in the table  (e.g. "Espoo region, Finland" → "fi")
+          3. Token-by-token check from end of string (country usually comes last)
+          4. Fuzzy search on full string as fallback
+
+        The fuzzy steps use the country index and are skipped without one.
+        Returns *None* if the location cannot be resolved or is blocklisted.
+        """
+        if not location:
+            return None
+
+        loc_lower = location.lower().strip()
+
+        if loc_lower in self.blocklist:
+            return None
+
+        # 1. Exact match
+        code = self.exact.get(loc_lower)
+        if code:
+            return code
+
+        # 2. Substring match
+        code = self.match_substring(loc_lower)
+        if code:
+            return code
+
+        if self.fuzzy is None:
+            return None
+
+        # 3. Token-by-token (reversed — country typically at the end)
+        tokens = [p.strip() for p in loc_lower.replace(",", " ").split() if p.strip()]
+        for token in reversed(tokens):
+            code = self.exact.get(token) or self.fuzzy.search(token)
+            if code:
+                return code
+
+        # 4. Full-string fuzzy fallback, then any country name in the string
+        return self.fuzzy.search(location) or self.fuzzy.name_in(loc_lower)
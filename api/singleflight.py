@@ -0,0 +1,108 @@
+"""
+singleflight.py — coalesce concurrent work on the same key.
+
+When many requests need the same expensive result at once (a repo whose
+cache entry is missing or expired), only one of them should do the work:
+  - SingleFlight   within a process: the first caller for a key runs the
+                   function, concurrent callers wait for and share its result
+  - file_lock      across processes: an exclusive ``flock`` on a per-key
+                   lock file, so gunicorn workers queue behind one leader
+
+Callers holding ``file_lock`` should re-check the shared cache once they
+acquire it — another worker may have finished the work while they waited.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows — no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-progress call and the outcome its waiters will share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Per-key call deduplication for concurrent threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+
+    def run(self, key: str, fn):
+        """
+        Return ``fn()``, sharing one call among concurrent callers for *key*.
+
+        Followers get the leader's return value, or its exception re-raised.
+        The flight is forgotten once it finishes, so later calls run again.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._flights
+
+
+@contextlib.contextmanager
+def file_lock(lock_dir: str, key: str):
+    """
+    Hold an exclusive cross-process lock for *key* while the block runs.
+
+    Lock files live in *lock_dir* and are never removed (removing them
+    would race with waiters). Without ``fcntl`` or a writable *lock_dir*
+    the block runs unlocked, relying on in-process coalescing alone.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".lock"
+    fd = None
+    try:
+        os.makedirs(lock_dir, exist_ok=True)
+        fd = os.open(os.path.join(lock_dir, name), os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as exc:
+        logger.warning("Could not open lock file in %s (%s) — locking in-process only.", lock_dir, exc)
+    if fd is None:
+        yield
+        return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # closing the descriptor releases the lock
@@ -0,0 +1,125 @@
+"""
+snapshot.py — prebuilt startup snapshot of compiled lookup structures.
+
+Compiling the location resolver (country index + Aho-Corasick automaton)
+and the world-map templates is pure CPU work repeated by every cold
+process. The results are built ahead of time and committed as
+``static/startup.snapshot``, so every deploy ships them:
+
+    python api/snapshot.py            # rebuild
+    python api/snapshot.py --check    # exit 1 if a section is missing or stale
+
+The file is read in one go on first use. Each section (the resolver, one
+map template per level of detail) is pickled separately and unpickled only
+when asked for, under the key of the inputs it was built from: the tables
+and map files, and the ``FORMAT`` of the class that compiles them. A
+missing file or a stale section falls back to compiling at runtime, so a
+forgotten rebuild costs time, never correctness; the test suite fails
+until the snapshot is rebuilt, and also when it no longer matches a fresh
+compile (a ``FORMAT`` that should have been bumped).
+
+The snapshot is build output committed with the code and is trusted like it.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import pickle
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), "static", "startup.snapshot")
+
+# Bumped when the file layout changes
+SNAPSHOT_FORMAT = 1
+
+
+def fingerprint(*parts, paths=()) -> str:
+    """Key for a section built from *parts* (str / bytes) and the files at *paths*."""
+    digest = hashlib.sha1(f"{SNAPSHOT_FORMAT}".encode())
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        digest.update(b"\x00")
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            digest.update(path.encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=1)
+def _sections() -> dict:
+    """``{name: (key, pickled payload)}`` of the shipped snapshot, or {}."""
+    try:
+        with open(SNAPSHOT_FILE, "rb") as f:
+            data = pickle.loads(f.read())
+    except FileNotFoundError:
+        return {}
+    except Exception:  # noqa: BLE001
+        logger.warning("Startup snapshot %s is unreadable — compiling at runtime.", SNAPSHOT_FILE)
+        return {}
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        return {}
+    return data["sections"]
+
+
+def load(name: str, key: str):
+    """The object stored as section *name* if it was built under *key*, else None."""
+    section = _sections().get(name)
+    if section is None:
+        return None
+    if section[0] != key:
+        logger.info("Startup snapshot section %s is stale — compiling at runtime.", name)
+        return None
+    return pickle.loads(section[1])
+
+
+def dumps(sections: dict) -> bytes:
+    """Serialize ``{name: (key, object)}`` as a snapshot file."""
+    return pickle.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "sections": {
+            name: (key, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+            for name, (key, obj) in sorted(sections.items())
+        },
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def build() -> bytes:
+    """Compile every section from the current sources (build-time)."""
+    import utils
+    import widget
+
+    return dumps({**utils.snapshot_sections(), **widget.snapshot_sections()})
+
+
+def stale_sections() -> list[str]:
+    """Names of the sections the committed snapshot lacks or holds under an old key."""
+    import utils
+    import widget
+
+    sections = _sections()
+    return sorted(
+        name for name, (key, _) in {**utils.snapshot_sections(), **widget.snapshot_sections()}.items()
+        if sections.get(name, (None,))[0] != key
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["--check"]:
+        stale = stale_sections()
+        if stale:
+            print(f"{SNAPSHOT_FILE} is out of date ({', '.join(stale)}): run python api/snapshot.py")
+            sys.exit(1)
+        print(f"{SNAPSHOT_FILE} is up to date")
+        sys.exit(0)
+    data = build()
+    with open(SNAPSHOT_FILE, "wb") as f:
+        f.write(data)
+    print(f"Wrote {SNAPSHOT_FILE} ({len(data)} bytes)")
@@ -0,0 +1,102 @@
+"""
+timing.py — lightweight per-request stage timers.
+
+A request opts in with ``collect()``; code on its path reports into the
+active collector with ``stage(name)`` (wall time, summed over repeats) and
+``count(name)``. With no active collector both cost one ContextVar lookup,
+so instrumented code paths stay cheap for background work and tests.
+
+Work handed to thread pools keeps reporting into the request's collector
+when the callable is wrapped with ``propagate(fn)``.
+
+Collected timings render as a ``Server-Timing`` header (durations in ms,
+counters as ``name;desc=N``) or as a dict for structured logs.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+
+_current: contextvars.ContextVar["RequestTimings | None"] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class RequestTimings:
+    """Stage durations and counters for one request. Thread-safe."""
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value."""
+        with self._lock:
+            metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+            metrics += [f"{name};desc={n}" for name, n in sorted(self.counters.items())]
+        return ", ".join(metrics)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+                "counts": dict(sorted(self.counters.items())),
+            }
+
+
+@contextlib.contextmanager
+def collect():
+    """Collect timings reported by the calling context until the block exits."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Time the block as stage *name* of the active collector, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add *n* to counter *name* of the active collector, if any."""
+    timings = _current.get()
+    if timings is not None and n:
+        timings.count(name, n)
+
+
+def propagate(fn):
+    """Wrap *fn* to report into the current collector from another thread."""
+    timings = _current.get()
+    if timings is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _current.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
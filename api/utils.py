@@ -3,56 +3,201 @@ utils.py — GitHub contributor fetching and location resolution.
 
 Handles:
   - GitHub API pagination for contributor lists
-  - Disk-backed caching (24-hour TTL) for API responses
+  - Persistent caching (24-hour TTL) for API responses — see cache_store.py
   - Fuzzy location → ISO-3166-1 alpha-2 country code resolution
+  - Memoized, persisted resolution results
 """
 
+import functools
 import os
-import json
 import time
+import random
 import logging
-import requests
-import pycountry
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from cache_store import StoreMapping, load_json, open_cache_store, save_json  # noqa: F401
+from country_index import INDEX_FILE, load_country_index
+from github_client import (
+    BACKGROUND,
+    INTERACTIVE,
+    GitHubClient,
+    GitHubError,
+    RateLimitError,
+    conditional_headers,
+    response_validators,
+)
+import metrics
+from resolver import CountryResolver
+from singleflight import SingleFlight, file_lock
+import snapshot
+import timing
 
 logger = logging.getLogger(__name__)
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# Upper bound on concurrent profile lookups per crawl
+PROFILE_FETCH_WORKERS = int(os.getenv("PROFILE_FETCH_WORKERS", "8"))
+
+# Shared pooled client — every GitHub request goes through it
+github = GitHubClient(GITHUB_TOKEN, pool_size=max(10, PROFILE_FETCH_WORKERS))
 
 # Use /tmp for caching on Vercel (the only writable directory in serverless)
-CACHE_DIR = "/tmp" if os.getenv("VERCEL") else "."
+CACHE_DIR = os.getenv("CACHE_DIR") or ("/tmp" if os.getenv("VERCEL") else ".")
+# "sqlite" (default) or "json" for the legacy whole-file JSON caches
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+CACHE_DB_FILE = os.path.join(CACHE_DIR, "cache.db")
+# Legacy JSON files — used by the json backend and imported once into SQLite
 CACHE_FILE = os.path.join(CACHE_DIR, "repo_cache.json")
 LOCATION_CACHE_FILE = os.path.join(CACHE_DIR, "user_locations.json")
+VALIDATORS_CACHE_FILE = os.path.join(CACHE_DIR, "user_validators.json")
+USER_CHECKS_CACHE_FILE = os.path.join(CACHE_DIR, "user_checks.json")
+RESOLUTION_CACHE_FILE = os.path.join(CACHE_DIR, "resolved_locations.json")
+ORG_CACHE_FILE = os.path.join(CACHE_DIR, "org_cache.json")
+AGGREGATE_CACHE_FILE = os.path.join(CACHE_DIR, "aggregate_cache.json")
+# Per-repo lock files serializing crawls across worker processes
+LOCK_DIR = os.path.join(CACHE_DIR, ".locks")
 
 CACHE_TTL_SECONDS = 86_400  # 24 hours
+CONTRIBUTORS_PER_PAGE = 100  # GitHub's maximum page size
+# Expired entries at most this much past the TTL are served while a background
+# refresh runs; older ones block on a fresh crawl (0 disables)
+CACHE_MAX_STALE_SECONDS = int(os.getenv("CACHE_MAX_STALE_SECONDS", str(7 * 86_400)))
+RESOLUTION_CACHE_SIZE = 10_000  # distinct location strings kept in memory
+# Known users' profiles are re-checked after this long, ± the jitter fraction
+# so users first seen in the same crawl don't all come due together
+LOCATION_TTL_SECONDS = 30 * 86_400
+LOCATION_TTL_JITTER = 0.2
+# A failed profile fetch is retried after this long instead of being cached;
+# a repo entry missing such profiles expires after the same delay
+LOCATION_ERROR_TTL_SECONDS = 15 * 60
+# refresh=1 is ignored for a repo crawled less than this long ago
+REFRESH_COOLDOWN_SECONDS = int(os.getenv("REFRESH_COOLDOWN_SECONDS", "300"))
+# Upper bound on repos merged into one aggregate heatmap
+MAX_AGGREGATE_REPOS = int(os.getenv("MAX_AGGREGATE_REPOS", "100"))
+# Repos crawled at once for an aggregate (each crawl has its own profile pool)
+AGGREGATE_FETCH_WORKERS = 4
 
 
 # ---------------------------------------------------------------------------
-# Disk-backed JSON helpers
+# Metrics (see metrics.py)
 # ---------------------------------------------------------------------------
 
-def load_json(filename: str) -> dict:
-    """Load a JSON file from disk, returning an empty dict on any failure."""
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            logger.warning("Could not load %s — starting fresh.", filename)
-    return {}
+CACHE_LOOKUPS = metrics.Counter(
+    "heatmap_cache_lookups_total",
+    "Cache lookups by cache (repo_cache, user_locations, resolution, render) and result.",
+    ("cache", "result"),
+)
+RATE_LIMIT_REMAINING = metrics.Gauge(
+    "heatmap_github_rate_limit_remaining", "GitHub API requests left in the current rate-limit window."
+)
+RATE_LIMIT_LIMIT = metrics.Gauge(
+    "heatmap_github_rate_limit_limit", "GitHub API requests allowed per rate-limit window."
+)
+RATE_LIMIT_RESET = metrics.Gauge(
+    "heatmap_github_rate_limit_reset_timestamp_seconds", "When the current rate-limit window resets."
+)
+
+
+def _collect_rate_limit() -> None:
+    budget = github.budget.snapshot()
+    for gauge, value in (
+        (RATE_LIMIT_REMAINING, budget["remaining"]),
+        (RATE_LIMIT_LIMIT, budget["limit"]),
+        (RATE_LIMIT_RESET, budget["reset_at"]),
+    ):
+        if value is not None:
+            gauge.set(value)
 
 
-def save_json(filename: str, data: dict) -> None:
-    """Persist *data* as JSON to *filename*, silently failing in read-only envs."""
-    try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f)
-    except Exception:
-        logger.warning("Could not save %s (read-only filesystem?).", filename)
+metrics.add_collector(_collect_rate_limit)
+
 
+# ---------------------------------------------------------------------------
+# Caches
+# ---------------------------------------------------------------------------
 
-# Module-level cache loaded once per cold-start
-repo_cache: dict = load_json(CACHE_FILE)
-user_locations: dict = load_json(LOCATION_CACHE_FILE)
+class LRUCache:
+    """
+    Thread-safe, size-bounded mapping that evicts the least recently used key.
+
+    ``get`` returns *default* on a miss, so ``None`` can be cached as a value.
+    """
+
+    def __init__(self, maxsize: int, items: dict | None = None):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        for key, value in (items or {}).items():
+            self.set(key, value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def to_dict(self) -> dict:
+        """Snapshot of the entries, least recently used first."""
+        with self._lock:
+            return dict(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _legacy_resolution_rows(document: dict) -> dict:
+    """Reshape the old ``{"version", "entries"}`` resolution file into rows."""
+    version = document.get("version")
+    return {key: {"v": version, "code": code} for key, code in document.get("entries", {}).items()}
+
+
+def set_cache_store(store) -> None:
+    """Point the module-level cache mappings at *store*."""
+    global cache_store, repo_cache, user_locations, user_validators, user_checks, resolution_store
+    global org_cache, aggregate_cache
+    cache_store = store
+    repo_cache = StoreMapping(store, "repos")
+    user_locations = StoreMapping(store, "user_locations")
+    # username → ETag / Last-Modified of the profile behind user_locations
+    user_validators = StoreMapping(store, "user_validators")
+    # username → {"next": when to re-check the profile, "error": last fetch failed}
+    user_checks = StoreMapping(store, "user_checks")
+    # normalized location → {"v": resolver version, "code": code}
+    resolution_store = StoreMapping(store, "resolved")
+    # org → {"timestamp", "repos": [full names]}
+    org_cache = StoreMapping(store, "orgs")
+    # aggregate key → {"timestamp", "repos", "contributors", "counts", "counts_version"}
+    aggregate_cache = StoreMapping(store, "aggregates")
+
+
+# Opening the store is O(1): entries are read per key, never loaded in full
+set_cache_store(open_cache_store(
+    CACHE_BACKEND,
+    CACHE_DB_FILE,
+    {
+        "repos": CACHE_FILE,
+        "user_locations": LOCATION_CACHE_FILE,
+        "user_validators": VALIDATORS_CACHE_FILE,
+        "user_checks": USER_CHECKS_CACHE_FILE,
+        "resolved": RESOLUTION_CACHE_FILE,
+        "orgs": ORG_CACHE_FILE,
+        "aggregates": AGGREGATE_CACHE_FILE,
+    },
+    transforms={"resolved": _legacy_resolution_rows},
+))
 
 
 # ---------------------------------------------------------------------------
@@ -153,6 +298,60 @@ LOCATION_BLOCKLIST = {
 }
 
 
+def _resolver_snapshot_key() -> str:
+    """Identifies everything the compiled resolver is built from."""
+    return snapshot.fingerprint(
+        f"CountryResolver/{CountryResolver.FORMAT}", repr((COUNTRY_MAP, sorted(LOCATION_BLOCKLIST))),
+        paths=(INDEX_FILE,),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_resolver() -> CountryResolver:
+    """
+    The location resolver, compiled once per process on first use.
+
+    Taken from the startup snapshot (see snapshot.py) when it was built
+    from the current tables; compiled from them otherwise.
+    """
+    resolver = snapshot.load("resolver", _resolver_snapshot_key())
+    if resolver is None:
+        resolver = CountryResolver(COUNTRY_MAP, LOCATION_BLOCKLIST, load_country_index())
+    return resolver
+
+
+def snapshot_sections() -> dict:
+    """Startup snapshot sections owned by this module (build-time)."""
+    return {
+        "resolver": (
+            _resolver_snapshot_key(),
+            CountryResolver(COUNTRY_MAP, LOCATION_BLOCKLIST, load_country_index()),
+        ),
+    }
+
+# Sentinel for resolution-cache misses (None is a valid cached result)
+_MISSING = object()
+
+# Hot in-memory tier in front of resolution_store
+resolved_locations = LRUCache(RESOLUTION_CACHE_SIZE)
+
+
+def _stored_resolutions(keys) -> dict:
+    """Persisted results for *keys* that were produced by the current rules."""
+    rows = resolution_store.get_many(keys)
+    version = get_resolver().version
+    return {
+        key: row["code"]
+        for key, row in rows.items()
+        if isinstance(row, dict) and row.get("v") == version
+    }
+
+
+def normalize_location(location: str | None) -> str:
+    """Cache key for a location string; resolution only depends on this form."""
+    return location.lower().strip() if location else ""
+
+
 def resolve_country_code(location: str | None) -> str | None:
     """
     Map a free-text location string to an ISO 3166-1 alpha-2 country code.
@@ -161,124 +360,623 @@ def resolve_country_code(location: str | None) -> str | None:
       1. Exact match in COUNTRY_MAP
       2. Substring match in COUNTRY_MAP  (e.g. "Espoo region, Finland" → "fi")
       3. Token-by-token check from end of string (country usually comes last)
-      4. pycountry fuzzy search on full string as fallback
+      4. Fuzzy search on full string as fallback (prebuilt pycountry index)
 
     Returns *None* if the location cannot be resolved or is in BLOCKLIST.
+    Results are memoized in ``resolved_locations``; see
+    ``resolver.CountryResolver`` for the compiled lookup structures.
     """
-    if not location:
-        return None
+    return resolve_many([location])[0][0]
+
+
+def resolve_many(locations) -> tuple[list[str | None], dict]:
+    """
+    Resolve a batch of location strings, resolving each distinct one once.
+
+    Lookups go through the in-memory LRU, then the persistent store, and only
+    then the resolver. Returns ``(codes, stats)`` where *codes* is aligned with
+    *locations* and *stats* counts distinct strings as ``hits`` (memoized in
+    memory or on disk) and ``misses`` (freshly resolved).
+    """
+    keys = [normalize_location(loc) for loc in locations]
+    results: dict[str, str | None] = {}
+
+    for key in keys:
+        if key not in results:
+            code = resolved_locations.get(key, _MISSING)
+            if code is not _MISSING:
+                results[key] = code
+
+    pending = [key for key in dict.fromkeys(keys) if key not in results]
+    stored = _stored_resolutions(pending) if pending else {}
+    fresh: dict[str, str | None] = {}
+    resolver = get_resolver() if pending else None
+    for key in pending:
+        code = stored[key] if key in stored else resolver.resolve(key)
+        if key not in stored:
+            fresh[key] = code
+        resolved_locations.set(key, code)
+        results[key] = code
+
+    if fresh:
+        resolution_store.update_many(
+            {key: {"v": resolver.version, "code": code} for key, code in fresh.items()}
+        )
+        cache_store.flush()
+
+    stats = {
+        "total": len(keys),
+        "distinct": len(results),
+        "hits": len(results) - len(fresh),
+        "misses": len(fresh),
+    }
+    CACHE_LOOKUPS.inc(stats["hits"], cache="resolution", result="hit")
+    CACHE_LOOKUPS.inc(stats["misses"], cache="resolution", result="miss")
+    return [results[key] for key in keys], stats
+
+
+def count_countries(users: list[dict]) -> dict[str, int]:
+    """Number of *users* per resolved country code (unresolved ones skipped)."""
+    with timing.stage("resolve"):
+        codes, stats = resolve_many(user["location"] for user in users)
+    timing.count("resolve-hit", stats["hits"])
+    timing.count("resolve-miss", stats["misses"])
+    logger.debug("Resolved %s locations: %s", len(codes), stats)
+    counts: dict[str, int] = {}
+    for code in codes:
+        if code:
+            counts[code] = counts.get(code, 0) + 1
+    return counts
+
+
+def _with_counts(entry: dict) -> dict:
+    """Copy of a repo entry with its country counts under the current rules."""
+    return {**entry, "counts": count_countries(entry["data"]), "counts_version": get_resolver().version}
 
-    loc_lower = location.lower().strip()
 
-    if loc_lower in LOCATION_BLOCKLIST:
+# ---------------------------------------------------------------------------
+# GitHub API
+# ---------------------------------------------------------------------------
+
+def fetch_profile_location(url: str, username: str, priority: str = INTERACTIVE) -> str | None:
+    """
+    Fetch a single user's profile and return its free-text location.
+
+    Cached profiles are revalidated with their stored ETag / Last-Modified;
+    a 304 reuses the cached location. A deleted account (404) has no
+    location; any other failure raises ``GitHubError``.
+    """
+    cached = username in user_locations
+    headers = conditional_headers(user_validators.get(username)) if cached else None
+    resp = github.get(url, headers=headers, priority=priority)
+    if resp.status_code == 304 and cached:
+        return user_locations[username]
+    if resp.status_code == 200:
+        try:
+            location = resp.json().get("location")
+        except (ValueError, AttributeError):
+            raise GitHubError(f"GET {url} returned an unreadable profile") from None
+        user_validators[username] = response_validators(resp)
+        return location
+    if resp.status_code == 404:
         return None
+    raise GitHubError(f"GET {url} returned HTTP {resp.status_code}")
+
+
+def _next_location_check(now: float) -> float:
+    """When a successfully fetched profile is next due for a re-check."""
+    jitter = random.uniform(-LOCATION_TTL_JITTER, LOCATION_TTL_JITTER)
+    return now + LOCATION_TTL_SECONDS * (1 + jitter)
+
+
+# Coalesces concurrent fetches of the same profile across crawls
+profile_flights = SingleFlight()
+
+
+def _check_profiles(pending: dict[str, str], max_workers: int | None, priority: str) -> dict:
+    """
+    Fetch the profiles in *pending* (username → URL) concurrently.
 
-    # 1. Exact match
-    for key, code in COUNTRY_MAP:
-        if key == loc_lower:
-            return code
-
-    # 2. Substring match
-    for key, code in COUNTRY_MAP:
-        if key in loc_lower:
-            return code
-
-    # 3. Token-by-token (reversed — country typically at the end)
-    tokens = [p.strip() for p in loc_lower.replace(",", " ").split() if p.strip()]
-    for token in reversed(tokens):
-        for key, code in COUNTRY_MAP:
-            if key == token:
-                return code
+    Returns ``{username: (location, error)}`` where *error* is the
+    ``GitHubError`` of a failed fetch, else None.
+    """
+    def check(item):
+        username, url = item
         try:
-            results = pycountry.countries.search_fuzzy(token)
-            if results:
-                return results[0].alpha_2.lower()
-        except LookupError:
-            pass
+            # Concurrent crawls of repos sharing this user fetch the profile once
+            location = profile_flights.run(
+                username, lambda: fetch_profile_location(url, username, priority)
+            )
+            return location, None
+        except GitHubError as exc:
+            logger.warning("Could not fetch profile for %s: %s", username, exc)
+            return None, exc
+
+    workers = max(1, min(max_workers or PROFILE_FETCH_WORKERS, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(pending, pool.map(timing.propagate(check), pending.items())))
+
+
+# Coalesces concurrent crawls of the same repo within this process
+contributor_flights = SingleFlight()
+
+# Background refreshes of stale entries; repos queued or running are tracked
+# so a burst of stale hits schedules one refresh
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="repo-refresh")
+_scheduled_refreshes: set[str] = set()
+_scheduled_lock = threading.Lock()
+
+def _entry_ttl(entry: dict) -> float:
+    """Freshness lifetime of a repo entry (short for partially crawled ones)."""
+    return LOCATION_ERROR_TTL_SECONDS if entry.get("partial") else CACHE_TTL_SECONDS
+
+
+# Cache status reported alongside contributor lists (nginx vocabulary)
+CACHE_HIT = "HIT"        # fresh entry
+CACHE_STALE = "STALE"    # expired entry served, refresh running in background
+CACHE_MISS = "MISS"      # no usable entry, crawled (or joined a crawl)
+CACHE_BYPASS = "BYPASS"  # refresh forced by the caller
+
+
+def get_repo_entry(
+    repo_name: str,
+    force_refresh: bool = False,
+    max_workers: int | None = None,
+) -> tuple[dict, str]:
+    """
+    Fetch the cached entry for *repo_name*, crawling GitHub as needed.
+
+    Results are cached in the cache store for CACHE_TTL_SECONDS (24 h). Pass
+    ``force_refresh=True`` to bypass the cache and re-fetch from GitHub.
+    Profiles of new contributors, and of known ones whose jittered
+    LOCATION_TTL_SECONDS re-check is due, are fetched on up to
+    *max_workers* threads (default ``PROFILE_FETCH_WORKERS``); everyone
+    else keeps their stored location. A failed fetch keeps the previous
+    location and is retried after LOCATION_ERROR_TTL_SECONDS. Output
+    order follows the contributors list regardless.
+
+    Once an entry expires it is still returned for up to
+    CACHE_MAX_STALE_SECONDS while a background worker refreshes it; only
+    missing or older entries make the caller wait for a crawl. Background
+    refreshes run at ``BACKGROUND`` priority and give way when the GitHub
+    rate-limit budget runs low. A forced refresh within
+    REFRESH_COOLDOWN_SECONDS of the last crawl is served from the cache.
+
+    Profiles the rate-limit budget cannot cover are skipped; the entry is
+    then marked partial and expires after LOCATION_ERROR_TTL_SECONDS, as
+    it is when a profile fetch fails or a user's earlier failed fetch is
+    still waiting for its retry.
+
+    Contributors pages are stored with their validators and re-requested
+    conditionally, so an unchanged page costs a 304 and no rate limit.
+    If a contributors page still fails after the client's retries, the
+    previously cached list is returned when there is one; otherwise
+    ``GitHubError`` propagates. A partial list is never cached.
+
+    Concurrent calls for the same repo are coalesced: one caller crawls
+    while the others (in this process, or in other workers via a lock
+    file) wait for and reuse its result.
+
+    Returns ``(entry, cache_status)``. The entry's ``data`` lists the
+    contributors as dicts with keys ``login`` (str) and ``location``
+    (str | None); ``counts`` holds their per-country totals as of
+    ``counts_version`` (see ``get_country_counts``). The status is one of
+    ``CACHE_HIT``, ``CACHE_STALE``, ``CACHE_MISS`` or ``CACHE_BYPASS``.
+    """
+    requested_at = time.time()
+    cached_entry = repo_cache.get(repo_name)
+    if cached_entry:
+        age = requested_at - cached_entry["timestamp"]
+        if force_refresh and age < REFRESH_COOLDOWN_SECONDS:
+            logger.info("Ignoring refresh of %s crawled %.0fs ago", repo_name, age)
+            force_refresh = False
+        if not force_refresh:
+            if age < _entry_ttl(cached_entry):
+                CACHE_LOOKUPS.inc(cache="repo_cache", result="hit")
+                return cached_entry, CACHE_HIT
+            if age < _entry_ttl(cached_entry) + CACHE_MAX_STALE_SECONDS:
+                CACHE_LOOKUPS.inc(cache="repo_cache", result="stale")
+                schedule_refresh(repo_name)
+                return cached_entry, CACHE_STALE
+
+    status = CACHE_BYPASS if force_refresh else CACHE_MISS
+    CACHE_LOOKUPS.inc(cache="repo_cache", result=status.lower())
+    with timing.stage("crawl"):
+        entry = contributor_flights.run(
+            repo_name,
+            lambda: _refresh_contributors(repo_name, requested_at, force_refresh, max_workers),
+        )
+    return entry, status
 
-    # 4. Full-string pycountry fallback
+
+def get_contributors(
+    repo_name: str,
+    force_refresh: bool = False,
+    max_workers: int | None = None,
+) -> tuple[list[dict], str]:
+    """``get_repo_entry`` returning ``(users, cache_status)``."""
+    entry, status = get_repo_entry(repo_name, force_refresh, max_workers)
+    return entry["data"], status
+
+
+def get_country_counts(repo_name: str, force_refresh: bool = False) -> tuple[dict[str, int], str]:
+    """
+    Return ``({country_code: contributors}, cache_status)`` for *repo_name*.
+
+    Counts are computed when an entry is crawled and stored with it, so a
+    warm request does no per-contributor work. Entries counted under
+    different resolver rules (or before counts were stored) are recounted
+    once and written back.
+    """
+    entry, status = get_repo_entry(repo_name, force_refresh)
+    if entry.get("counts_version") != get_resolver().version:
+        entry = _with_counts(entry)
+        stored = repo_cache.get(repo_name)
+        # Don't clobber an entry a concurrent crawl just replaced
+        if stored and stored["timestamp"] == entry["timestamp"]:
+            repo_cache[repo_name] = entry
+            cache_store.flush()
+    return entry["counts"], status
+
+
+def get_all_contributors(
+    repo_name: str,
+    force_refresh: bool = False,
+    max_workers: int | None = None,
+) -> list[dict]:
+    """``get_repo_entry`` returning just the users."""
+    return get_contributors(repo_name, force_refresh, max_workers)[0]
+
+
+def schedule_refresh(repo_name: str) -> bool:
+    """
+    Refresh *repo_name* on a background worker unless one is already queued.
+
+    Returns True if a refresh was scheduled. The crawl joins any in-flight
+    crawl of the same repo, and failures are logged — the stale entry stays.
+    """
+    with _scheduled_lock:
+        if repo_name in _scheduled_refreshes:
+            return False
+        _scheduled_refreshes.add(repo_name)
+
+    requested_at = time.time()
+
+    def refresh():
+        try:
+            contributor_flights.run(
+                repo_name,
+                lambda: _refresh_contributors(repo_name, requested_at, False, None, BACKGROUND),
+            )
+        except Exception:
+            logger.exception("Background refresh of %s failed", repo_name)
+        finally:
+            with _scheduled_lock:
+                _scheduled_refreshes.discard(repo_name)
+
+    _refresh_pool.submit(refresh)
+    return True
+
+
+def _refresh_contributors(
+    repo_name: str,
+    requested_at: float,
+    force_refresh: bool,
+    max_workers: int | None,
+    priority: str = INTERACTIVE,
+) -> dict:
+    """
+    Crawl *repo_name* while holding its cross-worker lock.
+
+    Another worker may have refreshed the repo while this one waited for
+    the lock; its entry is reused if it was written after *requested_at*
+    (or is simply still fresh, unless *force_refresh*).
+    """
+    with file_lock(LOCK_DIR, repo_name):
+        cached_entry = repo_cache.get(repo_name)
+        if cached_entry:
+            age = time.time() - cached_entry["timestamp"]
+            if cached_entry["timestamp"] >= requested_at or (
+                not force_refresh and age < _entry_ttl(cached_entry)
+            ):
+                return cached_entry
+        return _crawl_contributors(repo_name, cached_entry, max_workers, priority)
+
+
+def _last_page(resp) -> int | None:
+    """Page number of the response's ``Link: rel="last"``, or None without one."""
+    last = resp.links.get("last")
+    if not last:
+        return None
     try:
-        results = pycountry.countries.search_fuzzy(location)
-        if results:
-            return results[0].alpha_2.lower()
-    except LookupError:
-        for country in pycountry.countries:
-            if country.name.lower() in loc_lower:
-                return country.alpha_2.lower()
+        return int(parse_qs(urlsplit(last["url"]).query)["page"][0])
+    except (KeyError, ValueError):
+        return None
+
+
+def _fetch_contributors_page(
+    repo_name: str,
+    page: int,
+    stored: dict | None,
+    priority: str,
+):
+    """
+    Fetch one contributors page, conditional on its *stored* copy.
 
-    return None
+    Returns ``(page_entry, response)``; *page_entry* is None if GitHub
+    answered page 1 with an unexpected status (an empty or missing repo
+    has no contributors). Any later page raises ``GitHubError`` instead,
+    since stopping there would truncate the list.
+    """
+    url = f"{GITHUB_API_URL}/repos/{repo_name}/contributors"
+    resp = github.get(url, params={"per_page": CONTRIBUTORS_PER_PAGE, "page": page},
+                      headers=conditional_headers(stored), priority=priority)
+    if resp.status_code == 304 and stored:
+        return stored, resp
+    if resp.status_code == 200:
+        try:
+            items = [{"login": c["login"], "url": c["url"]} for c in resp.json()]
+        except (ValueError, LookupError, TypeError):
+            raise GitHubError(f"GET {url} page {page} returned an unreadable page") from None
+        return {**response_validators(resp), "items": items}, resp
+    if page > 1:
+        raise GitHubError(f"GET {url} page {page} returned HTTP {resp.status_code}")
+    logger.warning("GitHub contributors API returned %s for %s", resp.status_code, repo_name)
+    return None, resp
+
+
+def _fetch_contributors_pages(
+    repo_name: str,
+    cached_pages: list[dict],
+    max_workers: int | None,
+    priority: str,
+) -> list[dict]:
+    """
+    Fetch every contributors page of *repo_name*, in order.
+
+    Page 1's ``Link: rel="last"`` header — or, when page 1 is unchanged,
+    the number of stored pages — gives the page count up front, so pages
+    2..last are fetched concurrently. If the last of them is still full
+    the list grew in the meantime, and later pages follow one at a time.
+    Raises ``GitHubError`` if any page fails.
+    """
+    def fetch(page):
+        stored = cached_pages[page - 1] if page <= len(cached_pages) else None
+        return _fetch_contributors_page(repo_name, page, stored, priority)[0]
+
+    first, resp = _fetch_contributors_page(
+        repo_name, 1, cached_pages[0] if cached_pages else None, priority
+    )
+    last = _last_page(resp)
+    if last is None:
+        last = len(cached_pages) if resp.status_code == 304 else 1
+
+    batch = [first]
+    if first and len(first["items"]) == CONTRIBUTORS_PER_PAGE and last > 1:
+        workers = max(1, min(max_workers or PROFILE_FETCH_WORKERS, last - 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batch.extend(pool.map(timing.propagate(fetch), range(2, last + 1)))
+
+    pages: list[dict] = []
+    while True:
+        for entry in batch:
+            if entry is None:
+                return pages
+            pages.append(entry)
+            if len(entry["items"]) < CONTRIBUTORS_PER_PAGE:
+                return pages
+        batch = [fetch(len(pages) + 1)]
+
+
+def _crawl_contributors(
+    repo_name: str,
+    cached_entry: dict | None,
+    max_workers: int | None,
+    priority: str = INTERACTIVE,
+) -> dict:
+    """Fetch the contributors list and profiles from GitHub; cache and return the entry."""
+    now = time.time()
+
+    # --- Fetch contributors pages (conditional on stored pages) ---
+    cached_pages = cached_entry.get("pages", []) if cached_entry else []
+    try:
+        pages = _fetch_contributors_pages(repo_name, cached_pages, max_workers, priority)
+    except GitHubError as exc:
+        if cached_entry:
+            logger.error("Error fetching contributors for %s, serving cached list: %s", repo_name, exc)
+            return cached_entry
+        raise
+    contributors = [item for page in pages for item in page["items"]]
+
+    # --- Fetch new profiles and re-check due ones (each login once) ---
+    logins = [contributor["login"].lower() for contributor in contributors]
+    known = user_locations.get_many(logins)
+    checks = user_checks.get_many(logins)
+
+    pending: dict[str, str] = {}
+    unscheduled: dict[str, dict] = {}
+    for username, contributor in zip(logins, contributors):
+        if username in pending or username in unscheduled:
+            continue
+        check = checks.get(username)
+        if check is not None:
+            due = check["next"] <= now
+        elif username in known:
+            # Cached before re-checks existed: spread their first re-check out
+            unscheduled[username] = {"next": now + random.uniform(0, LOCATION_TTL_SECONDS), "error": False}
+            due = False
+        else:
+            due = True
+        if due:
+            pending[username] = contributor["url"]
+
+    # Stored locations used as they are (hit), re-checked (stale) or missing (miss)
+    missing = sum(username not in known for username in pending)
+    CACHE_LOOKUPS.inc(len(set(logins)) - len(pending), cache="user_locations", result="hit")
+    CACHE_LOOKUPS.inc(len(pending) - missing, cache="user_locations", result="stale")
+    CACHE_LOOKUPS.inc(missing, cache="user_locations", result="miss")
+
+    # Defer what the rate-limit budget can't cover; new users come first
+    deferred = 0
+    budget = github.budget.available(priority)
+    if budget is not None and len(pending) > budget:
+        order = sorted(pending, key=lambda username: username in known)
+        deferred = len(pending) - budget
+        pending = {username: pending[username] for username in order[:budget]}
+        logger.warning("Rate-limit budget low: deferring %s profile fetches for %s", deferred, repo_name)
+
+    failed = 0
+    if pending:
+        fetched: dict[str, str | None] = {}
+        scheduled: dict[str, dict] = {}
+        for username, (location, error) in _check_profiles(pending, max_workers, priority).items():
+            if error is None:
+                fetched[username] = location
+                scheduled[username] = {"next": _next_location_check(now), "error": False}
+            else:
+                # Keep any previous location; retry soon rather than caching the failure
+                failed += 1
+                retry_at = now + LOCATION_ERROR_TTL_SECONDS
+                if isinstance(error, RateLimitError):
+                    retry_at = max(retry_at, error.reset_at)
+                scheduled[username] = {"next": retry_at, "error": True}
+        user_locations.update_many(fetched)
+        unscheduled.update(scheduled)
+        known.update(fetched)
+    user_checks.update_many(unscheduled)
+
+    logger.info(
+        "Crawled %s: %s contributors, %s profiles fetched, %s failed, %s deferred",
+        repo_name, len(logins), len(pending), failed, deferred,
+    )
+
+    # Users whose last fetch failed (in another crawl) and whose retry is not due yet
+    awaiting = sum(
+        username not in known and username not in pending and bool((checks.get(username) or {}).get("error"))
+        for username in set(logins)
+    )
+
+    # --- Assemble users in contributors order ---
+    users_data = [{"login": username, "location": known.get(username)} for username in logins]
+
+    entry = _with_counts({"timestamp": now, "data": users_data, "pages": pages})
+    if failed or deferred or awaiting:
+        entry["partial"] = True
+    repo_cache[repo_name] = entry
+    cache_store.flush()
+
+    return entry
 
 
 # ---------------------------------------------------------------------------
-# GitHub API
+# Aggregates (several repos, one heatmap)
 # ---------------------------------------------------------------------------
 
-def get_all_contributors(repo_name: str, force_refresh: bool = False) -> list[dict]:
+# Coalesces concurrent recomputation of the same aggregate
+aggregate_flights = SingleFlight()
+
+
+def list_org_repos(org: str) -> list[str]:
     """
-    Fetch all contributors for *repo_name*, including their profile locations.
+    Full names of *org*'s public, non-fork repos, most recently pushed first.
 
-    Results are cached to disk for CACHE_TTL_SECONDS (24 h). Pass
-    ``force_refresh=True`` to bypass the cache and re-fetch from GitHub.
+    Cached in ``org_cache`` for CACHE_TTL_SECONDS. Returns an empty list
+    for an unknown org; raises ``GitHubError`` if a page fails.
+    """
+    key = org.lower()
+    cached = org_cache.get(key)
+    if cached and time.time() - cached["timestamp"] < CACHE_TTL_SECONDS:
+        return cached["repos"]
+
+    url = f"{GITHUB_API_URL}/orgs/{org}/repos"
+    repos: list[str] = []
+    page = 1
+    while True:
+        resp = github.get(url, params={
+            "type": "public", "sort": "pushed", "per_page": CONTRIBUTORS_PER_PAGE, "page": page,
+        })
+        if resp.status_code == 404 and page == 1:
+            logger.warning("GitHub org repos API returned 404 for %s", org)
+            break
+        if resp.status_code != 200:
+            # Never cache a truncated listing
+            raise GitHubError(f"GET {url} page {page} returned HTTP {resp.status_code}")
+        try:
+            items = resp.json()
+            repos.extend(item["full_name"] for item in items if not item.get("fork"))
+        except (ValueError, LookupError, TypeError, AttributeError):
+            raise GitHubError(f"GET {url} page {page} returned an unreadable page") from None
+        if len(items) < CONTRIBUTORS_PER_PAGE:
+            break
+        page += 1
 
-    Each returned dict has keys: ``login`` (str), ``location`` (str | None).
+    org_cache[key] = {"timestamp": time.time(), "repos": repos}
+    cache_store.flush()
+    return repos
+
+
+def get_aggregate_counts(
+    key: str,
+    repos: list[str],
+    force_refresh: bool = False,
+) -> tuple[dict[str, int], str]:
     """
-    now = time.time()
+    Country counts across *repos*, each contributor counted once.
+
+    Repo entries come from ``get_repo_entry`` (crawled in parallel, so
+    contributors shared between repos reuse ``user_locations``); the
+    merged counts are cached in ``aggregate_cache`` under *key* for
+    CACHE_TTL_SECONDS. Pass ``force_refresh=True`` to re-merge the repos'
+    current entries. Repos that fail are left out and the aggregate expires
+    early, like a partial repo entry; if every repo fails, the first error
+    propagates.
 
+    Returns ``(counts, cache_status)``.
+    """
+    cached = aggregate_cache.get(key)
     if (
         not force_refresh
-        and repo_name in repo_cache
-        and now - repo_cache[repo_name]["timestamp"] < CACHE_TTL_SECONDS
+        and cached
+        and cached.get("counts_version") == get_resolver().version
+        and time.time() - cached["timestamp"] < _entry_ttl(cached)
     ):
-        return repo_cache[repo_name]["data"]
+        return cached["counts"], CACHE_HIT
 
-    headers = {"Accept": "application/vnd.github+json"}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    aggregate = aggregate_flights.run(key, lambda: _build_aggregate(key, repos))
+    return aggregate["counts"], CACHE_BYPASS if force_refresh else CACHE_MISS
 
-    # --- Paginate contributors endpoint ---
-    contributors: list[dict] = []
-    page = 1
-    while True:
-        url = (
-            f"https://api.github.com/repos/{repo_name}/contributors"
-            f"?per_page=100&page={page}"
-        )
-        try:
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code != 200:
-                logger.warning("GitHub contributors API returned %s for %s", resp.status_code, repo_name)
-                break
-            page_data = resp.json()
-            if not page_data:
-                break
-            contributors.extend(page_data)
-            if len(page_data) < 100:
-                break
-            page += 1
-        except requests.RequestException as exc:
-            logger.error("Error fetching contributors page %s: %s", page, exc)
-            break
 
-    # --- Resolve locations (with per-user cache) ---
-    users_data: list[dict] = []
-    for contributor in contributors:
-        username = contributor["login"].lower()
-        if username in user_locations:
-            location = user_locations[username]
-        else:
-            location = None
-            try:
-                u_resp = requests.get(contributor["url"], headers=headers, timeout=10)
-                if u_resp.status_code == 200:
-                    location = u_resp.json().get("location")
-            except requests.RequestException as exc:
-                logger.warning("Could not fetch profile for %s: %s", username, exc)
-            user_locations[username] = location
-
-        users_data.append({"login": username, "location": location})
-
-    save_json(LOCATION_CACHE_FILE, user_locations)
-    repo_cache[repo_name] = {"timestamp": now, "data": users_data}
-    save_json(CACHE_FILE, repo_cache)
-
-    return users_data
+def _build_aggregate(key: str, repos: list[str]) -> dict:
+    """Merge the entries of *repos* into a cached aggregate."""
+    now = time.time()
+    workers = max(1, min(AGGREGATE_FETCH_WORKERS, len(repos)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(timing.propagate(get_repo_entry), repo) for repo in repos]
+
+    # login → location, first repo wins (users carry the same location everywhere)
+    locations: dict[str, str | None] = {}
+    errors: list[GitHubError] = []
+    for repo, future in zip(repos, futures):
+        try:
+            entry, _ = future.result()
+        except GitHubError as exc:
+            logger.warning("Leaving %s out of aggregate %s: %s", repo, key, exc)
+            errors.append(exc)
+            continue
+        for user in entry["data"]:
+            locations.setdefault(user["login"], user["location"])
+    if repos and len(errors) == len(repos):
+        raise errors[0]
+
+    aggregate = {
+        "timestamp": now,
+        "repos": repos,
+        "contributors": len(locations),
+        "counts": count_countries([{"location": location} for location in locations.values()]),
+        "counts_version": get_resolver().version,
+    }
+    if errors:
+        aggregate["partial"] = True
+    aggregate_cache[key] = aggregate
+    cache_store.flush()
+    return aggregate
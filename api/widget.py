@@ -7,16 +7,40 @@ Two render variants are supported:
   - render_map_with_list   map + top-countries leaderboard sidebar
 """
 
+import functools
+import gzip
+import hashlib
+import json
 import logging
 import math
 import os
+import re
+import time
 
 from flask import Blueprint, request, Response
 from lxml import etree
 
-from utils import get_all_contributors, resolve_country_code
+from github_client import RateLimitError
+from map_lod import DETAIL_LEVELS, LOD_LEVELS, build_lod, compact_path, lod_path
+import metrics
+import profiling
+import snapshot
+import timing
+from utils import (
+    CACHE_LOOKUPS,
+    MAX_AGGREGATE_REPOS,
+    LRUCache,
+    get_aggregate_counts,
+    get_country_counts,
+    list_org_repos,
+)
 from data import COUNTRY_NAMES
 
+try:
+    import brotli
+except ImportError:  # optional — responses fall back to gzip
+    brotli = None
+
 logger = logging.getLogger(__name__)
 
 widget_bp = Blueprint("widget", __name__)
@@ -25,45 +49,142 @@ widget_bp = Blueprint("widget", __name__)
 _VALID_THEMES = {"light", "dark"}
 _VALID_VARIANTS = {"map", "list"}
 
-def get_color(count, max_count):
-    """Returns an interpolated blue shade from light to dark blue."""
-    if count == 0:
-        return "#ffffff"
-    
+# Map elements that get a heatmap fill / outline class when cloned
+_SHAPE_TAGS = ('path', 'polygon', 'circle', 'rect')
+
+
+class NotFound(Exception):
+    """A request names something with nothing to render (answered with 404)."""
+
+# Rendered SVGs kept in memory, keyed by their ETag digest
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))
+# Optional on-disk tier shared by workers; unset disables it
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "")
+RENDER_CACHE_DISK_FILES = 1024
+
+# How the map layers are drawn:
+#   inline   both layers carry a full copy of every country shape
+#   symbols  shapes are defined once in <defs> and drawn by two <use>
+#            references; fill colors come from a generated stylesheet
+MAP_RENDER_MODES = ("inline", "symbols")
+MAP_RENDER_MODE = os.getenv("MAP_RENDER_MODE", "inline")
+if MAP_RENDER_MODE not in MAP_RENDER_MODES:
+    MAP_RENDER_MODE = "inline"
+
+# Quantize fills into this many shades per theme; 0 keeps continuous colors
+COLOR_BUCKETS = max(0, int(os.getenv("COLOR_BUCKETS", "0")))
+
+# Serialize cards without indentation, with trimmed numbers and minified CSS
+COMPACT_SVG = os.getenv("COMPACT_SVG", "0") == "1"
+
+# Report per-stage timings in a Server-Timing header (and an INFO log line)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# Metrics (see metrics.py); /api/metrics serves them when METRICS=1
+RENDER_SECONDS = metrics.Histogram(
+    "heatmap_render_seconds", "Time to render one SVG on a render-cache miss.", ("variant",)
+)
+REQUEST_SECONDS = metrics.Histogram(
+    "heatmap_request_seconds",
+    "Heatmap response time, by endpoint and contributor-cache status (none: no counts).",
+    ("endpoint", "cache"),
+)
+RESPONSES = metrics.Counter("heatmap_responses_total", "Heatmap responses by endpoint and status.",
+                            ("endpoint", "status"))
+
+# Map level of detail (see map_lod.py) used when a request names none
+MAP_DETAIL = os.getenv("MAP_DETAIL", "full")
+if MAP_DETAIL not in DETAIL_LEVELS:
+    MAP_DETAIL = "full"
+# A ``width`` request picks the coarsest level whose simplification error
+# stays below this many CSS pixels at that width
+MAX_LOD_ERROR_PX = 0.5
+# Card width and the box the map is fitted into, per variant (viewBox units)
+_MAP_LAYOUT = {"map": (920, 840, 370), "list": (1200, 620, 370)}
+
+_CACHE_CONTROL = "public, max-age=0, s-maxage=86400, stale-while-revalidate=86400"
+
+# Response encodings in order of preference: name -> (file suffix, compressor).
+# Every render-cache miss compresses in the request, so levels favour speed:
+# brotli 5 / gzip 6 take ~10 ms on a card where brotli 11 took ~500 ms, for
+# output only ~15% larger
+_ENCODINGS = {"gzip": (".gz", lambda data: gzip.compress(data, compresslevel=6, mtime=0))}
+if brotli is not None:
+    _ENCODINGS = {"br": (".br", lambda data: brotli.compress(data, quality=5)), **_ENCODINGS}
+
+rendered_svgs = LRUCache(RENDER_CACHE_SIZE)
+
+# (empty fill, lowest-count rgb, highest-count rgb) per theme
+_COLOR_RAMPS = {
+    "light": ("#ffffff", (147, 197, 253), (30, 64, 175)),
+    # Dull, washed-out slate blue for lowest counts, blending up to vibrant blue
+    "dark": ("#1e293b", (40, 65, 100), (88, 166, 255)),
+}
+
+
+def color_intensity(count, max_count):
+    """Log-scaled position of *count* on the color ramp, 0.0 to 1.0."""
     if max_count > 1:
-        intensity = math.log(count) / math.log(max_count) if count > 1 else 0
-    else:
-        intensity = 0
-    
-    start_r, start_g, start_b = 147, 197, 253
-    end_r, end_g, end_b = 30, 64, 175
-    
+        return math.log(count) / math.log(max_count) if count > 1 else 0
+    return 0
+
+
+def _ramp_color(theme, intensity):
+    _, (start_r, start_g, start_b), (end_r, end_g, end_b) = _COLOR_RAMPS[theme]
+
     r = int(start_r + (end_r - start_r) * intensity)
     g = int(start_g + (end_g - start_g) * intensity)
     b = int(start_b + (end_b - start_b) * intensity)
-    
+
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
+def get_color(count, max_count):
+    """Returns an interpolated blue shade from light to dark blue."""
+    if count == 0:
+        return _COLOR_RAMPS["light"][0]
+    return _ramp_color("light", color_intensity(count, max_count))
+
+
 def get_color_dark(count, max_count):
     """Returns an interpolated blue shade for dark mode (Nice Dark)."""
     if count == 0:
-        return "#1e293b"
-    
-    if max_count > 1:
-        intensity = math.log(count) / math.log(max_count) if count > 1 else 0
-    else:
-        intensity = 0
-    
-    # Dull, washed-out slate blue for lowest counts, blending up to vibrant blue
-    start_r, start_g, start_b = 40, 65, 100 
-    end_r, end_g, end_b = 88, 166, 255
-    
-    r = int(start_r + (end_r - start_r) * intensity)
-    g = int(start_g + (end_g - start_g) * intensity)
-    b = int(start_b + (end_b - start_b) * intensity)
-    
-    return f"#{r:02x}{g:02x}{b:02x}"
+        return _COLOR_RAMPS["dark"][0]
+    return _ramp_color("dark", color_intensity(count, max_count))
+
+
+class ColorBuckets:
+    """
+    A theme's color ramp quantized into *size* precomputed shades.
+
+    Bucket 0 is the empty fill; buckets 1..size step evenly along the ramp.
+    Shapes reference a bucket by class (``b<n>``), so a render only maps
+    each country to a bucket index and the palette is emitted once as CSS.
+    """
+
+    def __init__(self, theme, size):
+        if size < 1:
+            raise ValueError("ColorBuckets needs at least one bucket")
+        self.size = size
+        self.colors = [_COLOR_RAMPS[theme][0]] + [
+            _ramp_color(theme, i / (size - 1) if size > 1 else 0) for i in range(size)
+        ]
+
+    def bucket(self, count, max_count):
+        """Bucket index for *count*; 0 means no contributors."""
+        if count == 0:
+            return 0
+        return 1 + round(color_intensity(count, max_count) * (self.size - 1))
+
+    def css(self):
+        """Palette rules, one ``.b<n>`` class per bucket."""
+        return "".join(f".b{i}{{fill:{color}}}" for i, color in enumerate(self.colors))
+
+
+@functools.lru_cache(maxsize=8)
+def get_color_buckets(theme, size):
+    """Build the bucket palette for *theme* once and reuse it afterwards."""
+    return ColorBuckets(theme, size)
 
 
 def get_country_name(code):
@@ -72,14 +193,33 @@ def get_country_name(code):
     return COUNTRY_NAMES.get(code_upper, code_upper)
 
 
-def load_map_svg():
-    """Load and parse the SirLisko map SVG."""
-    svg_path = os.path.join(os.path.dirname(__file__), 'static', 'sirlisko-world-map.svg')
+def load_map_svg(detail="full"):
+    """Load and parse the SirLisko map SVG at *detail*, simplifying it if the file is missing."""
+    svg_path = lod_path(detail)
     parser = etree.XMLParser(remove_blank_text=True)
+    if detail != "full" and not os.path.exists(svg_path):
+        logger.warning("Map level %s missing (%s) — simplifying the full map.", detail, svg_path)
+        return etree.fromstring(build_lod(detail), parser)
     orig_tree = etree.parse(svg_path, parser)
     return orig_tree.getroot()
 
 
+def node_country_code(node):
+    """Return the lowercase ISO code a map shape is tagged with, or None."""
+    node_id = node.get('id', '').lower()
+    if not node_id:
+        node_id = node.get('data-id', '').lower()
+
+    clean_id = node_id.lstrip('_')
+    if len(clean_id) == 2:
+        return clean_id
+    if len(clean_id) > 2:
+        for p in clean_id.split():
+            if len(p) == 2:
+                return p
+    return None
+
+
 def clone_elements(source, target, is_outline, country_counts, max_count, color_fn=get_color, empty_fill='#ffffff'):
     """Clone SVG elements with heatmap coloring."""
     if not isinstance(source.tag, str): return
@@ -94,26 +234,12 @@ def clone_elements(source, target, is_outline, country_counts, max_count, color_
     if 'transform' in source.attrib:
         new_node.set('transform', source.attrib['transform'])
         
-    node_id = source.get('id', '').lower()
-    if not node_id:
-        node_id = source.get('data-id', '').lower()
-    
-    clean_id = node_id.lstrip('_')
-    
-    if tag in ['path', 'polygon', 'circle', 'rect']:
+    if tag in _SHAPE_TAGS:
         if is_outline:
             new_node.set('class', 'country-outline')
         else:
             new_node.set('class', 'country-fill')
-            found_code = None
-            if len(clean_id) == 2: found_code = clean_id
-            elif len(clean_id) > 2:
-                parts = clean_id.split()
-                for p in parts:
-                    if len(p) == 2:
-                        found_code = p
-                        break
-            
+            found_code = node_country_code(source)
             if found_code:
                 count = country_counts.get(found_code, 0)
                 new_node.set('fill', color_fn(count, max_count))
@@ -124,8 +250,336 @@ def clone_elements(source, target, is_outline, country_counts, max_count, color_
         clone_elements(child, new_node, is_outline, country_counts, max_count, color_fn, empty_fill)
 
 
-def render_map_only(country_counts, theme='light'):
-    """Render map-only variant (compact)."""
+# Country codes usable verbatim in CSS class and custom property names
+_CSS_CODE = re.compile(r"[a-z]{2}")
+
+
+def clone_geometry(source, target):
+    """Clone map shapes without paint; coded shapes get a ``c-<code>`` class."""
+    if not isinstance(source.tag, str): return
+    if source.tag.endswith('}title') or source.tag.endswith('}desc'): return
+
+    tag = source.tag.split('}', 1)[1] if '}' in source.tag else source.tag
+    new_node = etree.SubElement(target, tag)
+
+    for k, v in source.attrib.items():
+        if k not in ['fill', 'style', 'class', 'stroke', 'transform']: new_node.set(k, v)
+
+    if 'transform' in source.attrib:
+        new_node.set('transform', source.attrib['transform'])
+
+    if tag in _SHAPE_TAGS:
+        found_code = node_country_code(source)
+        if found_code and _CSS_CODE.fullmatch(found_code):
+            new_node.set('class', f'c-{found_code}')
+
+    for child in source:
+        clone_geometry(child, new_node)
+
+
+# ---------------------------------------------------------------------------
+# Precompiled map template
+# ---------------------------------------------------------------------------
+
+# Sentinels written into the template tree and split out after serialization
+_TRANSFORM_SLOT = "__map_transform__"
+_FILL_SLOT = "__map_fill__"
+
+# Placeholder elements the renderers leave in the card for the map layers
+_FILLS_PLACEHOLDER = b'<g id="__map_fills__"/>'
+_OUTLINES_PLACEHOLDER = b'<g id="__map_outlines__"/>'
+
+# Id of the shared map geometry in symbols mode
+_GEOMETRY_ID = "map-geometry"
+
+# Paint of a fill-layer shape; bucketed renders swap it for a bucket class
+_FILL_SHAPE_PAINT = f'class="country-fill" fill="{_FILL_SLOT}"'.encode()
+
+_SVG_NS = "{http://www.w3.org/2000/svg}"
+
+# Indentation between tags; the map layers hold no text content
+_TAG_WHITESPACE = re.compile(rb">\s+<")
+_CSS_WHITESPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{};:,])\s*")
+
+
+def _num(value):
+    """Compact number for SVG attributes: at most 4 decimals, no trailing zeros."""
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def compact_map(root):
+    """
+    Copy of the map *root* without editor data and with minified path data.
+
+    Drops elements outside the SVG namespace, ``<metadata>`` and namespaced
+    (editor) attributes; they are never rendered.
+    """
+    root = etree.fromstring(etree.tostring(root))
+    for node in list(root.iter()):
+        if not isinstance(node.tag, str):
+            continue
+        if not node.tag.startswith(_SVG_NS) or node.tag == f"{_SVG_NS}metadata":
+            node.getparent().remove(node)
+            continue
+        for key in [key for key in node.attrib if key.startswith("{")]:
+            del node.attrib[key]
+        if node.tag == f"{_SVG_NS}path" and node.get("d"):
+            node.set("d", compact_path(node.get("d")))
+    return root
+
+
+@functools.lru_cache(maxsize=32)
+def minify_css(css):
+    """Strip insignificant whitespace and final semicolons from a stylesheet."""
+    css = _CSS_PUNCTUATION.sub(r"\1", _CSS_WHITESPACE.sub(" ", css)).strip()
+    return css.replace(";}", "}")
+
+
+class MapTemplate:
+    """
+    The world map pre-serialized into byte fragments, built once per process.
+
+    Both map layers are cloned exactly as ``clone_elements`` would clone them
+    and serialized in the same document order the renderers use, so the
+    namespace prefixes lxml generates line up. The fill layer is then split
+    at every shape's ``fill`` attribute; rendering only joins the static
+    chunks with per-country colors.
+
+    For symbols mode the geometry is also serialized once, unpainted, for
+    ``render_symbols`` to reference from both layers. A *compact* template
+    is built from ``compact_map(root)`` and drops the indentation between
+    tags from every chunk.
+
+    Attributes:
+      viewbox        (ox, oy, ow, oh) of the source map
+      codes          ISO code (or None) of every fill slot, in document order
+      symbol_codes   codes that have a ``c-<code>`` class in the geometry
+    """
+
+    # Bump when a change to the template code changes its output; keys the
+    # templates in the startup snapshot (see snapshot.py)
+    FORMAT = 1
+
+    def __init__(self, root, compact=False):
+        self.viewbox = self._parse_viewbox(root)
+        if compact:
+            root = compact_map(root)
+
+        container = etree.Element("svg")
+        layers = []
+        for is_outline in (False, True):
+            layer = etree.SubElement(container, "g", transform=_TRANSFORM_SLOT)
+            for child in root:
+                clone_elements(child, layer, is_outline, {}, 1,
+                               lambda count, max_count: _FILL_SLOT, _FILL_SLOT)
+            layers.append(layer)
+
+        self.codes = [
+            node_country_code(node)
+            for node in layers[0].iter()
+            if node.get('fill') == _FILL_SLOT
+        ]
+
+        serialized = etree.tostring(container, pretty_print=True, encoding="utf-8")
+        start = serialized.index(b'<g transform="')
+        split = serialized.index(b'\n  </g>', start) + len(b'\n  </g>')
+        second = serialized.index(b'<g transform="', split)
+        end = serialized.rindex(b'\n  </g>') + len(b'\n  </g>')
+
+        fills = serialized[start:split]
+        self._fills_head, fills = fills.split(_TRANSFORM_SLOT.encode(), 1)
+        self._fill_chunks = fills.split(f'fill="{_FILL_SLOT}"'.encode())
+        self._outlines_head, self._outlines_tail = (
+            serialized[second:end].split(_TRANSFORM_SLOT.encode(), 1)
+        )
+
+        self._bucket_chunks = fills.split(_FILL_SHAPE_PAINT)
+        if compact:
+            squeeze = functools.partial(_TAG_WHITESPACE.sub, b"><")
+            self._fills_head = squeeze(self._fills_head)
+            self._fill_chunks = [squeeze(chunk) for chunk in self._fill_chunks]
+            self._bucket_chunks = [squeeze(chunk) for chunk in self._bucket_chunks]
+            self._outlines_head = squeeze(self._outlines_head)
+            self._outlines_tail = squeeze(self._outlines_tail)
+
+        if len(self._fill_chunks) - 1 != len(self.codes) or len(self._bucket_chunks) != len(self._fill_chunks):
+            raise ValueError("Map template fill slots do not match shape codes")
+
+        geometry = etree.Element("g", id=_GEOMETRY_ID)
+        for child in root:
+            clone_geometry(child, geometry)
+        self._geometry = etree.tostring(geometry, encoding="utf-8")
+        self.symbol_codes = frozenset(
+            node.get('class')[2:] for node in geometry.iter() if node.get('class')
+        )
+
+    @staticmethod
+    def _parse_viewbox(root):
+        vb_str = root.get("viewBox")
+        if not vb_str and 'width' in root.attrib and 'height' in root.attrib:
+            vb_str = f"0 0 {root.attrib['width']} {root.attrib['height']}"
+        if vb_str:
+            vb = vb_str.replace(',', ' ').split()
+            return float(vb[0]), float(vb[1]), float(vb[2]), float(vb[3])
+        return 0, 0, 1000, 500
+
+    def render_fills(self, transform, country_counts, max_count, color_fn, empty_fill):
+        """Serialized fill layer with heatmap colors spliced into each shape."""
+        empty = f'fill="{empty_fill}"'.encode()
+        colors = {}
+        parts = [self._fills_head, transform.encode(), self._fill_chunks[0]]
+        for code, chunk in zip(self.codes, self._fill_chunks[1:]):
+            if code is None:
+                parts.append(empty)
+            else:
+                fill = colors.get(code)
+                if fill is None:
+                    fill = f'fill="{color_fn(country_counts.get(code, 0), max_count)}"'.encode()
+                    colors[code] = fill
+                parts.append(fill)
+            parts.append(chunk)
+        return b"".join(parts)
+
+    def render_bucket_fills(self, transform, country_counts, max_count, buckets):
+        """Serialized fill layer with a bucket class on each shape, plus the palette."""
+        classes = {}
+        parts = [f"<style>{buckets.css()}</style>".encode(),
+                 self._fills_head, transform.encode(), self._bucket_chunks[0]]
+        for code, chunk in zip(self.codes, self._bucket_chunks[1:]):
+            paint = classes.get(code)
+            if paint is None:
+                index = buckets.bucket(country_counts.get(code, 0), max_count) if code else 0
+                paint = classes[code] = f'class="country-fill b{index}"'.encode()
+            parts.append(paint)
+            parts.append(chunk)
+        return b"".join(parts)
+
+    def render_outlines(self, transform):
+        """Serialized outline layer under *transform*."""
+        return self._outlines_head + transform.encode() + self._outlines_tail
+
+    def render_symbols(self, transform, country_counts, max_count, color_fn, empty_fill, buckets=None):
+        """
+        Serialized ``(fill layer, outline layer)`` drawing the shared geometry.
+
+        The fill layer carries the geometry in ``<defs>`` and a stylesheet:
+        each counted country's shapes take ``fill: var(--<code>)`` (or
+        ``var(--b<n>)`` for its bucket), and the fill ``<use>`` defines those
+        variables. The outline ``<use>`` leaves them undefined, so its shapes
+        inherit its ``fill: none``.
+        """
+        counted = [(code, count) for code, count in sorted(country_counts.items()) if code in self.symbol_codes]
+        if buckets is None:
+            rules = "".join(f".c-{code}{{fill:var(--{code})}}" for code, _ in counted)
+            variables = "".join(f"--{code}:{color_fn(count, max_count)};" for code, count in counted)
+        else:
+            members = {}
+            for code, count in counted:
+                members.setdefault(buckets.bucket(count, max_count), []).append(f".c-{code}")
+            rules = "".join(
+                f"{','.join(selectors)}{{fill:var(--b{index})}}" for index, selectors in sorted(members.items())
+            )
+            variables = "".join(f"--b{i}:{color};" for i, color in enumerate(buckets.colors))
+        use = f'<use href="#{_GEOMETRY_ID}" transform="{transform}" class="%s"/>'
+        fills = b"".join([
+            f"<style>{rules}.map-fills{{fill:{empty_fill};{variables}}}</style>".encode(),
+            b"<defs>", self._geometry, b"</defs>",
+            (use % "country-fill map-fills").encode(),
+        ])
+        return fills, (use % "country-outline").encode()
+
+
+@functools.lru_cache(maxsize=2 * len(DETAIL_LEVELS))
+def get_map_template(detail="full", compact=False):
+    """
+    The world map template at *detail*, loaded on first use and reused
+    afterwards: from the startup snapshot (see snapshot.py) when it is
+    current, else compiled from the map file.
+    """
+    template = snapshot.load(_template_section(detail, compact), _template_snapshot_key())
+    if template is None:
+        template = MapTemplate(load_map_svg(detail), compact)
+    return template
+
+
+def _template_section(detail, compact):
+    return f"map-template:{detail}:{'compact' if compact else 'pretty'}"
+
+
+@functools.lru_cache(maxsize=1)
+def _template_snapshot_key():
+    """Identifies the template format and every map level."""
+    return snapshot.fingerprint(
+        f"MapTemplate/{MapTemplate.FORMAT}", paths=tuple(lod_path(detail) for detail in DETAIL_LEVELS),
+    )
+
+
+def snapshot_sections():
+    """Startup snapshot sections owned by this module (build-time)."""
+    return {
+        _template_section(detail, compact): (_template_snapshot_key(), MapTemplate(load_map_svg(detail), compact))
+        for detail in DETAIL_LEVELS
+        for compact in (False, True)
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _map_viewbox():
+    """``(ox, oy, ow, oh)`` of the full map, read from its root tag alone."""
+    for _, root in etree.iterparse(lod_path("full"), events=("start",)):
+        return MapTemplate._parse_viewbox(root)
+
+
+def pick_map_detail(variant, width=None):
+    """
+    Coarsest map level that looks the same as the full map at *width* CSS
+    pixels, or MAP_DETAIL when the width is unknown.
+    """
+    if not width:
+        return MAP_DETAIL
+    card_w, target_w, target_h = _MAP_LAYOUT[variant]
+    ox, oy, ow, oh = _map_viewbox()
+    px_per_unit = min(target_w / ow, target_h / oh) * width / card_w
+    for detail in reversed(DETAIL_LEVELS):
+        if detail == "full" or LOD_LEVELS[detail][0] * px_per_unit <= MAX_LOD_ERROR_PX:
+            return detail
+    return "full"
+
+
+def splice_map_layers(svg_bytes, template, transform, country_counts, max_count, color_fn, empty_fill,
+                      mode="inline", buckets=None):
+    """
+    Replace the map placeholders in a serialized card with the map layers.
+
+    *buckets* (a ``ColorBuckets``) switches fills from per-country colors
+    to quantized bucket classes.
+    """
+    head, rest = svg_bytes.split(_FILLS_PLACEHOLDER, 1)
+    middle, tail = rest.split(_OUTLINES_PLACEHOLDER, 1)
+    if mode == "symbols":
+        fills, outlines = template.render_symbols(transform, country_counts, max_count, color_fn, empty_fill,
+                                                  buckets)
+    else:
+        if buckets is None:
+            fills = template.render_fills(transform, country_counts, max_count, color_fn, empty_fill)
+        else:
+            fills = template.render_bucket_fills(transform, country_counts, max_count, buckets)
+        outlines = template.render_outlines(transform)
+    return b"".join([head, fills, middle, outlines, tail])
+
+
+def render_map_only(country_counts, theme='light', mode=None, detail=None, compact=None):
+    """
+    Render map-only variant (compact card).
+
+    *mode*, *detail* and *compact* default to MAP_RENDER_MODE, MAP_DETAIL
+    and COMPACT_SVG.
+    """
+    mode = mode or MAP_RENDER_MODE
+    detail = detail or MAP_DETAIL
+    compact = COMPACT_SVG if compact is None else compact
     max_count = max(country_counts.values()) if country_counts else 1
     total_countries = len(country_counts)
     is_dark = theme == 'dark'
@@ -152,9 +606,12 @@ def render_map_only(country_counts, theme='light'):
     divider_clr  = "#334155" if is_dark else "#cbd5e1"
     outline_clr  = "#334155"
     outline_op   = "1" if is_dark else "0.8"
+    # A <use> layer would apply opacity to all outlines at once; per-shape
+    # stroke opacity keeps overlapping borders as dark as inline shapes
+    outline_opacity = "stroke-opacity" if mode == "symbols" else "opacity"
 
     style_elem = etree.SubElement(final_svg, "style")
-    style_elem.text = f"""
+    css = f"""
         @import url('https://rsms.me/inter/inter.css');
         svg, text {{ -webkit-text-size-adjust: none; text-size-adjust: none; }}
         .card    {{ fill: {card_color}; }}
@@ -166,12 +623,13 @@ def render_map_only(country_counts, theme='light'):
         .divider {{ stroke: {divider_clr}; stroke-width: 1; }}
         .country-fill    {{ stroke: none; }}
         .country-outline {{ fill: none; stroke: {outline_clr}; stroke-width: 0.4;
-                           stroke-linejoin: round; pointer-events: none; opacity: {outline_op}; }}
+                           stroke-linejoin: round; pointer-events: none; {outline_opacity}: {outline_op}; }}
         @media (min-width: 600px) {{
             .title      {{ font-size: 24px; }}
             .badge-text {{ font-size: 14px; }}
         }}
     """
+    style_elem.text = minify_css(css) if compact else css
 
     etree.SubElement(final_svg, "rect", x="0", y="0",
                      width=str(card_w), height=str(card_h), rx="10",
@@ -200,15 +658,8 @@ def render_map_only(country_counts, theme='light'):
                      x1="40", y1="90", x2=str(card_w - 40), y2="90",
                      attrib={"class": "divider"})
 
-    orig_root = load_map_svg()
-    vb_str = orig_root.get("viewBox")
-    if not vb_str and 'width' in orig_root.attrib and 'height' in orig_root.attrib:
-         vb_str = f"0 0 {orig_root.attrib['width']} {orig_root.attrib['height']}"
-    if vb_str:
-        vb = vb_str.replace(',', ' ').split()
-        ox, oy, ow, oh = float(vb[0]), float(vb[1]), float(vb[2]), float(vb[3])
-    else:
-        ox, oy, ow, oh = 0, 0, 1000, 500
+    template = get_map_template(detail, compact)
+    ox, oy, ow, oh = template.viewbox
 
     target_w = card_w - 80
     target_h = card_h - 110
@@ -218,20 +669,35 @@ def render_map_only(country_counts, theme='light'):
 
     color_fn = get_color_dark if is_dark else get_color
     empty_fill = '#1e293b' if is_dark else '#ffffff'
+    buckets = get_color_buckets("dark" if is_dark else "light", COLOR_BUCKETS) if COLOR_BUCKETS else None
     
-    fills_container = etree.SubElement(final_svg, "g", transform=f"translate({tx}, {ty}) scale({scale})")
-    for child in orig_root: 
-        clone_elements(child, fills_container, False, country_counts, max_count, color_fn, empty_fill)
-    
-    outlines_container = etree.SubElement(final_svg, "g", transform=f"translate({tx}, {ty}) scale({scale})")
-    for child in orig_root: 
-        clone_elements(child, outlines_container, True, country_counts, max_count, color_fn, empty_fill)
+    # Map layers are spliced in from the precompiled template after serialization
+    if compact:
+        transform = f"translate({_num(tx)},{_num(ty)}) scale({_num(scale)})"
+    else:
+        transform = f"translate({tx}, {ty}) scale({scale})"
+    etree.SubElement(final_svg, "g", id="__map_fills__")
+    etree.SubElement(final_svg, "g", id="__map_outlines__")
+
+    with timing.stage("serialize"):
+        svg_bytes = etree.tostring(final_svg, pretty_print=not compact, xml_declaration=True, encoding="utf-8")
+        return splice_map_layers(svg_bytes, template, transform, country_counts, max_count, color_fn,
+                                 empty_fill, mode, buckets)
 
-    return etree.tostring(final_svg, pretty_print=True, xml_declaration=True, encoding="utf-8")
 
+def render_map_with_list(
+    country_counts: dict, theme: str = "light", mode: str | None = None, detail: str | None = None,
+    compact: bool | None = None,
+) -> bytes:
+    """
+    Render map with country list variant.
 
-def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
-    """Render map with country list variant."""
+    *mode*, *detail* and *compact* default to MAP_RENDER_MODE, MAP_DETAIL
+    and COMPACT_SVG.
+    """
+    mode = mode or MAP_RENDER_MODE
+    detail = detail or MAP_DETAIL
+    compact = COMPACT_SVG if compact is None else compact
     max_count = max(country_counts.values()) if country_counts else 1
     total_countries = len(country_counts)
     is_dark = theme == "dark"
@@ -261,9 +727,12 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
     ccount_clr   = "#60a5fa" if is_dark else "#1e40af"
     outline_clr  = "#334155"
     outline_op   = "1" if is_dark else "0.8"
+    # A <use> layer would apply opacity to all outlines at once; per-shape
+    # stroke opacity keeps overlapping borders as dark as inline shapes
+    outline_opacity = "stroke-opacity" if mode == "symbols" else "opacity"
 
     style_elem = etree.SubElement(final_svg, "style")
-    style_elem.text = f"""
+    css = f"""
         @import url('https://rsms.me/inter/inter.css');
         svg, text {{ -webkit-text-size-adjust: none; text-size-adjust: none; }}
         .card         {{ fill: {card_color}; }}
@@ -276,7 +745,7 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
         .list-divider {{ stroke: {divider_clr}; stroke-width: 1; }}
         .country-fill    {{ stroke: none; }}
         .country-outline {{ fill: none; stroke: {outline_clr}; stroke-width: 0.4;
-                           stroke-linejoin: round; pointer-events: none; opacity: {outline_op}; }}
+                           stroke-linejoin: round; pointer-events: none; {outline_opacity}: {outline_op}; }}
         .list-title   {{ font-family: 'Inter', sans-serif; font-size: 28px; font-weight: 600; fill: {list_lbl_clr}; }}
         .country-name {{ font-family: 'Inter', sans-serif; font-size: 24px; font-weight: 500; fill: {cname_clr}; }}
         .country-count{{ font-family: 'Inter', sans-serif; font-size: 24px; font-weight: 700; fill: {ccount_clr}; }}
@@ -288,6 +757,7 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
             .country-count{{ font-size: 18px; }}
         }}
     """
+    style_elem.text = minify_css(css) if compact else css
 
     etree.SubElement(final_svg, "rect", x="0", y="0",
                      width=str(card_w), height=str(card_h), rx="10",
@@ -319,16 +789,9 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
     # Vertical divider between map and list
     etree.SubElement(final_svg, "line", x1=str(map_area_w + 20), y1="40", x2=str(map_area_w + 20), y2=str(card_h - 40), attrib={"class": "list-divider"})
 
-    # Load and render map (smaller area)
-    orig_root = load_map_svg()
-    vb_str = orig_root.get("viewBox")
-    if not vb_str and 'width' in orig_root.attrib and 'height' in orig_root.attrib:
-         vb_str = f"0 0 {orig_root.attrib['width']} {orig_root.attrib['height']}"
-    if vb_str:
-        vb = vb_str.replace(',', ' ').split()
-        ox, oy, ow, oh = float(vb[0]), float(vb[1]), float(vb[2]), float(vb[3])
-    else:
-        ox, oy, ow, oh = 0, 0, 1000, 500
+    # Render map (smaller area)
+    template = get_map_template(detail, compact)
+    ox, oy, ow, oh = template.viewbox
 
     target_w = map_area_w - 80
     target_h = card_h - 150
@@ -338,14 +801,15 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
 
     color_fn = get_color_dark if is_dark else get_color
     empty_fill = '#1e293b' if is_dark else '#ffffff'
+    buckets = get_color_buckets("dark" if is_dark else "light", COLOR_BUCKETS) if COLOR_BUCKETS else None
     
-    fills_container = etree.SubElement(final_svg, "g", transform=f"translate({tx}, {ty}) scale({scale})")
-    for child in orig_root: 
-        clone_elements(child, fills_container, False, country_counts, max_count, color_fn, empty_fill)
-    
-    outlines_container = etree.SubElement(final_svg, "g", transform=f"translate({tx}, {ty}) scale({scale})")
-    for child in orig_root: 
-        clone_elements(child, outlines_container, True, country_counts, max_count, color_fn, empty_fill)
+    # Map layers are spliced in from the precompiled template after serialization
+    if compact:
+        transform = f"translate({_num(tx)},{_num(ty)}) scale({_num(scale)})"
+    else:
+        transform = f"translate({tx}, {ty}) scale({scale})"
+    etree.SubElement(final_svg, "g", id="__map_fills__")
+    etree.SubElement(final_svg, "g", id="__map_outlines__")
 
     list_x = list_area_x + 15
     list_w = card_w - list_x - 40
@@ -393,7 +857,8 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
             x=str(bar_x), y=str(y - 14), 
             width=str(bar_width), height="22",
             rx="4",
-            fill=color_fn(count, max_count),
+            # Same shade as the country on the map
+            fill=buckets.colors[buckets.bucket(count, max_count)] if buckets else color_fn(count, max_count),
             attrib={"class": "country-bar"})
 
     # Show remaining count if more than 10
@@ -402,7 +867,249 @@ def render_map_with_list(country_counts: dict, theme: str = "light") -> bytes:
         y = list_start_y + max_display * row_spacing + row_spacing * 0.5
         etree.SubElement(final_svg, "text", x=str(list_x), y=str(y + 4), attrib={"class": "list-title"}).text = f"+{remaining} more countries"
 
-    return etree.tostring(final_svg, pretty_print=True, xml_declaration=True, encoding="utf-8")
+    with timing.stage("serialize"):
+        svg_bytes = etree.tostring(final_svg, pretty_print=not compact, xml_declaration=True, encoding="utf-8")
+        return splice_map_layers(svg_bytes, template, transform, country_counts, max_count, color_fn,
+                                 empty_fill, mode, buckets)
+
+
+# ---------------------------------------------------------------------------
+# Rendered output cache
+# ---------------------------------------------------------------------------
+
+_RENDERERS = {"list": render_map_with_list, "map": render_map_only}
+
+
+def _renderer_inputs():
+    """Files whose contents shape the rendered bytes: the render modules and the maps."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return (
+        # widget.py renders, data.py names the listed countries, map_lod.py shapes the map levels
+        *(os.path.join(here, name) for name in ("widget.py", "data.py", "map_lod.py")),
+        *(lod_path(detail) for detail in DETAIL_LEVELS),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def renderer_version():
+    """Fingerprint of the renderer code and maps; changes invalidate every ETag."""
+    digest = hashlib.sha1()
+    for path in _renderer_inputs():
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            digest.update(path.encode())
+    return digest.hexdigest()[:12]
+
+
+def render_digest(variant, theme, country_counts, detail=None):
+    """Strong ETag value for a render — known before anything is rendered."""
+    key = json.dumps([
+        renderer_version(), MAP_RENDER_MODE, COLOR_BUCKETS, COMPACT_SVG, detail or MAP_DETAIL,
+        variant, theme, sorted(country_counts.items()),
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _disk_cache_path(name):
+    return os.path.join(RENDER_CACHE_DIR, name)
+
+
+def _read_disk_cache(name):
+    if not RENDER_CACHE_DIR:
+        return None
+    try:
+        with open(_disk_cache_path(name), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_disk_cache(name, svg_output):
+    """Store a render on disk, pruning the oldest files past the size cap."""
+    if not RENDER_CACHE_DIR:
+        return
+    try:
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{_disk_cache_path(name)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(svg_output)
+        os.replace(tmp_path, _disk_cache_path(name))
+
+        entries = [
+            e for e in os.scandir(RENDER_CACHE_DIR) if ".svg" in e.name and not e.name.endswith(".tmp")
+        ]
+        if len(entries) > RENDER_CACHE_DISK_FILES:
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) - RENDER_CACHE_DISK_FILES]:
+                os.remove(entry.path)
+    except OSError:
+        logger.warning("Could not write render cache in %s (read-only filesystem?).", RENDER_CACHE_DIR)
+
+
+def get_rendered_svg(digest, variant, theme, country_counts, detail=None):
+    """Return the SVG for *digest*, rendering it only on a memory and disk miss."""
+    svg_output = rendered_svgs.get(digest)
+    if svg_output is None:
+        svg_output = _read_disk_cache(f"{digest}.svg")
+        if svg_output is None:
+            timing.count("render-miss")
+            CACHE_LOOKUPS.inc(cache="render", result="miss")
+            with timing.stage("render"), RENDER_SECONDS.time(variant=variant):
+                svg_output = _RENDERERS[variant](country_counts, theme, detail=detail)
+            _write_disk_cache(f"{digest}.svg", svg_output)
+        else:
+            timing.count("render-hit")
+            CACHE_LOOKUPS.inc(cache="render", result="hit")
+        rendered_svgs.set(digest, svg_output)
+    else:
+        timing.count("render-hit")
+        CACHE_LOOKUPS.inc(cache="render", result="hit")
+    return svg_output
+
+
+def get_encoded_svg(digest, encoding, variant, theme, country_counts, detail=None):
+    """
+    Return the SVG for *digest* compressed with *encoding* (or as is for None).
+
+    Compressed bytes are cached next to the render, so each render is
+    compressed once per encoding.
+    """
+    if encoding is None:
+        return get_rendered_svg(digest, variant, theme, country_counts, detail)
+    key = f"{digest}.{encoding}"
+    suffix, compress = _ENCODINGS[encoding]
+    body = rendered_svgs.get(key)
+    if body is None:
+        body = _read_disk_cache(f"{digest}.svg{suffix}")
+        if body is None:
+            svg_output = get_rendered_svg(digest, variant, theme, country_counts, detail)
+            with timing.stage("compress"):
+                body = compress(svg_output)
+            _write_disk_cache(f"{digest}.svg{suffix}", body)
+        rendered_svgs.set(key, body)
+    return body
+
+
+def _response_encoding():
+    """Best encoding the client accepts, or None for an uncompressed body."""
+    return request.accept_encodings.best_match(list(_ENCODINGS))
+
+
+def _heatmap_response(label, variant, theme, detail, get_counts):
+    """
+    Render the counts returned by *get_counts* as an SVG response.
+
+    *get_counts* returns ``(country_counts, cache_status)``. Answers
+    ``If-None-Match`` with a 304 and turns errors into 503 / 500
+    responses; *label* names the request in log messages.
+
+    With SERVER_TIMING on, the time spent in each stage (counts, crawl,
+    resolve, render, serialize, compress) and the cache and GitHub API
+    counters are reported in a ``Server-Timing`` header, and logged as
+    JSON at INFO level. Slow requests, and requests passing the profiling
+    secret as ``profile``, are profiled when PROFILE_DIR is set (see
+    profiling.py).
+    """
+    start = time.perf_counter()
+    timings = None
+    with profiling.profile_request(label, request.args.get("profile")):
+        if SERVER_TIMING:
+            with timing.collect() as timings, timing.stage("total"):
+                response = _build_heatmap_response(label, variant, theme, detail, get_counts)
+        else:
+            response = _build_heatmap_response(label, variant, theme, detail, get_counts)
+
+    endpoint = request.endpoint.rpartition(".")[2]
+    cache_status = response.headers.get("X-Cache-Status", "none").lower()
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, cache=cache_status)
+    RESPONSES.inc(endpoint=endpoint, status=str(response.status_code))
+    if timings is None:
+        return response
+
+    response.headers["Server-Timing"] = timings.server_timing()
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("heatmap timings %s", json.dumps({
+            "target": label,
+            "variant": variant,
+            "theme": theme,
+            "detail": detail,
+            "status": response.status_code,
+            "cache": response.headers.get("X-Cache-Status"),
+            **timings.as_dict(),
+        }, sort_keys=True))
+    return response
+
+
+def _build_heatmap_response(label, variant, theme, detail, get_counts):
+    try:
+        with timing.stage("counts"):
+            country_counts, cache_status = get_counts()
+
+        # Identical counts render identical bytes, whatever the repo
+        digest = render_digest(variant, theme, country_counts, detail)
+        encoding = _response_encoding()
+        # Each encoding is its own representation with its own strong ETag
+        etag = f"{digest}.{encoding}" if encoding else digest
+        headers = {
+            "Cache-Control": _CACHE_CONTROL,
+            "X-Cache-Status": cache_status,
+            "Vary": "Accept-Encoding",
+        }
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        response = Response(
+            get_encoded_svg(digest, encoding, variant, theme, country_counts, detail),
+            mimetype="image/svg+xml",
+            # max-age=0: no browser cache. s-maxage=86400: Vercel edge caches for 24h.
+            # stale-while-revalidate: serve stale instantly while background refresh runs.
+            headers=headers,
+        )
+        response.set_etag(etag)
+        return response
+
+    except RateLimitError as exc:
+        logger.warning("Rate limited rendering heatmap for %s: %s", label, exc)
+        retry_after = max(1, math.ceil(exc.reset_at - time.time()))
+        return Response(
+            "GitHub API rate limit reached, try again later",
+            status=503,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    except NotFound as exc:
+        return Response(str(exc), status=404)
+
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Unhandled error rendering heatmap for %s", label)
+        return Response(f"Internal server error: {exc}", status=500)
+
+
+def _render_options():
+    """Validated ``(variant, theme, detail, force_refresh)`` from the query string."""
+    variant = request.args.get("variant", "list").strip().lower()
+    theme = request.args.get("theme", "light").strip().lower()
+    detail = request.args.get("detail", "").strip().lower()
+    if variant not in _VALID_VARIANTS:
+        variant = "list"
+    if theme not in _VALID_THEMES:
+        theme = "light"
+    if detail not in DETAIL_LEVELS:
+        width = request.args.get("width", "").strip()
+        # ASCII digits only ("²".isdigit() holds) and short enough for int()
+        valid = width.isascii() and width.isdigit() and len(width) <= 5
+        detail = pick_map_detail(variant, int(width) if valid else None)
+    return variant, theme, detail, request.args.get("refresh") == "1"
+
+
+def _is_repo_slug(repo):
+    return "/" in repo and len(repo.split("/")) == 2 and all(repo.split("/"))
 
 
 @widget_bp.route("/api/heatmap")
@@ -416,44 +1123,127 @@ def heatmap() -> Response:
     variant  : str  – ``list`` (default) or ``map``.
     theme    : str  – ``light`` (default) or ``dark``.
     refresh  : str  – Pass ``1`` to bypass the 24-hour cache.
+    detail   : str  – Map level of detail: ``full``, ``high`` or ``low``.
+    width    : int  – Display width in pixels; picks the coarsest map level
+                      that looks the same at that width (ignored with ``detail``).
     """
     repo = request.args.get("repo", "").strip()
-    variant = request.args.get("variant", "list").strip().lower()
-    theme = request.args.get("theme", "light").strip().lower()
-    force_refresh = request.args.get("refresh") == "1"
 
     # --- Input validation ---
     if not repo:
         return Response("Missing required parameter: repo", status=400)
     if "/" not in repo or len(repo.split("/")) != 2:
         return Response("Invalid repo format. Expected: owner/name", status=400)
-    if variant not in _VALID_VARIANTS:
-        variant = "list"
-    if theme not in _VALID_THEMES:
-        theme = "light"
+    variant, theme, detail, force_refresh = _render_options()
 
-    try:
-        contributors = get_all_contributors(repo, force_refresh=force_refresh)
+    return _heatmap_response(
+        repo, variant, theme, detail,
+        lambda: get_country_counts(repo, force_refresh=force_refresh),
+    )
 
-        country_counts: dict[str, int] = {}
-        for user in contributors:
-            code = resolve_country_code(user["location"])
-            if code:
-                country_counts[code] = country_counts.get(code, 0) + 1
 
-        if variant == "list":
-            svg_output = render_map_with_list(country_counts, theme)
-        else:
-            svg_output = render_map_only(country_counts, theme)
+@widget_bp.route("/api/heatmap/aggregate")
+def aggregate_heatmap() -> Response:
+    """
+    Render one SVG heatmap for several repositories or a whole organization.
 
-        return Response(
-            svg_output,
-            mimetype="image/svg+xml",
-            # max-age=0: no browser cache. s-maxage=86400: Vercel edge caches for 24h.
-            # stale-while-revalidate: serve stale instantly while background refresh runs.
-            headers={"Cache-Control": "public, max-age=0, s-maxage=86400, stale-while-revalidate=86400"},
-        )
+    Each contributor is counted once, however many of the repos they
+    contributed to.
 
-    except Exception as exc:  # noqa: BLE001
-        logger.exception("Unhandled error rendering heatmap for %s", repo)
-        return Response(f"Internal server error: {exc}", status=500)
+    Query parameters
+    ----------------
+    repos    : str  – Comma-separated repository slugs (``owner/name,...``).
+    org      : str  – Organization login; its public, non-fork repos are used.
+    variant  : str  – ``list`` (default) or ``map``.
+    theme    : str  – ``light`` (default) or ``dark``.
+    refresh  : str  – Pass ``1`` to re-merge the repos' current data.
+    detail   : str  – Map level of detail: ``full``, ``high`` or ``low``.
+    width    : int  – Display width in pixels; picks the map level (see above).
+
+    Exactly one of ``repos`` and ``org`` is required.
+    """
+    repos_arg = request.args.get("repos", "").strip()
+    org = request.args.get("org", "").strip()
+
+    # --- Input validation ---
+    if bool(repos_arg) == bool(org):
+        return Response("Pass exactly one of: repos, org", status=400)
+
+    if repos_arg:
+        repos = list(dict.fromkeys(r.strip() for r in repos_arg.split(",") if r.strip()))
+        invalid = [r for r in repos if not _is_repo_slug(r)]
+        if invalid:
+            return Response(f"Invalid repo format: {invalid[0]}. Expected: owner/name", status=400)
+        if len(repos) > MAX_AGGREGATE_REPOS:
+            return Response(f"Too many repos (at most {MAX_AGGREGATE_REPOS})", status=400)
+        key = "repos:" + ",".join(sorted(r.lower() for r in repos))
+        label = f"{len(repos)} repos"
+
+        def get_counts():
+            return get_aggregate_counts(key, repos, force_refresh=force_refresh)
+    else:
+        if "/" in org:
+            return Response("Invalid org name", status=400)
+        key = f"org:{org.lower()}"
+        label = f"org {org}"
+
+        def get_counts():
+            repos = list_org_repos(org)[:MAX_AGGREGATE_REPOS]
+            if not repos:
+                raise NotFound(f"No public repositories found for {org}")
+            return get_aggregate_counts(key, repos, force_refresh=force_refresh)
+
+    variant, theme, detail, force_refresh = _render_options()
+    return _heatmap_response(label, variant, theme, detail, get_counts)
+
+
+@widget_bp.route("/api/metrics")
+def metrics_endpoint() -> Response:
+    """
+    Counters and histograms of this process in the Prometheus text format.
+
+    Opt-in: answers 404 unless METRICS=1.
+    """
+    if not metrics.ENABLED:
+        return Response("Not found", status=404)
+    return Response(
+        metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def _profiles_allowed():
+    """Stored profiles are served only with PROFILE_DIR and the secret set."""
+    return bool(profiling.PROFILE_DIR) and profiling.is_forced(request.args.get("secret"))
+
+
+@widget_bp.route("/api/profiles")
+def list_profiles() -> Response:
+    """
+    Stored request profiles, newest first, as JSON.
+
+    Operator-only: answers 404 unless ``secret`` matches PROFILE_SECRET.
+    """
+    if not _profiles_allowed():
+        return Response("Not found", status=404)
+    return Response(
+        json.dumps(profiling.list_profiles()),
+        mimetype="application/json",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@widget_bp.route("/api/profiles/<name>")
+def download_profile(name) -> Response:
+    """One stored profile: ``.prof`` (pstats) or ``.folded`` (collapsed stacks)."""
+    path = profiling.profile_path(name) if _profiles_allowed() else None
+    if path is None:
+        return Response("Not found", status=404)
+    with open(path, "rb") as f:
+        data = f.read()
+    return Response(
+        data,
+        mimetype="text/plain" if name.endswith(".folded") else "application/octet-stream",
+        headers={"Cache-Control": "no-store", "Content-Disposition": f'attachment; filename="{name}"'},
+    )
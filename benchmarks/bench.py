@@ -0,0 +1,358 @@
+"""
+bench.py — benchmark suite for the service's hot paths.
+
+Covers cold start, cache reads, location resolution, both renderers, and full
+``/api/heatmap`` requests against a local fake GitHub (tests/fake_github.py):
+
+    python benchmarks/bench.py                          # run and print
+    python benchmarks/bench.py --save benchmarks/baseline.json
+    python benchmarks/bench.py --compare benchmarks/baseline.json --threshold 0.25
+    python benchmarks/bench.py --filter render. --repeat 3
+
+Each benchmark runs ``--repeat`` rounds; a round times one call of the
+benchmark body after an untimed setup, and results are per operation
+(one location, one render, one request). ``--compare`` exits with status 1
+when any benchmark's best round is slower than the baseline's by more than
+``--threshold``; the best round is the least disturbed by other load, as
+with ``timeit``. Baselines are only comparable on the machine that
+recorded them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REAL_CORPUS = os.path.join(ROOT, "tests", "fixtures", "locations.txt")
+
+# Importing utils opens the cache store in the working directory; keep it out of the tree
+_WORKDIR = tempfile.mkdtemp(prefix="heatmap-bench-")
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+BENCHMARKS: dict[str, "Benchmark"] = {}
+
+
+class Benchmark:
+    """A named body to time; *setup* builds ``(fn, ops)`` for each round."""
+
+    def __init__(self, name, setup):
+        self.name = name
+        self.setup = setup
+
+    def run(self, repeat: int) -> dict:
+        timings = []
+        ops = 1
+        for _ in range(repeat):
+            fn, ops = self.setup()
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) / ops)
+        return {"median": statistics.median(timings), "min": min(timings), "ops": ops, "rounds": repeat}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, setup)
+        return setup
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _modules():
+    """Import the app lazily, from the scratch working directory."""
+    cwd = os.getcwd()
+    os.chdir(_WORKDIR)
+    try:
+        import main
+        import utils
+        import widget
+    finally:
+        os.chdir(cwd)
+    return main, utils, widget
+
+
+def real_corpus() -> list[str]:
+    with open(REAL_CORPUS, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def synthetic_corpus(size: int = 2000, seed: int = 0) -> list[str]:
+    """Location strings shaped like GitHub profiles: cities, countries, noise."""
+    _, utils, _ = _modules()
+    rng = random.Random(seed)
+    keys = [key for key, _ in utils.COUNTRY_MAP]
+    noise = ["remote", "earth", "🌍", "localhost", "the internet", "somewhere", "n/a", "home"]
+    shapes = [
+        lambda: rng.choice(keys).title(),
+        lambda: f"{rng.choice(keys).title()}, {rng.choice(keys).title()}",
+        lambda: f"{rng.choice(keys)} area",
+        lambda: f"Greater {rng.choice(keys).title()} Region",
+        lambda: rng.choice(keys).upper(),
+        lambda: f"{rng.choice(noise)} / {rng.choice(keys)}",
+        lambda: "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(rng.randint(4, 24))),
+        lambda: rng.choice(noise),
+    ]
+    return [rng.choice(shapes)() for _ in range(size)]
+
+
+def _isolate(utils, widget) -> str:
+    """Point every cache at a fresh empty store; returns its directory."""
+    from cache_store import SQLiteCacheStore
+
+    path = tempfile.mkdtemp(dir=_WORKDIR)
+    utils.set_cache_store(SQLiteCacheStore(os.path.join(path, "cache.db")))
+    utils.resolved_locations = utils.LRUCache(utils.RESOLUTION_CACHE_SIZE)
+    utils.LOCK_DIR = os.path.join(path, "locks")
+    widget.rendered_svgs = utils.LRUCache(widget.RENDER_CACHE_SIZE)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Cold start
+# ---------------------------------------------------------------------------
+
+def _startup(code):
+    """Run *code* in a fresh interpreter, as a new serverless instance would."""
+    env = {**os.environ, "PYTHONPATH": os.path.join(ROOT, "api")}
+
+    def setup():
+        return (lambda: subprocess.run([sys.executable, "-c", code], cwd=_WORKDIR, env=env, check=True)), 1
+    return setup
+
+
+# Interpreter start + app import
+benchmark("startup.import")(_startup("import main"))
+# ... + resolving a location and rendering a card (resolver and map loaded
+# from the startup snapshot, see snapshot.py)
+benchmark("startup.first-render")(_startup(
+    "import main, utils, widget; utils.resolve_country_code('Lisbon, Portugal'); "
+    "widget.render_map_with_list({'pt': 1}, 'light')"
+))
+
+
+# ---------------------------------------------------------------------------
+# Cache store
+# ---------------------------------------------------------------------------
+
+def _cache_cold_read(size: int):
+    """Open a cache of *size* entries and read one key, as a fresh instance does."""
+    def setup():
+        _modules()
+        from cache_store import SQLiteCacheStore
+
+        path = os.path.join(tempfile.mkdtemp(dir=_WORKDIR), "cache.db")
+        SQLiteCacheStore(path).set_many("user_locations", {f"user-{i}": "Berlin" for i in range(size)})
+        return (lambda: SQLiteCacheStore(path).get("user_locations", "user-0")), 1
+    return setup
+
+
+benchmark("cache.cold-read.100")(_cache_cold_read(100))
+benchmark("cache.cold-read.50k")(_cache_cold_read(50_000))
+
+
+# ---------------------------------------------------------------------------
+# Location resolution
+# ---------------------------------------------------------------------------
+
+def _resolve_cold(corpus):
+    _, utils, widget = _modules()
+
+    def setup():
+        _isolate(utils, widget)
+        return (lambda: [utils.resolve_country_code(loc) for loc in corpus]), len(corpus)
+    return setup
+
+
+benchmark("resolve.cold.synthetic")(lambda: _resolve_cold(synthetic_corpus())())
+benchmark("resolve.cold.real")(lambda: _resolve_cold(real_corpus())())
+
+
+@benchmark("resolve.warm.real")
+def _resolve_warm():
+    _, utils, widget = _modules()
+    corpus = real_corpus()
+    _isolate(utils, widget)
+    for loc in corpus:
+        utils.resolve_country_code(loc)
+    # Memoized lookups are fast; repeat the corpus so a round is measurable
+    corpus = corpus * 20
+    return (lambda: [utils.resolve_country_code(loc) for loc in corpus]), len(corpus)
+
+
+@benchmark("resolve.batch.synthetic")
+def _resolve_batch():
+    _, utils, widget = _modules()
+    corpus = synthetic_corpus()
+    _isolate(utils, widget)
+    return (lambda: utils.resolve_many(corpus)), len(corpus)
+
+
+# ---------------------------------------------------------------------------
+# Renderers
+# ---------------------------------------------------------------------------
+
+def _counts(size: int | None) -> dict:
+    """Counts for *size* countries (None: every country on the map)."""
+    _, _, widget = _modules()
+    codes = sorted({code for code in widget.get_map_template().codes if code})
+    if size is not None:
+        codes = codes[:size]
+    return {code: 1 + (i * 7919) % 250 for i, code in enumerate(codes)}
+
+
+def _render(variant, size):
+    def setup():
+        _, _, widget = _modules()
+        render = widget._RENDERERS[variant]
+        counts = _counts(size)
+        themes = ("light", "dark") * 5
+        return (lambda: [render(counts, theme) for theme in themes]), len(themes)
+    return setup
+
+
+for _variant in ("map", "list"):
+    for _label, _size in (("0", 0), ("10", 10), ("100", 100), ("all", None)):
+        benchmark(f"render.{_variant}.{_label}")(_render(_variant, _size))
+
+
+# ---------------------------------------------------------------------------
+# End-to-end /api/heatmap
+# ---------------------------------------------------------------------------
+
+_HTTP_REPO = "bench/widgets"
+_HTTP_CONTRIBUTORS = 300
+
+
+def _fake_github():
+    """A started fake GitHub serving one repo of real-corpus contributors."""
+    from fake_github import FakeGitHub
+
+    corpus = real_corpus()
+    contributors = [(f"user{i}", corpus[i % len(corpus)]) for i in range(_HTTP_CONTRIBUTORS)]
+    fake = FakeGitHub({_HTTP_REPO: contributors}).__enter__()
+    _, utils, _ = _modules()
+    utils.GITHUB_API_URL = fake.url
+    return fake
+
+
+def _http(prime: bool, keep_renders: bool, ops: int, variant: str = "map", encoding: str | None = None):
+    def setup():
+        main, utils, widget = _modules()
+        fake = _fake_github()
+        client = main.app.test_client()
+        url = f"/api/heatmap?repo={_HTTP_REPO}&variant={variant}"
+        headers = {"Accept-Encoding": encoding} if encoding else {}
+        _isolate(utils, widget)
+        if prime:
+            assert client.get(url, headers=headers).status_code == 200
+
+        def run():
+            try:
+                for _ in range(ops):
+                    if not keep_renders:
+                        widget.rendered_svgs = utils.LRUCache(widget.RENDER_CACHE_SIZE)
+                    assert client.get(url, headers=headers).status_code == 200
+            finally:
+                fake.__exit__(None, None, None)
+        return run, ops
+    return setup
+
+
+# Crawl + resolve + render against an empty cache
+benchmark("http.heatmap.cold")(_http(prime=False, keep_renders=False, ops=1))
+# Cached counts, render from scratch
+benchmark("http.heatmap.render")(_http(prime=True, keep_renders=False, ops=50))
+# Cached counts and render
+benchmark("http.heatmap.warm")(_http(prime=True, keep_renders=True, ops=200))
+# Cached counts, render and compress from scratch, as browsers ask for it
+for _variant in ("map", "list"):
+    benchmark(f"http.heatmap.render.{_variant}.br")(
+        _http(prime=True, keep_renders=False, ops=20, variant=_variant, encoding="br, gzip"))
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run(names, repeat: int) -> dict:
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name].run(repeat)
+        print(f"{name:<28} {_fmt(results[name]['median'])}/op  (min {_fmt(results[name]['min'])})",
+              flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Names whose best round is more than *threshold* slower than the baseline's."""
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:<28} {'new':>10}")
+            continue
+        ratio = result["min"] / before["min"] if before["min"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28} {_fmt(before['min'])} -> {_fmt(result['min'])}  x{ratio:.2f} {flag}")
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f}{unit}"
+    return f"{seconds / 1e-9:8.0f}ns"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7, help="rounds per benchmark (default: 7)")
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before flagging a regression (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if not names:
+        parser.error(f"no benchmark matches {args.filter!r}")
+    current = run(names, args.repeat)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Add the api directory to sys.path so the app's flat imports resolve
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api')))
+
+# Importing utils opens the cache store; keep it out of the working copy
+_cache_dir = tempfile.TemporaryDirectory(prefix="heatmap-tests-")
+os.environ["CACHE_DIR"] = _cache_dir.name
+
+import utils
+
+
+@pytest.fixture
+def isolated_cache(monkeypatch, tmp_path):
+    """Point utils' persistent and in-memory caches at an empty temporary store."""
+    from cache_store import SQLiteCacheStore
+
+    for name in (
+        "cache_store", "repo_cache", "user_locations", "user_validators", "user_checks", "resolution_store",
+        "org_cache", "aggregate_cache",
+    ):
+        monkeypatch.setattr(utils, name, getattr(utils, name))
+    utils.set_cache_store(SQLiteCacheStore(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(utils, "resolved_locations", utils.LRUCache(100))
+    monkeypatch.setattr(utils, "LOCK_DIR", str(tmp_path / "locks"))
+    return tmp_path
+
+
+@pytest.fixture
+def github_client(request, monkeypatch):
+    """
+    Route utils' GitHub traffic through a fresh client, without retries and
+    with a connection pool covering the widest test concurrency.
+
+    Override its options with
+    ``@pytest.mark.parametrize("github_client", [{...}], indirect=True)``.
+    """
+    from github_client import GitHubClient
+
+    client = GitHubClient(**{"pool_size": 32, "max_retries": 0, **getattr(request, "param", {})})
+    monkeypatch.setattr(utils, "github", client)
+    return client
+
+
+@pytest.fixture
+def use_fake_github(monkeypatch):
+    """Return a helper that routes utils' GitHub traffic to a FakeGitHub."""
+    def route(fake):
+        monkeypatch.setattr(utils, "GITHUB_API_URL", fake.url)
+        return fake
+    return route
+
+
+@pytest.fixture
+def client():
+    """Flask test client for the app in main.py."""
+    import main
+    return main.app.test_client()
+
+
+@pytest.fixture
+def fake_contributors(monkeypatch, isolated_cache):
+    """Serve a fixed contributor list to the widget instead of crawling GitHub."""
+    import widget
+
+    contributors = {}
+
+    def get_country_counts(repo_name, force_refresh=False):
+        return utils.count_countries(contributors.get(repo_name, [])), utils.CACHE_HIT
+
+    monkeypatch.setattr(widget, "get_country_counts", get_country_counts)
+    monkeypatch.setattr(widget, "rendered_svgs", utils.LRUCache(16))
+    return contributors
@@ -0,0 +1,204 @@
+"""
+fake_github.py — minimal local stand-in for the GitHub REST API.
+
+Serves the endpoints utils.py talks to:
+  GET /repos/<owner>/<name>/contributors?per_page=&page=
+  GET /users/<login>
+  GET /orgs/<org>/repos?per_page=&page=
+over HTTP/1.1 keep-alive, with an optional per-request latency and
+injectable failures. Responses carry an ETag and honour If-None-Match;
+multi-page contributor lists carry a GitHub-style Link header (200s only).
+With a *rate_limit*, responses carry GitHub's X-RateLimit-* headers and
+requests beyond the budget get a 403; 304s are free, as on GitHub.
+Records every request path, client connection and response status.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class _Server(ThreadingHTTPServer):
+    # Concurrent clients connect in bursts; the default backlog of 5 drops SYNs
+    request_queue_size = 128
+
+
+class FakeGitHub:
+    """
+    Threaded fake API server.
+
+    *repos* maps ``owner/name`` to a list of ``(login, location)`` tuples.
+    """
+
+    def __init__(self, repos: dict, latency: float = 0.0, rate_limit: int | None = None):
+        self.repos = repos
+        self.latency = latency
+        self.rate_limit = rate_limit
+        # Repos (``owner/name``) listed as forks by the org endpoint
+        self.forks: set[str] = set()
+        self.rate_remaining = rate_limit
+        self.rate_reset = int(time.time()) + 3600
+        # Upcoming requests answered 429 with this Retry-After
+        self.throttled = 0
+        self.retry_after = 1
+        self.requests: list[str] = []
+        self.statuses: list[tuple[str, int]] = []
+        self.connections: set = set()
+        # path (with query string) → number of upcoming requests to fail
+        self.failures: dict[str, int] = {}
+        self.failure_status = 502
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, prefix: str) -> int:
+        """Number of recorded requests whose path starts with *prefix*."""
+        with self._lock:
+            return sum(1 for path in self.requests if path.startswith(prefix))
+
+    def status_counts(self, prefix: str) -> dict:
+        """Response status → count for paths starting with *prefix*."""
+        counts: dict[int, int] = {}
+        with self._lock:
+            for path, status in self.statuses:
+                if path.startswith(prefix):
+                    counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def locations(self) -> dict:
+        return {
+            login.lower(): location
+            for users in self.repos.values()
+            for login, location in users
+        }
+
+    def _respond(self, handler, path: str, query: dict):
+        parts = path.strip("/").split("/")
+        if len(parts) == 4 and parts[0] == "repos" and parts[3] == "contributors":
+            users = self.repos.get(f"{parts[1]}/{parts[2]}")
+            if users is None:
+                return 404, {"message": "Not Found"}
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            chunk = users[(page - 1) * per_page: page * per_page]
+            last = max(1, -(-len(users) // per_page))
+            if last > 1:
+                link = f"{self.url}{path}?per_page={per_page}&page=%s"
+                rels = [(last, "last")]
+                if page < last:
+                    rels.insert(0, (page + 1, "next"))
+                handler.link = ", ".join(f'<{link % n}>; rel="{rel}"' for n, rel in rels)
+            return 200, [
+                {"login": login, "url": f"{self.url}/users/{login}"}
+                for login, _ in chunk
+            ]
+        if len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repos":
+            names = [name for name in self.repos if name.split("/")[0].lower() == parts[1].lower()]
+            if not names:
+                return 404, {"message": "Not Found"}
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            return 200, [
+                {"full_name": name, "fork": name in self.forks}
+                for name in names[(page - 1) * per_page: page * per_page]
+            ]
+        if len(parts) == 2 and parts[0] == "users":
+            location = self.locations().get(parts[1].lower(), None)
+            return 200, {"login": parts[1], "location": location}
+        return 404, {"message": "Not Found"}
+
+    def fail(self, path: str, times: int, status: int = 502) -> None:
+        """Answer the next *times* requests for *path* with *status*."""
+        self.failures[path] = times
+        self.failure_status = status
+
+    def throttle(self, times: int, retry_after: int = 1) -> None:
+        """Answer the next *times* requests with a 429 secondary rate limit."""
+        self.throttled = times
+        self.retry_after = retry_after
+
+    def _take_failure(self, full_path: str) -> bool:
+        with self._lock:
+            for path in (full_path, urlsplit(full_path).path):
+                if self.failures.get(path, 0) > 0:
+                    self.failures[path] -= 1
+                    return True
+        return False
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                split = urlsplit(self.path)
+                with fake._lock:
+                    fake.requests.append(split.path)
+                    fake.connections.add(self.client_address)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                extra_headers = {}
+                self.link = None
+                with fake._lock:
+                    throttled = fake.throttled > 0
+                    if throttled:
+                        fake.throttled -= 1
+                if throttled:
+                    status, payload = 429, {"message": "You have exceeded a secondary rate limit"}
+                    extra_headers["Retry-After"] = str(fake.retry_after)
+                elif fake._take_failure(self.path):
+                    status, payload = fake.failure_status, {"message": "Server Error"}
+                else:
+                    status, payload = fake._respond(self, split.path, parse_qs(split.query))
+                body = json.dumps(payload).encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                if fake.rate_limit is not None:
+                    with fake._lock:
+                        if status != 304:
+                            if fake.rate_remaining == 0:
+                                status = 403
+                                body = json.dumps({"message": "API rate limit exceeded"}).encode("utf-8")
+                            else:
+                                fake.rate_remaining -= 1
+                        extra_headers.update({
+                            "X-RateLimit-Limit": str(fake.rate_limit),
+                            "X-RateLimit-Remaining": str(fake.rate_remaining),
+                            "X-RateLimit-Reset": str(fake.rate_reset),
+                        })
+                with fake._lock:
+                    fake.statuses.append((split.path, status))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                if status == 200 and self.link:
+                    self.send_header("Link", self.link)
+                for name, value in extra_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
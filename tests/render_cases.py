@@ -0,0 +1,37 @@
+"""
+render_cases.py — country counts and golden render digests shared by the
+renderer tests (test_map_template.py, test_symbol_render.py, ...).
+"""
+
+import widget
+
+CASES = {
+    "empty": {},
+    "single": {"us": 1},
+    "mixed": {"us": 42, "de": 17, "in": 9, "br": 3, "fi": 1, "zz": 2},
+    "many": {c: i + 1 for i, c in enumerate(
+        ["us", "de", "in", "br", "fi", "gb", "fr", "jp", "cn", "ng", "ke", "au", "ca", "mx", "ua"]
+    )},
+}
+
+# SHA-256 of the output produced by the original clone_elements renderers
+EXPECTED_DIGESTS = {
+    "empty-map-light": "720c6c734fc453671803ad42aeb849ff68e43040ef1e05eefcf109ccd1c82d05",
+    "empty-list-light": "6cd36a3a8f13fc290f213e06506735a0d3c002f248a2f5c5b366d985884beee5",
+    "empty-map-dark": "02ae6e392d7ecc2c43f1e1490d647f868742a9beda6ae4ff9a8be805394f49c7",
+    "empty-list-dark": "45e95ca67d9908f0687bd793bb7c58f88068e85cc8905d27f3ea3f3a475acb44",
+    "single-map-light": "b4c972ec11dad8aeea688181658c0df76eb0ece8fe41ad7481380ff8c57a04fa",
+    "single-list-light": "0065d8425e07826733bf0fe11588b35fd3a052423eb4848956fdb976e874484d",
+    "single-map-dark": "6a746f5b8ab35e316c8274f1d0fc69af58b43ee22f1101f77792fc1766a7abd9",
+    "single-list-dark": "6252a5a7a86039b9c453a421ac2ad064dffc5a761e844b98ce735bc0ece579d7",
+    "mixed-map-light": "56211bda624c242e7ff0c62dca7227db067c483c81186eb2d066a20c7529a928",
+    "mixed-list-light": "80dd86f8572c980246901f3c5f83aaa61954eb5c834170b24a7610a6b2bb9264",
+    "mixed-map-dark": "beacc85a654115c129de729c70f2989cec04ca236fbe1d6178acdc3f5d3b30fb",
+    "mixed-list-dark": "6bb397cd9a7c67315cb47a0c92d42548e80f4942dc4e704d22eec4ca1c659e57",
+    "many-map-light": "f603406795fe7c972baa25ad3ff644b01c21fd2df98ddb5b3b91af2d60f7d15c",
+    "many-list-light": "21c3055048fd0791e29c186a5a5fdc020e1117149a8ec926b44823d75d9fbc82",
+    "many-map-dark": "c33e162af4f46ff01bb454b94af2643484f0d2ff9eac678a5670b86ae4f228e6",
+    "many-list-dark": "86df09be71e17e3f799066ad0c35bbc3d4602a03db436fd16ba3f3b8c5548c1c",
+}
+
+RENDERERS = {"map": widget.render_map_only, "list": widget.render_map_with_list}
@@ -0,0 +1,118 @@
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+from github_client import GitHubError
+
+URL = "/api/heatmap/aggregate"
+REPOS = {
+    "acme/widgets": [("ana", "Lisbon, Portugal"), ("bo", "Nairobi, Kenya")],
+    "acme/gadgets": [("ana", "Lisbon, Portugal"), ("cy", "Lima, Peru")],
+    "acme/fork": [("dee", "Oslo, Norway")],
+    "other/thing": [("eve", "Tokyo, Japan")],
+}
+
+
+pytestmark = pytest.mark.usefixtures("github_client")
+
+
+def test_shared_contributors_are_counted_once(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub(REPOS)) as fake:
+        utils.get_all_contributors("acme/widgets")
+        counts, status = utils.get_aggregate_counts("k", ["acme/widgets", "acme/gadgets"])
+        # gadgets' crawl reuses the location stored by widgets' crawl
+        assert fake.count("/users/ana") == 1
+
+    assert counts == {"pt": 1, "ke": 1, "pe": 1}
+    assert status == utils.CACHE_MISS
+    assert utils.aggregate_cache["k"]["contributors"] == 3
+
+
+def test_aggregate_is_cached_under_its_key(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub(REPOS)) as fake:
+        utils.get_aggregate_counts("k", ["acme/widgets", "acme/gadgets"])
+        before = len(fake.requests)
+        assert utils.get_aggregate_counts("k", ["acme/widgets", "acme/gadgets"])[1] == utils.CACHE_HIT
+        assert len(fake.requests) == before
+
+
+def test_failed_repo_makes_a_partial_aggregate(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub(REPOS)) as fake:
+        fake.fail("/repos/acme/gadgets/contributors", 1)
+        counts, _ = utils.get_aggregate_counts("k", ["acme/widgets", "acme/gadgets"])
+
+    assert counts == {"pt": 1, "ke": 1}
+    assert utils.aggregate_cache["k"]["partial"] is True
+
+
+def test_org_repos_skip_forks(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub(REPOS)) as fake:
+        fake.forks.add("acme/fork")
+        assert sorted(utils.list_org_repos("ACME")) == ["acme/gadgets", "acme/widgets"]
+        utils.list_org_repos("acme")
+        assert fake.count("/orgs/") == 1
+        assert utils.list_org_repos("nobody") == []
+
+
+def test_failed_org_page_is_never_cached(isolated_cache, use_fake_github):
+    repos = {f"big/repo{i}": [] for i in range(150)}
+    with use_fake_github(FakeGitHub(repos)) as fake:
+        fake.fail("/orgs/big/repos?type=public&sort=pushed&per_page=100&page=2", 1, status=422)
+        with pytest.raises(GitHubError):
+            utils.list_org_repos("big")
+        assert "big" not in utils.org_cache
+        assert len(utils.list_org_repos("big")) == 150
+
+
+def test_malformed_org_page_is_never_cached(isolated_cache, use_fake_github, github_client, monkeypatch):
+    get = github_client.session.get
+
+    def get_with_bad_page(url, **kwargs):
+        resp = get(url, **kwargs)
+        resp._content = b'[{"fork": false}]'
+        return resp
+    monkeypatch.setattr(github_client.session, "get", get_with_bad_page)
+    with use_fake_github(FakeGitHub(REPOS)):
+        with pytest.raises(GitHubError):
+            utils.list_org_repos("acme")
+    assert "acme" not in utils.org_cache
+
+
+def test_aggregate_endpoint_for_repos(isolated_cache, use_fake_github, client):
+    with use_fake_github(FakeGitHub(REPOS)):
+        first = client.get(f"{URL}?repos=acme/widgets,other/thing&variant=map")
+        again = client.get(f"{URL}?repos=other/thing,acme/widgets&variant=map")
+
+    assert first.status_code == 200
+    assert first.mimetype == "image/svg+xml"
+    assert first.headers["X-Cache-Status"] == "MISS"
+    # Repo order doesn't change the aggregate
+    assert again.headers["X-Cache-Status"] == "HIT"
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_aggregate_endpoint_for_org(isolated_cache, use_fake_github, client):
+    with use_fake_github(FakeGitHub(REPOS)) as fake:
+        fake.forks.add("acme/fork")
+        resp = client.get(f"{URL}?org=acme")
+        missing = client.get(f"{URL}?org=nobody")
+
+    assert resp.status_code == 200
+    assert utils.aggregate_cache["org:acme"]["counts"] == {"pt": 1, "ke": 1, "pe": 1}
+    assert missing.status_code == 404
+
+
+def test_internal_lookup_errors_are_not_404s(isolated_cache, client):
+    # A malformed entry is a bug to report, not a missing repo
+    utils.repo_cache["acme/widgets"] = {"data": []}
+    assert client.get("/api/heatmap?repo=acme/widgets").status_code == 500
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "?repos=acme/widgets&org=acme",
+    "?repos=acme/widgets,notarepo",
+    "?org=acme/widgets",
+])
+def test_aggregate_endpoint_validates_input(client, query):
+    assert client.get(URL + query).status_code == 400
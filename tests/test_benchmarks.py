@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import bench
+
+
+def _results(**mins):
+    return {"results": {name: {"median": value, "min": value, "ops": 1, "rounds": 1}
+                        for name, value in mins.items()}}
+
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    baseline = _results(fast=1.0, steady=1.0, gone=1.0)
+    current = _results(fast=1.3, steady=1.1, added=5.0)
+    assert bench.compare(baseline, current, threshold=0.25) == ["fast"]
+    assert bench.compare(baseline, current, threshold=0.5) == []
+
+
+def test_suite_covers_the_hot_paths():
+    names = set(bench.BENCHMARKS)
+    for variant in ("map", "list"):
+        assert {f"render.{variant}.{n}" for n in ("0", "10", "100", "all")} <= names
+    assert {"resolve.cold.synthetic", "resolve.cold.real", "http.heatmap.cold", "http.heatmap.warm",
+            "http.heatmap.render.list.br"} <= names
+
+
+def test_synthetic_corpus_is_deterministic():
+    assert bench.synthetic_corpus(50) == bench.synthetic_corpus(50)
+    assert len(set(bench.synthetic_corpus(500))) > 250
+
+
+def test_save_and_compare_round_trip(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    assert bench.main(["--filter", "render.map.0", "--repeat", "1", "--save", str(baseline)]) == 0
+    saved = json.loads(baseline.read_text())
+    assert list(saved["results"]) == ["render.map.0"]
+    assert saved["results"]["render.map.0"]["ops"] == 10
+
+    assert bench.main(["--filter", "render.map.0", "--repeat", "1",
+                       "--compare", str(baseline), "--threshold", "100"]) == 0
+
+    saved["results"]["render.map.0"]["min"] /= 1000
+    baseline.write_text(json.dumps(saved))
+    assert bench.main(["--filter", "render.map.0", "--repeat", "1", "--compare", str(baseline)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
@@ -0,0 +1,109 @@
+import re
+
+import pytest
+
+import widget
+from render_cases import CASES, RENDERERS
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+@pytest.fixture
+def bucketed(monkeypatch):
+    monkeypatch.setattr(widget, "COLOR_BUCKETS", 6)
+    return widget.get_color_buckets
+
+
+def _fill_codes(svg_bytes):
+    """Country code of every fill-layer shape, in document order."""
+    template = widget.get_map_template()
+    root = widget.etree.fromstring(svg_bytes)
+    shapes = [node for node in root.iter() if "country-fill" in (node.get("class") or "").split()]
+    assert len(shapes) == len(template.codes)
+    return shapes, template.codes
+
+
+def test_buckets_span_the_continuous_ramp():
+    for theme, color_fn in (("light", widget.get_color), ("dark", widget.get_color_dark)):
+        buckets = widget.ColorBuckets(theme, 5)
+        assert buckets.colors[0] == color_fn(0, 100)
+        assert buckets.colors[1] == color_fn(1, 100)
+        assert buckets.colors[-1] == color_fn(100, 100)
+        assert len(buckets.colors) == 6
+
+
+def test_bucket_index_follows_log_intensity():
+    buckets = widget.ColorBuckets("light", 5)
+    assert buckets.bucket(0, 100) == 0
+    assert buckets.bucket(1, 100) == 1
+    assert buckets.bucket(10, 100) == 3
+    assert buckets.bucket(100, 100) == 5
+    assert [buckets.bucket(n, 1) for n in (0, 1)] == [0, 1]
+    assert widget.ColorBuckets("dark", 1).bucket(7, 9) == 1
+
+
+def test_buckets_reject_empty_palette():
+    with pytest.raises(ValueError):
+        widget.ColorBuckets("light", 0)
+
+
+def test_inline_shapes_reference_bucket_classes(bucketed):
+    counts = CASES["mixed"]
+    for theme in ("light", "dark"):
+        buckets = bucketed(theme, 6)
+        svg = widget.render_map_with_list(counts, theme, mode="inline")
+
+        assert svg.count(f"<style>{buckets.css()}</style>".encode()) == 1
+        shapes, codes = _fill_codes(svg)
+        for node, code in zip(shapes, codes):
+            assert node.get("fill") is None
+            expected = buckets.bucket(counts.get(code, 0), 42) if code else 0
+            assert node.get("class") == f"country-fill b{expected}"
+
+
+def test_list_bars_use_the_map_buckets(bucketed):
+    counts = CASES["mixed"]
+    top = sorted(counts.values(), reverse=True)[:10]
+    for theme in ("light", "dark"):
+        buckets = bucketed(theme, 6)
+        root = widget.etree.fromstring(widget.render_map_with_list(counts, theme))
+        bars = [node.get("fill") for node in root.iter(f"{SVG}rect") if node.get("class") == "country-bar"]
+        assert bars == [buckets.colors[buckets.bucket(count, max(counts.values()))] for count in top]
+
+
+def test_symbols_resolve_to_the_same_buckets(bucketed):
+    for name, counts in CASES.items():
+        for theme in ("light", "dark"):
+            for variant, render in RENDERERS.items():
+                inline_shapes, codes = _fill_codes(render(counts, theme, mode="inline"))
+                inline = [node.get("class").split()[1] for node in inline_shapes]
+
+                root = widget.etree.fromstring(render(counts, theme, mode="symbols"))
+                style = next(n.text for n in root.iter(f"{SVG}style") if n.text.startswith(".c-") or
+                             n.text.startswith(".map-fills"))
+                members = {}
+                for selectors, index in re.findall(r"([^{}]+)\{fill:var\(--b(\d+)\)\}", style):
+                    for selector in selectors.split(","):
+                        members[selector[3:]] = f"b{index}"
+                geometry = next(n for n in root.iter() if n.get("id") == "map-geometry")
+                symbols = [
+                    members.get((node.get("class") or "")[2:], "b0")
+                    for node in geometry.iter()
+                    if node.tag.replace(SVG, "") in widget._SHAPE_TAGS
+                ]
+                assert symbols == inline, f"{name}-{variant}-{theme}"
+
+
+def test_bucketed_output_is_smaller(bucketed, monkeypatch):
+    counts = CASES["many"]
+    smaller = widget.render_map_only(counts, mode="inline")
+    monkeypatch.setattr(widget, "COLOR_BUCKETS", 0)
+    assert len(smaller) < len(widget.render_map_only(counts, mode="inline"))
+
+
+def test_render_digest_depends_on_buckets(monkeypatch):
+    counts = CASES["mixed"]
+    monkeypatch.setattr(widget, "COLOR_BUCKETS", 0)
+    continuous = widget.render_digest("map", "light", counts)
+    monkeypatch.setattr(widget, "COLOR_BUCKETS", 6)
+    assert widget.render_digest("map", "light", counts) != continuous
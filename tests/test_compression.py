@@ -0,0 +1,118 @@
+import gzip
+
+import pytest
+
+import map_lod
+import widget
+from render_cases import CASES
+
+URL = "/api/heatmap?repo=acme/widgets&variant=map&theme=dark"
+
+
+def _fills(svg_bytes):
+    root = widget.etree.fromstring(svg_bytes)
+    return [
+        (node.get("id"), node.get("fill"), map_lod.parse_path(node.get("d", "")))
+        for node in root.iter() if node.get("class") == "country-fill"
+    ]
+
+
+def test_compact_path_parses_to_the_same_points():
+    d = "m 1369.9,333.8 -5.4,0 -3.8,-0.5 0.20,2.90 z M 0,0 L 10,10.0 Z"
+    compact = map_lod.compact_path(d)
+    assert compact == "m1369.9 333.8-5.4 0-3.8-.5 .2 2.9zM0 0L10 10Z"
+    assert map_lod.parse_path(compact) == map_lod.parse_path(d)
+
+
+def test_minify_css():
+    css = """
+        .card    {{ fill: #fff; }}
+        @media (min-width: 600px) {{
+            .title {{ font-family: 'Inter', sans-serif; }}
+        }}
+    """.replace("{{", "{").replace("}}", "}")
+    assert widget.minify_css(css) == (
+        ".card{fill:#fff}@media (min-width:600px){.title{font-family:'Inter',sans-serif}}"
+    )
+
+
+def test_compact_render_draws_the_same_map():
+    for theme in ("light", "dark"):
+        for render in (widget.render_map_only, widget.render_map_with_list):
+            pretty = render(CASES["many"], theme, compact=False)
+            compact = render(CASES["many"], theme, compact=True)
+
+            assert len(compact) < len(pretty) * 0.8
+            assert b"\n  <" not in compact
+            assert b"inkscape" not in compact
+            assert _fills(compact) == _fills(pretty)
+
+
+def test_render_digest_depends_on_compact(monkeypatch):
+    monkeypatch.setattr(widget, "COMPACT_SVG", False)
+    pretty = widget.render_digest("map", "light", {})
+    monkeypatch.setattr(widget, "COMPACT_SVG", True)
+    assert widget.render_digest("map", "light", {}) != pretty
+
+
+@pytest.fixture
+def counted_gzip(monkeypatch):
+    calls = []
+    suffix, compress = widget._ENCODINGS["gzip"]
+
+    def counting(data):
+        calls.append(len(data))
+        return compress(data)
+
+    monkeypatch.setitem(widget._ENCODINGS, "gzip", (suffix, counting))
+    return calls
+
+
+def test_gzip_is_negotiated_and_compressed_once(client, fake_contributors, counted_gzip):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    plain = client.get(URL)
+    first = client.get(URL, headers={"Accept-Encoding": "gzip"})
+    second = client.get(URL, headers={"Accept-Encoding": "gzip, deflate"})
+
+    assert plain.headers.get("Content-Encoding") is None
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["Vary"] == plain.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(first.data) == plain.data
+    assert len(first.data) < len(plain.data) / 3
+    assert first.data == second.data
+    assert len(counted_gzip) == 1
+
+    # Each representation has its own strong ETag
+    assert first.headers["ETag"] != plain.headers["ETag"]
+    resp = client.get(URL, headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert client.get(URL, headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+
+def test_refused_encodings_fall_back_to_identity(client, fake_contributors):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    resp = client.get(URL, headers={"Accept-Encoding": "gzip;q=0, deflate"})
+    assert resp.headers.get("Content-Encoding") is None
+    assert resp.data.startswith(b"<?xml")
+
+
+def test_brotli_is_preferred_when_available(client, fake_contributors):
+    brotli = pytest.importorskip("brotli")
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    plain = client.get(URL).data
+    resp = client.get(URL, headers={"Accept-Encoding": "gzip, br"})
+
+    assert resp.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(resp.data) == plain
+
+
+def test_compressed_bytes_use_the_disk_tier(client, fake_contributors, counted_gzip, monkeypatch, tmp_path):
+    monkeypatch.setattr(widget, "RENDER_CACHE_DIR", str(tmp_path / "rendered"))
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    body = client.get(URL, headers={"Accept-Encoding": "gzip"}).data
+    assert sorted(p.suffix for p in (tmp_path / "rendered").iterdir()) == [".gz", ".svg"]
+
+    monkeypatch.setattr(widget, "rendered_svgs", widget.LRUCache(16))
+    assert client.get(URL, headers={"Accept-Encoding": "gzip"}).data == body
+    assert len(counted_gzip) == 1
@@ -0,0 +1,53 @@
+import utils
+from fake_github import FakeGitHub
+
+CONTRIBUTORS = "/repos/acme/widgets/contributors"
+
+
+def make_users(n):
+    return [(f"user{i}", "Nairobi, Kenya") for i in range(n)]
+
+
+def expire(repo):
+    entry = utils.repo_cache[repo]
+    entry["timestamp"] = 0
+    utils.repo_cache[repo] = entry
+
+
+def test_unchanged_pages_are_revalidated(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(150)})) as fake:
+        first = utils.get_all_contributors("acme/widgets")
+        assert fake.status_counts(CONTRIBUTORS) == {200: 2}
+        assert all("etag" in page for page in utils.repo_cache["acme/widgets"]["pages"])
+
+        expire("acme/widgets")
+        second = utils.get_all_contributors("acme/widgets")
+        assert fake.status_counts(CONTRIBUTORS) == {200: 2, 304: 2}
+
+    assert second == first
+    assert len(second) == 150
+
+
+def test_changed_page_is_downloaded_again(isolated_cache, use_fake_github):
+    users = make_users(150)
+    with use_fake_github(FakeGitHub({"acme/widgets": users})) as fake:
+        utils.get_all_contributors("acme/widgets")
+        users.append(("newcomer", "Accra, Ghana"))
+
+        expire("acme/widgets")
+        result = utils.get_all_contributors("acme/widgets")
+        # Page 1 is unchanged, page 2 gained a contributor
+        assert fake.status_counts(CONTRIBUTORS) == {200: 3, 304: 1}
+
+    assert result[-1] == {"login": "newcomer", "location": "Accra, Ghana"}
+
+
+def test_profiles_are_revalidated(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(1)})) as fake:
+        url = f"{fake.url}/users/user0"
+        assert utils.fetch_profile_location(url, "user0") == "Nairobi, Kenya"
+        assert "etag" in utils.user_validators["user0"]
+
+        utils.user_locations["user0"] = "Nairobi, Kenya"
+        assert utils.fetch_profile_location(url, "user0") == "Nairobi, Kenya"
+        assert fake.status_counts("/users/") == {200: 1, 304: 1}
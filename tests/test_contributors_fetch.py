@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+
+LATENCY = 0.05
+
+
+pytestmark = pytest.mark.usefixtures("github_client")
+
+
+def make_users(n):
+    return [(f"User{i}", f"City {i}, Germany" if i % 2 else None) for i in range(n)]
+
+
+def timed_crawl(users, workers, use_fake_github):
+    utils.repo_cache.clear()
+    utils.user_locations.clear()
+    with use_fake_github(FakeGitHub({"acme/widgets": users}, latency=LATENCY)):
+        start = time.perf_counter()
+        result = utils.get_all_contributors("acme/widgets", max_workers=workers)
+        return result, time.perf_counter() - start
+
+
+def test_output_order_and_locations(isolated_cache, use_fake_github):
+    users = make_users(25)
+    result, _ = timed_crawl(users, 8, use_fake_github)
+    assert [u["login"] for u in result] == [login.lower() for login, _ in users]
+    assert [u["location"] for u in result] == [location for _, location in users]
+    assert utils.user_locations == {login.lower(): location for login, location in users}
+
+
+def test_wall_clock_scales_with_concurrency(isolated_cache, use_fake_github):
+    _, serial = timed_crawl(make_users(16), 1, use_fake_github)
+    _, parallel = timed_crawl(make_users(16), 16, use_fake_github)
+    _, parallel_double = timed_crawl(make_users(32), 32, use_fake_github)
+
+    # 16 serial profile fetches cost ~16 latencies, concurrent ones ~1
+    assert serial >= 16 * LATENCY
+    assert parallel < serial / 3
+    # Doubling contributors at matching concurrency barely moves wall-clock
+    assert parallel_double < serial / 2
+
+
+def test_cached_profiles_are_not_refetched(isolated_cache, use_fake_github):
+    users = make_users(6)
+    utils.user_locations["user0"] = "Kyiv"
+    with use_fake_github(FakeGitHub({"acme/widgets": users})) as fake:
+        result = utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/") == 5
+    assert result[0] == {"login": "user0", "location": "Kyiv"}
@@ -0,0 +1,59 @@
+import time
+
+import utils
+from fake_github import FakeGitHub
+
+USERS = [("ana", "Lisbon, Portugal"), ("bo", "Porto, Portugal"), ("cy", "Nairobi, Kenya"), ("di", None)]
+
+
+def count_resolutions(monkeypatch):
+    calls = []
+    original = utils.resolve_many
+
+    def resolve_many(locations):
+        locations = list(locations)
+        calls.append(locations)
+        return original(locations)
+
+    monkeypatch.setattr(utils, "resolve_many", resolve_many)
+    return calls
+
+
+def test_crawl_stores_counts(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS})):
+        counts, status = utils.get_country_counts("acme/widgets")
+
+    assert counts == {"pt": 2, "ke": 1}
+    assert status == utils.CACHE_MISS
+    entry = utils.repo_cache["acme/widgets"]
+    assert entry["counts"] == counts
+    assert entry["counts_version"] == utils.get_resolver().version
+
+
+def test_warm_requests_skip_aggregation(isolated_cache, use_fake_github, monkeypatch):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS})):
+        utils.get_country_counts("acme/widgets")
+    calls = count_resolutions(monkeypatch)
+
+    assert utils.get_country_counts("acme/widgets") == ({"pt": 2, "ke": 1}, utils.CACHE_HIT)
+    assert calls == []
+
+
+def test_resolver_change_recounts_once(isolated_cache, use_fake_github, monkeypatch):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS})):
+        utils.get_country_counts("acme/widgets")
+    monkeypatch.setattr(utils.get_resolver(), "version", "new-rules")
+    calls = count_resolutions(monkeypatch)
+
+    assert utils.get_country_counts("acme/widgets")[0] == {"pt": 2, "ke": 1}
+    assert utils.get_country_counts("acme/widgets")[0] == {"pt": 2, "ke": 1}
+    assert len(calls) == 1
+    assert utils.repo_cache["acme/widgets"]["counts_version"] == "new-rules"
+
+
+def test_entries_without_counts_are_backfilled(isolated_cache):
+    data = [{"login": login, "location": location} for login, location in USERS]
+    utils.repo_cache["acme/widgets"] = {"timestamp": time.time(), "data": data, "pages": []}
+
+    assert utils.get_country_counts("acme/widgets") == ({"pt": 2, "ke": 1}, utils.CACHE_HIT)
+    assert utils.repo_cache["acme/widgets"]["counts"] == {"pt": 2, "ke": 1}
@@ -0,0 +1,52 @@
+import os
+
+import pycountry
+
+import utils
+from country_index import INDEX_FORMAT, load_country_index
+from resolver import CountryResolver
+
+CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "locations.txt")
+
+
+class PycountryFuzzy:
+    """The fuzzy passes as they were before the index: straight to pycountry."""
+
+    version = "pycountry"
+
+    def search(self, query):
+        try:
+            return pycountry.countries.search_fuzzy(query)[0].alpha_2.lower()
+        except LookupError:
+            return None
+
+    def name_in(self, text):
+        for country in pycountry.countries:
+            if country.name.lower() in text:
+                return country.alpha_2.lower()
+        return None
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def test_shipped_index_matches_installed_pycountry():
+    index = load_country_index()
+    assert index.version == f"{INDEX_FORMAT}-{pycountry.__version__}"
+
+
+def test_index_matches_search_fuzzy():
+    index = load_country_index()
+    reference = PycountryFuzzy()
+    queries = ["place", "de", "ca", "bavaria", "karnataka", "state", "province",
+               "côte d'ivoire", "são", "new", "x", "zürich", "tamil nadu", "congo"]
+    for query in queries:
+        assert index.search(query) == reference.search(query), query
+
+
+def test_resolver_matches_pycountry_on_real_world_corpus():
+    reference = CountryResolver(utils.COUNTRY_MAP, utils.LOCATION_BLOCKLIST, PycountryFuzzy())
+    for location in load_corpus():
+        assert utils.get_resolver().resolve(location) == reference.resolve(location), location
@@ -0,0 +1,108 @@
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+from github_client import GitHubClient, GitHubError
+
+
+# Retries without the production backoff
+retrying_client = pytest.mark.parametrize("github_client", [{"max_retries": 2, "backoff": 0.001}], indirect=True)
+
+
+def make_users(n):
+    return [(f"user{i}", "Lagos, Nigeria") for i in range(n)]
+
+
+@retrying_client
+def test_connections_are_reused(isolated_cache, use_fake_github, github_client):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(10)})) as fake:
+        utils.get_all_contributors("acme/widgets", max_workers=1)
+    assert len(fake.requests) == 11
+    assert len(fake.connections) == 1
+
+
+@retrying_client
+def test_transient_errors_are_retried(isolated_cache, use_fake_github, github_client):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(150)})) as fake:
+        fake.fail("/repos/acme/widgets/contributors?per_page=100&page=2", 2)
+        fake.fail("/users/user3", 1, status=503)
+        result = utils.get_all_contributors("acme/widgets")
+    assert len(result) == 150
+    assert result[3]["location"] == "Lagos, Nigeria"
+
+
+@retrying_client
+def test_exhausted_retries_never_cache_a_partial_list(isolated_cache, use_fake_github, github_client):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(150)})) as fake:
+        fake.fail("/repos/acme/widgets/contributors?per_page=100&page=2", 5)
+        with pytest.raises(GitHubError):
+            utils.get_all_contributors("acme/widgets")
+    assert "acme/widgets" not in utils.repo_cache
+
+
+@retrying_client
+def test_exhausted_retries_serve_previous_list(isolated_cache, use_fake_github, github_client):
+    previous = [{"login": "old", "location": "Oslo"}]
+    utils.repo_cache["acme/widgets"] = {"timestamp": 0, "data": previous}
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(3)})) as fake:
+        fake.fail("/repos/acme/widgets/contributors?per_page=100&page=1", 5)
+        assert utils.get_all_contributors("acme/widgets") == previous
+
+
+def test_client_errors_are_not_retried(use_fake_github):
+    client = GitHubClient(max_retries=3, backoff=0.001)
+    with FakeGitHub({}) as fake:
+        resp = client.get(f"{fake.url}/repos/acme/missing/contributors")
+    assert resp.status_code == 404
+    assert len(fake.requests) == 1
+
+
+def test_other_request_errors_are_retried_then_raised(monkeypatch):
+    import requests
+
+    client = GitHubClient(max_retries=2, backoff=0.001)
+    calls = []
+
+    def broken_get(url, **kwargs):
+        calls.append(url)
+        raise requests.exceptions.ChunkedEncodingError("connection broken")
+    monkeypatch.setattr(client.session, "get", broken_get)
+    with pytest.raises(GitHubError):
+        client.get("https://api.github.test/users/ana")
+    assert len(calls) == 3
+
+
+@retrying_client
+def test_unreadable_profile_does_not_abort_the_crawl(isolated_cache, use_fake_github, github_client, monkeypatch):
+    get = github_client.session.get
+
+    def get_with_bad_profile(url, **kwargs):
+        resp = get(url, **kwargs)
+        if url.endswith("/users/user3"):
+            resp._content = b"<html>Unicorn!</html>"
+        return resp
+    monkeypatch.setattr(github_client.session, "get", get_with_bad_profile)
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(5)})):
+        result = utils.get_all_contributors("acme/widgets")
+    assert [c["location"] for c in result] == ["Lagos, Nigeria"] * 3 + [None] + ["Lagos, Nigeria"]
+
+
+@retrying_client
+@pytest.mark.parametrize("body", [b'[{"login": "ana", "url"', b'[{"name": "ana"}]', b'["ana"]'])
+def test_malformed_contributors_page_serves_previous_list(isolated_cache, use_fake_github, github_client,
+                                                          monkeypatch, body):
+    get = github_client.session.get
+
+    def get_with_bad_page(url, **kwargs):
+        resp = get(url, **kwargs)
+        if url.endswith("/contributors"):
+            resp._content = body
+        return resp
+    monkeypatch.setattr(github_client.session, "get", get_with_bad_page)
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(3)})):
+        with pytest.raises(GitHubError):
+            utils.get_all_contributors("acme/widgets")
+
+        previous = [{"login": "old", "location": "Oslo"}]
+        utils.repo_cache["acme/widgets"] = {"timestamp": 0, "data": previous}
+        assert utils.get_all_contributors("acme/widgets") == previous
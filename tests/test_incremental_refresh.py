@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+
+
+pytestmark = pytest.mark.usefixtures("github_client")
+
+
+def make_users(n):
+    return [(f"user{i}", "Hanoi, Vietnam") for i in range(n)]
+
+
+def expire(repo):
+    entry = utils.repo_cache[repo]
+    entry["timestamp"] = 0
+    utils.repo_cache[repo] = entry
+
+
+def test_refresh_fetches_only_new_contributors(isolated_cache, use_fake_github):
+    users = make_users(20)
+    with use_fake_github(FakeGitHub({"acme/widgets": users})) as fake:
+        utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/") == 20
+
+        users.append(("newcomer", "Manila, Philippines"))
+        expire("acme/widgets")
+        result = utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/") == 21
+        assert fake.count("/users/newcomer") == 1
+
+    assert result[-1] == {"login": "newcomer", "location": "Manila, Philippines"}
+
+
+def test_due_profiles_are_rechecked(isolated_cache, use_fake_github):
+    users = make_users(5)
+    with use_fake_github(FakeGitHub({"acme/widgets": users})) as fake:
+        utils.get_all_contributors("acme/widgets")
+        users[2] = ("user2", "Seoul, South Korea")
+        utils.user_checks["user2"] = {"next": 0, "error": False}
+
+        expire("acme/widgets")
+        result = utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/") == 6
+        assert fake.count("/users/user2") == 2
+
+    assert result[2]["location"] == "Seoul, South Korea"
+    assert utils.user_checks["user2"]["next"] > time.time()
+
+
+def test_recheck_times_are_jittered(isolated_cache, use_fake_github):
+    start = time.time()
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(30)})):
+        utils.get_all_contributors("acme/widgets")
+
+    due = [check["next"] - start for check in utils.user_checks.values()]
+    low = utils.LOCATION_TTL_SECONDS * (1 - utils.LOCATION_TTL_JITTER) - 5
+    high = utils.LOCATION_TTL_SECONDS * (1 + utils.LOCATION_TTL_JITTER) + 5
+    assert len(due) == 30
+    assert all(low <= d <= high for d in due)
+    assert len({round(d) for d in due}) > 1
+
+
+def test_failed_fetch_is_retried_after_negative_ttl(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(3)})) as fake:
+        fake.fail("/users/user1", 1, status=403)
+        result = utils.get_all_contributors("acme/widgets")
+        assert result[1]["location"] is None
+        assert "user1" not in utils.user_locations
+        check = utils.user_checks["user1"]
+        assert check["error"] is True
+        assert check["next"] <= time.time() + utils.LOCATION_ERROR_TTL_SECONDS
+
+        # Not retried before the negative TTL runs out...
+        expire("acme/widgets")
+        utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/user1") == 1
+
+        # ...and fetched normally once it has
+        utils.user_checks["user1"] = {**check, "next": 0}
+        expire("acme/widgets")
+        result = utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/user1") == 2
+
+    assert result[1]["location"] == "Hanoi, Vietnam"
+    assert utils.user_checks["user1"]["error"] is False
+
+
+def test_user_awaiting_retry_makes_other_repos_partial(isolated_cache, use_fake_github):
+    users = make_users(3)
+    with use_fake_github(FakeGitHub({"acme/widgets": users, "acme/gadgets": users[:2]})) as fake:
+        fake.fail("/users/user1", 1, status=502)
+        utils.get_all_contributors("acme/widgets")
+        result = utils.get_all_contributors("acme/gadgets")
+        assert fake.count("/users/user1") == 1
+
+    assert result[1]["location"] is None
+    assert utils.repo_cache["acme/gadgets"]["partial"] is True
+
+
+def test_failed_recheck_keeps_previous_location(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(2)})) as fake:
+        utils.get_all_contributors("acme/widgets")
+        utils.user_checks["user0"] = {"next": 0, "error": False}
+        fake.fail("/users/user0", 1, status=502)
+
+        expire("acme/widgets")
+        result = utils.get_all_contributors("acme/widgets")
+
+    assert result[0]["location"] == "Hanoi, Vietnam"
+    assert utils.user_checks["user0"]["error"] is True
+
+
+def test_legacy_locations_are_scheduled_not_refetched(isolated_cache, use_fake_github):
+    utils.user_locations["user0"] = "Hanoi, Vietnam"
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(2)})) as fake:
+        utils.get_all_contributors("acme/widgets")
+        assert fake.count("/users/user0") == 0
+
+    assert time.time() <= utils.user_checks["user0"]["next"] <= time.time() + utils.LOCATION_TTL_SECONDS
@@ -1,10 +1,11 @@
-import sys
 import os
+import sys
 
-# Add the project root to sys.path to import api.utils
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+if __name__ == "__main__":
+    # Run as a script, without conftest: add the api directory to sys.path
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'api')))
 
-from api.utils import resolve_country_code
+from utils import resolve_country_code  # noqa: E402
 
 test_cases = [
     # NORTH AMERICA
@@ -96,25 +97,35 @@ test_cases = [
     ("Unknown Place", None),
 ]
 
-passed = 0
-failed = 0
 
-print(f"{'Location':<30} | {'Expected':<8} | {'Actual':<8} | {'Status'}")
-print("-" * 60)
+def run_cases():
+    """Print the resolution table and return the number of failed cases."""
+    passed = 0
+    failed = 0
 
-for loc, expected in test_cases:
-    actual = resolve_country_code(loc)
-    status = "✅ PASS" if actual == expected else "❌ FAIL"
-    if actual == expected:
-        passed += 1
-    else:
-        failed += 1
-    print(f"{loc:<30} | {str(expected):<8} | {str(actual):<8} | {status}")
+    print(f"{'Location':<30} | {'Expected':<8} | {'Actual':<8} | {'Status'}")
+    print("-" * 60)
+
+    for loc, expected in test_cases:
+        actual = resolve_country_code(loc)
+        status = "✅ PASS" if actual == expected else "❌ FAIL"
+        if actual == expected:
+            passed += 1
+        else:
+            failed += 1
+        print(f"{loc:<30} | {str(expected):<8} | {str(actual):<8} | {status}")
 
-print("-" * 60)
-print(f"Total: {passed + failed} | Passed: {passed} | Failed: {failed}")
+    print("-" * 60)
+    print(f"Total: {passed + failed} | Passed: {passed} | Failed: {failed}")
+    return failed
 
-if failed > 0:
-    sys.exit(1)
-else:
-    sys.exit(0)
+
+def test_location_resolution():
+    assert run_cases() == 0
+
+
+if __name__ == "__main__":
+    if run_cases() > 0:
+        sys.exit(1)
+    else:
+        sys.exit(0)
@@ -0,0 +1,129 @@
+import math
+
+import pytest
+from lxml import etree
+
+import map_lod
+import widget
+
+SVG_PATH = "{http://www.w3.org/2000/svg}path"
+
+
+def _shapes(path):
+    root = etree.parse(path).getroot()
+    return {node.get("id"): map_lod.parse_path(node.get("d")) for node in root.iter(SVG_PATH)}
+
+
+def test_parse_path_follows_relative_moves_after_close():
+    rings = map_lod.parse_path("m 10,10 5,0 0,5 z m 20,0 l 1,1 -1,1 z M 0,0 H 3 V 4 h -3 Z")
+    assert rings == [
+        [(10, 10), (15, 10), (15, 15)],
+        [(30, 10), (31, 11), (30, 12)],
+        [(0, 0), (3, 0), (3, 4), (0, 4)],
+    ]
+    assert map_lod.parse_path("M 0,0 C 1,1 2,2 3,3 Z") is None
+
+
+def test_format_path_round_trips_without_drift():
+    rings = [[(0.04, 0.04), (10.06, 0.04), (10.06, 9.96)], [(100.0, 100.0), (101.5, 100.0), (101.5, 101.5)]]
+    parsed = map_lod.parse_path(map_lod.format_path(rings, 1))
+    for ring, expected in zip(parsed, rings):
+        for (x, y), (ex, ey) in zip(ring, expected):
+            assert abs(x - ex) <= 0.05 + 1e-9 and abs(y - ey) <= 0.05 + 1e-9
+
+
+def test_simplify_ring_keeps_a_triangle():
+    sliver = [(0, 0), (1, 0.01), (2, 0), (3, 0.01), (4, 0), (2, -0.01)]
+    simplified = map_lod.simplify_ring(sliver, 1.0)
+    assert len(simplified) == 3
+    assert all(point in sliver for point in simplified)
+
+
+@pytest.mark.parametrize("detail", list(map_lod.LOD_LEVELS))
+def test_simplified_shapes_stay_within_tolerance(detail):
+    tolerance, decimals = map_lod.LOD_LEVELS[detail]
+    rounding = math.hypot(0.5, 0.5) * 10 ** -decimals + 1e-6
+    original = _shapes(map_lod.MAP_FILE)
+    simplified = _shapes(map_lod.lod_path(detail))
+    assert simplified.keys() == original.keys()
+
+    for shape_id, rings in original.items():
+        largest = max(range(len(rings)), key=lambda i: map_lod.ring_extent(rings[i]))
+        kept = [ring for i, ring in enumerate(rings) if i == largest or map_lod.ring_extent(ring) >= tolerance]
+        assert len(simplified[shape_id]) == len(kept), shape_id
+
+        for ring, lod_ring in zip(kept, simplified[shape_id]):
+            assert 3 <= len(lod_ring) <= len(ring)
+            # Simplified vertices are original vertices, in order
+            indices, start = [], 0
+            for x, y in lod_ring:
+                start = next(i for i in range(start, len(ring))
+                             if math.hypot(ring[i][0] - x, ring[i][1] - y) <= rounding)
+                indices.append(start)
+            # Every dropped vertex lies within tolerance of the edge replacing it
+            indices.append(len(ring))
+            closed = lod_ring + lod_ring[:1]
+            for edge, (first, last) in enumerate(zip(indices, indices[1:])):
+                for i in range(first, last):
+                    distance = map_lod.segment_distance(ring[i], closed[edge], closed[edge + 1])
+                    assert distance <= tolerance + rounding, (shape_id, i)
+
+
+@pytest.mark.parametrize("detail", list(map_lod.LOD_LEVELS))
+def test_shipped_levels_are_up_to_date(detail):
+    with open(map_lod.lod_path(detail), "rb") as f:
+        assert f.read() == map_lod.build_lod(detail)
+
+
+def test_levels_share_codes_and_shrink():
+    full = widget.get_map_template("full")
+    sizes = []
+    for detail in map_lod.DETAIL_LEVELS:
+        template = widget.get_map_template(detail)
+        assert template.codes == full.codes
+        assert template.viewbox == full.viewbox
+        sizes.append(len(widget.render_map_only({"us": 3}, detail=detail)))
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[-1] < sizes[0] * 0.6
+
+
+def test_missing_level_is_built_in_memory(monkeypatch, tmp_path):
+    monkeypatch.setattr(widget, "lod_path", lambda detail: str(tmp_path / f"{detail}.svg"))
+    root = widget.load_map_svg("low")
+    assert len(list(root.iter(SVG_PATH))) == len(_shapes(map_lod.MAP_FILE))
+
+
+def test_width_picks_the_coarsest_adequate_level():
+    assert widget.pick_map_detail("list", None) == widget.MAP_DETAIL
+    assert widget.pick_map_detail("list", 400) == "low"
+    assert widget.pick_map_detail("list", 1200) == "high"
+    assert widget.pick_map_detail("map", 800) == "high"
+    assert widget.pick_map_detail("map", 10000) == "full"
+
+
+def test_width_is_picked_without_building_a_template(client):
+    widget.get_map_template.cache_clear()
+    assert widget.pick_map_detail("map", 800) == "high"
+    assert client.get("/api/heatmap?repo=bad&width=300").status_code == 400
+    assert widget.get_map_template.cache_info().currsize == 0
+    assert widget._map_viewbox() == widget.get_map_template().viewbox
+
+
+def test_heatmap_detail_parameters(client, fake_contributors):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    base = "/api/heatmap?repo=acme/widgets&variant=map"
+
+    full = client.get(base)
+    low = client.get(base + "&detail=low")
+    narrow = client.get(base + "&width=300")
+    bogus = client.get(base + "&detail=ultra&width=wide")
+    huge = client.get(base + "&width=" + "9" * 5000)
+    superscript = client.get(base + "&width=%C2%B2")
+
+    assert low.status_code == narrow.status_code == 200
+    assert low.data == narrow.data
+    assert len(low.data) < len(full.data)
+    assert low.headers["ETag"] != full.headers["ETag"]
+    assert bogus.data == full.data
+    assert huge.status_code == superscript.status_code == 200
+    assert huge.data == superscript.data == full.data
@@ -0,0 +1,35 @@
+import hashlib
+
+import widget
+from render_cases import CASES, EXPECTED_DIGESTS, RENDERERS
+
+
+def test_template_output_is_byte_identical():
+    for name, counts in CASES.items():
+        for theme in ("light", "dark"):
+            for variant, render in RENDERERS.items():
+                key = f"{name}-{variant}-{theme}"
+                digest = hashlib.sha256(render(counts, theme)).hexdigest()
+                assert digest == EXPECTED_DIGESTS[key], key
+
+
+def test_template_fills_follow_country_counts():
+    template = widget.get_map_template()
+    counts = CASES["mixed"]
+    layer = widget.etree.fromstring(
+        template.render_fills("translate(1, 2) scale(0.5)", counts, 42, widget.get_color, "#ffffff")
+    )
+
+    assert layer.get("transform") == "translate(1, 2) scale(0.5)"
+    shapes = [node for node in layer.iter() if node.get("class") == "country-fill"]
+    assert len(shapes) == len(template.codes)
+    for node in shapes:
+        code = widget.node_country_code(node)
+        expected = widget.get_color(counts.get(code, 0), 42) if code else "#ffffff"
+        assert node.get("fill") == expected
+
+
+def test_template_is_compiled_once():
+    assert widget.get_map_template() is widget.get_map_template()
+    template = widget.get_map_template()
+    assert "us" in template.codes and "de" in template.codes
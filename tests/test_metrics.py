@@ -0,0 +1,109 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+import utils
+import widget
+from fake_github import FakeGitHub
+
+URL = "/api/heatmap?repo=acme/widgets&variant=map"
+REPOS = {"acme/widgets": [("ana", "Lisbon, Portugal"), ("bo", "Nairobi, Kenya"), ("cy", None)]}
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    # Metrics declared by a test leave the app's registry as it was
+    monkeypatch.setattr(metrics, "_registry", dict(metrics._registry))
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _samples(text):
+    """``{"name{labels}": value}`` of an exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def test_exposition_format(enabled):
+    counter = metrics.Counter("test_events_total", "Events.", ("kind",))
+    histogram = metrics.Histogram("test_seconds", "Durations.", buckets=(0.1, 1.0))
+    counter.inc(kind='say "hi"\n')
+    counter.inc(2, kind="b")
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    text = metrics.render()
+    assert "# TYPE test_events_total counter" in text
+    assert "# TYPE test_seconds histogram" in text
+    samples = _samples(text)
+    assert samples['test_events_total{kind="say \\"hi\\"\\n"}'] == 1
+    assert samples['test_events_total{kind="b"}'] == 2
+    assert samples['test_seconds_bucket{le="0.1"}'] == 1
+    assert samples['test_seconds_bucket{le="1"}'] == 2
+    assert samples['test_seconds_bucket{le="+Inf"}'] == 3
+    assert samples["test_seconds_count"] == 3
+    assert samples["test_seconds_sum"] == pytest.approx(5.55)
+
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+
+def test_concurrent_updates_are_not_lost(enabled):
+    counter = metrics.Counter("test_concurrent_total", "Events.", ("kind",))
+    histogram = metrics.Histogram("test_concurrent_seconds", "Durations.")
+
+    def work(i):
+        for _ in range(1000):
+            counter.inc(kind=str(i % 2))
+            histogram.observe(0.01)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(8)))
+
+    assert counter.value(kind="0") + counter.value(kind="1") == 8000
+    assert _samples(metrics.render())["test_concurrent_seconds_count"] == 8000
+
+
+def test_disabled_metrics_record_nothing(client, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    monkeypatch.setattr(metrics, "_registry", dict(metrics._registry))
+    counter = metrics.Counter("test_disabled_total", "Events.")
+    counter.inc()
+    assert counter.value() == 0
+    assert client.get("/api/metrics").status_code == 404
+
+
+def test_endpoint_reports_caches_github_and_latency(client, enabled, isolated_cache, github_client,
+                                                     use_fake_github, monkeypatch):
+    monkeypatch.setattr(widget, "rendered_svgs", utils.LRUCache(16))
+    with use_fake_github(FakeGitHub(REPOS, rate_limit=100)) as fake:
+        assert client.get(URL).status_code == 200
+        assert client.get(URL).status_code == 200
+        calls = len(fake.requests)
+
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(response.get_data(as_text=True))
+
+    assert samples['heatmap_cache_lookups_total{cache="repo_cache",result="miss"}'] == 1
+    assert samples['heatmap_cache_lookups_total{cache="repo_cache",result="hit"}'] == 1
+    assert samples['heatmap_cache_lookups_total{cache="user_locations",result="miss"}'] == 3
+    assert samples['heatmap_cache_lookups_total{cache="render",result="hit"}'] == 1
+    assert samples['heatmap_cache_lookups_total{cache="render",result="miss"}'] == 1
+    assert samples['heatmap_github_requests_total{status="200"}'] == calls
+    assert samples["heatmap_github_rate_limit_limit"] == 100
+    assert samples["heatmap_github_rate_limit_remaining"] == 100 - calls
+    assert samples['heatmap_render_seconds_count{variant="map"}'] == 1
+    assert samples['heatmap_request_seconds_count{endpoint="heatmap",cache="miss"}'] == 1
+    assert samples['heatmap_request_seconds_count{endpoint="heatmap",cache="hit"}'] == 1
+    assert samples['heatmap_responses_total{endpoint="heatmap",status="200"}'] == 2
+    assert re.search(r'heatmap_request_seconds_bucket\{endpoint="heatmap",cache="miss",le="\+Inf"\} 1',
+                     response.get_data(as_text=True))
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+from github_client import GitHubError, INTERACTIVE
+
+CONTRIBUTORS = "/repos/acme/widgets/contributors"
+LATENCY = 0.05
+
+
+pytestmark = pytest.mark.usefixtures("github_client")
+
+
+def make_users(n):
+    return [(f"user{i}", None) for i in range(n)]
+
+
+def fetch_pages(cached_pages=(), workers=16):
+    return utils._fetch_contributors_pages("acme/widgets", list(cached_pages), workers, INTERACTIVE)
+
+
+def test_pages_are_fetched_concurrently_and_in_order(use_fake_github):
+    users = make_users(1050)
+    with use_fake_github(FakeGitHub({"acme/widgets": users}, latency=LATENCY)) as fake:
+        start = time.perf_counter()
+        pages = fetch_pages()
+        elapsed = time.perf_counter() - start
+        assert fake.count(CONTRIBUTORS) == 11
+
+    # 11 sequential pages cost 11 latencies; page 1 then the rest at once ~2
+    assert elapsed < 5 * LATENCY
+    logins = [item["login"] for page in pages for item in page["items"]]
+    assert logins == [login for login, _ in users]
+
+
+def test_single_page_needs_one_request(use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(40)})) as fake:
+        pages = fetch_pages()
+        assert fake.count(CONTRIBUTORS) == 1
+    assert len(pages) == 1 and len(pages[0]["items"]) == 40
+
+
+def test_growth_past_known_pages_is_followed(use_fake_github):
+    users = make_users(200)
+    with use_fake_github(FakeGitHub({"acme/widgets": users})) as fake:
+        cached = fetch_pages()
+        assert len(cached) == 3 and cached[-1]["items"] == []
+
+        # Page 1 is unchanged (a 304 carries no Link), so the stored page
+        # count is the starting point — the new users sit on page 3
+        users.extend(make_users(260)[200:])
+        pages = fetch_pages(cached)
+        assert fake.status_counts(CONTRIBUTORS) == {200: 3 + 1, 304: 2}
+
+    assert len(pages) == 3
+    assert sum(len(page["items"]) for page in pages) == 260
+
+
+def test_failed_page_fails_the_listing(use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(350)})) as fake:
+        fake.fail(f"{CONTRIBUTORS}?per_page=100&page=3", 1)
+        with pytest.raises(GitHubError):
+            fetch_pages()
+
+
+def test_unexpected_status_on_a_later_page_is_never_cached(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(350)})) as fake:
+        fake.fail(f"{CONTRIBUTORS}?per_page=100&page=3", 1, status=422)
+        with pytest.raises(GitHubError):
+            utils.get_all_contributors("acme/widgets")
+    assert "acme/widgets" not in utils.repo_cache
+
+
+def test_crawl_uses_parallel_listing(isolated_cache, use_fake_github):
+    users = make_users(450)
+    utils.user_locations.update_many({login: None for login, _ in users})
+    utils.user_checks.update_many({login: {"next": time.time() + 3600, "error": False} for login, _ in users})
+    with use_fake_github(FakeGitHub({"acme/widgets": users}, latency=LATENCY)) as fake:
+        start = time.perf_counter()
+        result = utils.get_all_contributors("acme/widgets")
+        assert time.perf_counter() - start < 4 * LATENCY
+        assert fake.count("/users/") == 0
+    assert len(result) == 450
@@ -0,0 +1,95 @@
+import json
+import pstats
+import time
+
+import pytest
+
+import profiling
+import widget
+
+URL = "/api/heatmap?repo=acme/widgets&variant=map"
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def profile_dir(monkeypatch, tmp_path, fake_contributors):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", SECRET)
+    monkeypatch.setattr(profiling, "PROFILE_THRESHOLD_MS", 10_000)
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    return tmp_path / "profiles"
+
+
+def _names():
+    return [row["name"] for row in profiling.list_profiles()]
+
+
+def test_secret_param_forces_a_cprofile(client, profile_dir):
+    assert client.get(URL + "&theme=dark&profile=wrong").status_code == 200
+    assert _names() == []
+
+    assert client.get(URL + f"&profile={SECRET}").status_code == 200
+    [name] = _names()
+    assert name.endswith(".prof") and "acme_widgets" in name
+    stats = pstats.Stats(str(profile_dir / name))
+    assert any(func[2] == "render_map_only" for func in stats.stats)
+    assert "render_map_only" in profiling.summarize(str(profile_dir / name))
+
+
+def test_slow_requests_keep_their_samples(client, profile_dir, monkeypatch):
+    assert client.get(URL).status_code == 200
+    assert _names() == []
+
+    slow_counts = widget.get_country_counts
+
+    def get_country_counts(repo_name, force_refresh=False):
+        time.sleep(0.1)
+        return slow_counts(repo_name, force_refresh)
+
+    monkeypatch.setattr(widget, "get_country_counts", get_country_counts)
+    monkeypatch.setattr(profiling, "PROFILE_THRESHOLD_MS", 50)
+    assert client.get(URL).status_code == 200
+    [name] = _names()
+    assert name.endswith(".folded")
+    folded = (profile_dir / name).read_text()
+    assert "get_country_counts (test_profiling.py" in folded
+    assert all(line.rpartition(" ")[2].isdigit() for line in folded.splitlines())
+    assert "samples" in profiling.summarize(str(profile_dir / name))
+
+
+def test_ring_buffer_keeps_the_newest(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 3)
+    saved = [profiling.save_profile(f"repo {i}", 0.01 * i, ".folded", b"a;b 1\n") for i in range(5)]
+    assert sorted(_names()) == sorted(saved[2:])
+
+
+def test_profiles_endpoints_need_the_secret(client, profile_dir):
+    client.get(URL + f"&profile={SECRET}")
+    [name] = _names()
+
+    assert client.get("/api/profiles").status_code == 404
+    assert client.get(f"/api/profiles/{name}?secret=wrong").status_code == 404
+    listing = client.get(f"/api/profiles?secret={SECRET}")
+    assert [row["name"] for row in json.loads(listing.data)] == [name]
+
+    download = client.get(f"/api/profiles/{name}?secret={SECRET}")
+    assert download.status_code == 200
+    assert download.data == (profile_dir / name).read_bytes()
+    assert client.get(f"/api/profiles/..%2Fcache.db?secret={SECRET}").status_code == 404
+
+
+def test_disabled_without_profile_dir(client, fake_contributors, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", SECRET)
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    assert client.get(URL + f"&profile={SECRET}").status_code == 200
+    assert client.get(f"/api/profiles?secret={SECRET}").status_code == 404
+
+
+def test_cli_lists_and_summarizes(profile_dir, capsys):
+    name = profiling.save_profile("acme/widgets", 2.5, ".folded", b"main;crawl 3\nmain;render 1\n")
+    assert profiling.main([]) == 0
+    assert name in capsys.readouterr().out
+    assert profiling.main([name]) == 0
+    out = capsys.readouterr().out
+    assert "4 samples" in out and "75.0%  crawl" in out
+    assert profiling.main(["missing.prof"]) == 1
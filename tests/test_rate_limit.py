@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+from github_client import BACKGROUND, INTERACTIVE, GitHubClient, RateLimitError
+
+
+@pytest.fixture
+def gh(monkeypatch):
+    client = GitHubClient(max_retries=1, backoff=0.001, max_rate_wait=1)
+    monkeypatch.setattr(utils, "github", client)
+    return client
+
+
+def make_users(n):
+    return [(f"user{i}", "Accra, Ghana") for i in range(n)]
+
+
+def test_budget_follows_rate_limit_headers(gh):
+    with FakeGitHub({"acme/widgets": make_users(1)}, rate_limit=10) as fake:
+        gh.get(f"{fake.url}/users/user0")
+    assert gh.budget.snapshot()["limit"] == 10
+    assert gh.budget.snapshot()["remaining"] == 9
+    assert gh.budget.snapshot()["reset_at"] == fake.rate_reset
+
+
+def test_exhausted_budget_fails_without_a_request(gh):
+    with FakeGitHub({"acme/widgets": make_users(1)}, rate_limit=2) as fake:
+        gh.get(f"{fake.url}/users/user0")
+        gh.get(f"{fake.url}/users/user0", headers={"If-None-Match": "stale"})
+        with pytest.raises(RateLimitError) as exc:
+            gh.get(f"{fake.url}/users/user0")
+        assert len(fake.requests) == 2
+    assert exc.value.reset_at == fake.rate_reset
+
+
+def test_background_requests_leave_a_reserve(gh):
+    with FakeGitHub({"acme/widgets": make_users(1)}, rate_limit=10) as fake:
+        url = f"{fake.url}/users/user0"
+        gh.get(url, priority=BACKGROUND)
+        assert gh.budget.available(BACKGROUND) == 7
+        for _ in range(7):
+            gh.get(url, priority=BACKGROUND)
+        with pytest.raises(RateLimitError):
+            gh.get(url, priority=BACKGROUND)
+        gh.get(url, priority=INTERACTIVE)
+    assert gh.budget.available(INTERACTIVE) == 1
+
+
+def test_short_retry_after_is_waited_out(gh):
+    with FakeGitHub({"acme/widgets": make_users(1)}) as fake:
+        fake.throttle(1, retry_after=0)
+        assert gh.get(f"{fake.url}/users/user0").status_code == 200
+        assert fake.status_counts("/users/") == {429: 1, 200: 1}
+
+
+def test_long_retry_after_blocks_the_client(gh):
+    with FakeGitHub({"acme/widgets": make_users(1)}) as fake:
+        fake.throttle(1, retry_after=60)
+        with pytest.raises(RateLimitError):
+            gh.get(f"{fake.url}/users/user0")
+        with pytest.raises(RateLimitError):
+            gh.get(f"{fake.url}/users/user0")
+        assert len(fake.requests) == 1
+    assert gh.budget.snapshot()["blocked_until"] > time.time() + 50
+
+
+def test_low_budget_serves_a_partial_crawl(isolated_cache, use_fake_github, gh):
+    # One contributors page plus three profiles; the fourth request primes the budget
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(6)}, rate_limit=4)) as fake:
+        result = utils.get_all_contributors("acme/widgets")
+        assert 403 not in fake.status_counts("/")
+
+    assert len(result) == 6
+    assert sum(1 for user in result if user["location"]) == 3
+    assert utils.repo_cache["acme/widgets"]["partial"] is True
+    # Deferred users stay due for the next crawl
+    assert len(utils.user_checks) == 3
+    assert utils.get_contributors("acme/widgets")[1] == utils.CACHE_HIT
+
+
+def test_partial_entries_expire_early(isolated_cache, use_fake_github, gh, monkeypatch):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(6)}, rate_limit=4)):
+        utils.get_all_contributors("acme/widgets")
+    entry = utils.repo_cache["acme/widgets"]
+    entry["timestamp"] -= utils.LOCATION_ERROR_TTL_SECONDS + 1
+    utils.repo_cache["acme/widgets"] = entry
+    # Pretend a refresh is already queued so none is started
+    monkeypatch.setattr(utils, "_scheduled_refreshes", {"acme/widgets"})
+    assert utils.get_contributors("acme/widgets")[1] == utils.CACHE_STALE
+
+
+def test_background_refresh_yields_to_visitors(isolated_cache, use_fake_github, gh):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(2)}, rate_limit=10)) as fake:
+        utils.get_all_contributors("acme/widgets")
+        before = len(fake.requests)
+        # 10 - 3 = 7 left, background floor is 2: spend down to the floor
+        for _ in range(5):
+            gh.get(f"{fake.url}/users/user0")
+
+        with pytest.raises(RateLimitError):
+            utils._crawl_contributors("acme/widgets", None, None, BACKGROUND)
+        assert len(fake.requests) == before + 5
+
+
+def test_refresh_cooldown(isolated_cache, use_fake_github, gh, client):
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(2)})) as fake:
+        first = client.get("/api/heatmap?repo=acme/widgets&refresh=1")
+        second = client.get("/api/heatmap?repo=acme/widgets&refresh=1")
+        assert fake.count("/repos/acme/widgets/contributors") == 1
+
+    assert first.headers["X-Cache-Status"] == "BYPASS"
+    assert second.headers["X-Cache-Status"] == "HIT"
+
+
+def test_heatmap_reports_rate_limit_as_503(isolated_cache, use_fake_github, gh, client):
+    gh.budget.block(time.time() + 30)
+    with use_fake_github(FakeGitHub({"acme/widgets": make_users(2)})) as fake:
+        resp = client.get("/api/heatmap?repo=acme/widgets")
+        assert not fake.requests
+
+    assert resp.status_code == 503
+    assert 25 <= int(resp.headers["Retry-After"]) <= 30
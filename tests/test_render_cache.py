@@ -0,0 +1,85 @@
+import widget
+
+URL = "/api/heatmap?repo=acme/widgets&variant=map&theme=dark"
+
+
+def count_renders(monkeypatch):
+    calls = []
+    original = widget._RENDERERS["map"]
+
+    def render(country_counts, theme, **options):
+        calls.append(theme)
+        return original(country_counts, theme, **options)
+
+    monkeypatch.setitem(widget._RENDERERS, "map", render)
+    return calls
+
+
+def test_identical_requests_render_once(client, fake_contributors, monkeypatch):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    calls = count_renders(monkeypatch)
+
+    first = client.get(URL)
+    second = client.get(URL)
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.headers["Content-Type"].startswith("image/svg+xml")
+    assert len(calls) == 1
+
+
+def test_if_none_match_returns_304_without_rendering(client, fake_contributors, monkeypatch):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    etag = client.get(URL).headers["ETag"]
+    calls = count_renders(monkeypatch)
+
+    resp = client.get(URL, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
+    assert "s-maxage" in resp.headers["Cache-Control"]
+    assert calls == []
+
+
+def test_etag_changes_with_counts_and_theme(client, fake_contributors):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    before = client.get(URL).headers["ETag"]
+    light = client.get(URL.replace("dark", "light")).headers["ETag"]
+
+    fake_contributors["acme/widgets"].append({"login": "b", "location": "Lima"})
+    after = client.get(URL)
+    assert len({before, light, after.headers["ETag"]}) == 3
+    assert client.get(URL, headers={"If-None-Match": before}).status_code == 200
+
+
+def test_disk_tier_survives_memory_eviction(client, fake_contributors, monkeypatch, tmp_path):
+    monkeypatch.setattr(widget, "RENDER_CACHE_DIR", str(tmp_path / "rendered"))
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    body = client.get(URL).data
+
+    widget.rendered_svgs = widget.LRUCache(16)
+    calls = count_renders(monkeypatch)
+    assert client.get(URL).data == body
+    assert calls == []
+
+
+def test_renderer_version_tracks_every_render_module(monkeypatch, tmp_path):
+    inputs = widget._renderer_inputs()
+    assert {"widget.py", "data.py", "map_lod.py"} <= {path.rsplit("/", 1)[-1] for path in inputs}
+
+    copies = []
+    for i, path in enumerate(inputs):
+        copy = tmp_path / f"{i}-{path.rsplit('/', 1)[-1]}"
+        copy.write_bytes(open(path, "rb").read())
+        copies.append(str(copy))
+    monkeypatch.setattr(widget, "_renderer_inputs", lambda: tuple(copies))
+    widget.renderer_version.cache_clear()
+    try:
+        before = widget.renderer_version()
+        data_copy = next(copy for copy in copies if copy.endswith("data.py"))
+        with open(data_copy, "a") as f:
+            f.write("\n# renamed a country\n")
+        widget.renderer_version.cache_clear()
+        assert widget.renderer_version() != before
+    finally:
+        widget.renderer_version.cache_clear()
@@ -0,0 +1,54 @@
+import utils
+
+
+def count_resolver_calls(monkeypatch):
+    calls = []
+    original = utils.get_resolver().resolve
+
+    def resolve(location):
+        calls.append(location)
+        return original(location)
+
+    monkeypatch.setattr(utils.get_resolver(), "resolve", resolve)
+    return calls
+
+
+def test_resolve_many_dedupes_and_counts(isolated_cache, monkeypatch):
+    calls = count_resolver_calls(monkeypatch)
+
+    codes, stats = utils.resolve_many(["Berlin, Germany", "India", " berlin, germany", None, "", "india"])
+    assert codes == ["de", "in", "de", None, None, "in"]
+    assert stats == {"total": 6, "distinct": 3, "hits": 0, "misses": 3}
+    assert sorted(calls) == ["", "berlin, germany", "india"]
+
+    codes, stats = utils.resolve_many(["India", "Kenya"])
+    assert codes == ["in", "ke"]
+    assert stats == {"total": 2, "distinct": 2, "hits": 1, "misses": 1}
+
+
+def test_resolutions_are_persisted_with_version(isolated_cache, monkeypatch):
+    utils.resolve_many(["Tokyo, Japan", "Unknown Place"])
+    assert utils.resolution_store["tokyo, japan"] == {"v": utils.get_resolver().version, "code": "jp"}
+    assert utils.resolution_store["unknown place"]["code"] is None
+
+    # A cold start (empty memory tier) is served from the store...
+    monkeypatch.setattr(utils, "resolved_locations", utils.LRUCache(100))
+    calls = count_resolver_calls(monkeypatch)
+    codes, stats = utils.resolve_many(["Tokyo, Japan"])
+    assert codes == ["jp"] and stats["hits"] == 1 and calls == []
+
+    # ...unless the resolver rules changed since the row was written
+    utils.resolution_store["tokyo, japan"] = {"v": "stale", "code": "xx"}
+    monkeypatch.setattr(utils, "resolved_locations", utils.LRUCache(100))
+    assert utils.resolve_country_code("Tokyo, Japan") == "jp"
+    assert calls == ["tokyo, japan"]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = utils.LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", None)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b", "missing") == "missing"
+    assert cache.to_dict() == {"a": 1, "c": 3}
@@ -0,0 +1,46 @@
+import random
+
+from resolver import CountryResolver
+from utils import COUNTRY_MAP, LOCATION_BLOCKLIST
+
+
+def linear_substring(text):
+    """The original substring pass: first table key contained in *text*."""
+    for key, code in COUNTRY_MAP:
+        if key in text:
+            return code
+    return None
+
+
+def test_exact_match_keeps_table_priority():
+    resolver = CountryResolver([("valencia", "es"), ("valencia", "ve")])
+    assert resolver.resolve("Valencia") == "es"
+
+
+def test_substring_prefers_earlier_key():
+    resolver = CountryResolver([("new york", "us"), ("york", "gb")])
+    assert resolver.match_substring("downtown new york city") == "us"
+    assert resolver.match_substring("yorkshire") == "gb"
+    assert resolver.match_substring("nowhere") is None
+
+
+def test_blocklist():
+    resolver = CountryResolver(COUNTRY_MAP, LOCATION_BLOCKLIST)
+    assert resolver.resolve("Remote") is None
+    assert resolver.resolve("") is None
+    assert resolver.resolve(None) is None
+
+
+def test_automaton_matches_linear_scan():
+    resolver = CountryResolver(COUNTRY_MAP, LOCATION_BLOCKLIST)
+    keys = [key for key, _ in COUNTRY_MAP]
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz ,.-éü"
+    for _ in range(5000):
+        words = [
+            rng.choice(keys) if rng.random() < 0.3
+            else "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8)))
+            for _ in range(rng.randint(1, 4))
+        ]
+        text = " ".join(words)
+        assert resolver.match_substring(text) == linear_substring(text), text
@@ -0,0 +1,115 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import timing
+import utils
+import widget
+from fake_github import FakeGitHub
+
+URL = "/api/heatmap?repo=acme/widgets&variant=map"
+
+
+@pytest.fixture(autouse=True)
+def server_timing(monkeypatch):
+    monkeypatch.setattr(widget, "SERVER_TIMING", True)
+
+
+def _metrics(header):
+    """``{name: params}`` of a Server-Timing header value."""
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+def test_collector_sums_stages_and_counts_across_threads():
+    with timing.collect() as timings:
+        with timing.stage("work"):
+            pass
+        with timing.stage("work"):
+            pass
+
+        def hit(_):
+            timing.count("hits")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(timing.propagate(hit), range(20)))
+        # Unwrapped work in other threads reports nowhere
+        thread = threading.Thread(target=hit, args=(0,))
+        thread.start()
+        thread.join()
+
+    assert timings.counters == {"hits": 20}
+    assert list(timings.stages) == ["work"]
+    metrics = _metrics(timings.server_timing())
+    assert metrics["hits"] == {"desc": "20"}
+    assert float(metrics["work"]["dur"]) >= 0
+
+
+def test_no_collector_is_a_no_op():
+    with timing.stage("work"):
+        timing.count("hits")
+    assert timing.propagate(len) is len
+
+
+def test_heatmap_reports_stages_and_render_cache(client, fake_contributors):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+
+    first = _metrics(client.get(URL).headers["Server-Timing"])
+    second = _metrics(client.get(URL).headers["Server-Timing"])
+
+    for stage in ("total", "counts", "resolve", "render", "serialize"):
+        assert "dur" in first[stage], stage
+    assert first["render-miss"] == {"desc": "1"}
+    assert first["resolve-miss"] == {"desc": "1"}
+    assert "render" not in second and second["render-hit"] == {"desc": "1"}
+    assert second["resolve-hit"] == {"desc": "1"}
+
+
+def test_heatmap_counts_github_calls_from_worker_threads(client, isolated_cache, github_client, use_fake_github,
+                                                         monkeypatch):
+    monkeypatch.setattr(widget, "rendered_svgs", utils.LRUCache(16))
+    repos = {"acme/widgets": [(f"u{i}", "Oslo, Norway") for i in range(5)]}
+    with use_fake_github(FakeGitHub(repos)) as fake:
+        response = client.get(URL)
+        cold = _metrics(response.headers["Server-Timing"])
+        assert cold["github"] == {"desc": str(len(fake.requests))}
+        assert "dur" in cold["crawl"]
+
+        warm = _metrics(client.get(URL).headers["Server-Timing"])
+    assert "github" not in warm and "crawl" not in warm
+    assert response.headers["X-Cache-Status"] == utils.CACHE_MISS
+
+
+def test_aggregate_counts_github_calls_from_repo_crawls(client, isolated_cache, github_client, use_fake_github,
+                                                       monkeypatch):
+    monkeypatch.setattr(widget, "rendered_svgs", utils.LRUCache(16))
+    repos = {"acme/widgets": [("ana", "Oslo, Norway")], "acme/gadgets": [("bo", "Lima, Peru")]}
+    with use_fake_github(FakeGitHub(repos)) as fake:
+        response = client.get("/api/heatmap/aggregate?repos=acme/widgets,acme/gadgets&variant=map")
+        metrics = _metrics(response.headers["Server-Timing"])
+        assert metrics["github"] == {"desc": str(len(fake.requests))}
+    assert "dur" in metrics["crawl"]
+
+
+def test_timings_are_logged_as_json(client, fake_contributors, caplog):
+    fake_contributors["acme/widgets"] = [{"login": "a", "location": "Berlin"}]
+    with caplog.at_level(logging.INFO, logger="widget"):
+        client.get(URL)
+    record = next(r for r in caplog.records if r.getMessage().startswith("heatmap timings "))
+    logged = json.loads(record.getMessage().split(" ", 2)[2])
+    assert logged["target"] == "acme/widgets"
+    assert logged["status"] == 200
+    assert logged["counts"]["render-miss"] == 1
+    assert set(logged["stages_ms"]) >= {"total", "counts", "render"}
+
+
+def test_server_timing_can_be_disabled(client, fake_contributors, monkeypatch, caplog):
+    monkeypatch.setattr(widget, "SERVER_TIMING", False)
+    with caplog.at_level(logging.INFO, logger="widget"):
+        assert "Server-Timing" not in client.get(URL).headers
+    assert not any(r.getMessage().startswith("heatmap timings ") for r in caplog.records)
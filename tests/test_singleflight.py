@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+from github_client import GitHubError
+from singleflight import SingleFlight, file_lock
+
+USERS = [(f"user{i}", "Berlin, Germany") for i in range(5)]
+
+
+pytestmark = pytest.mark.usefixtures("github_client")
+
+
+def run_concurrently(n, fn):
+    """Call *fn* from *n* threads released together; return results or errors."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_cold_requests_crawl_once(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS}, latency=0.05)) as fake:
+        results = run_concurrently(10, lambda: utils.get_all_contributors("acme/widgets"))
+        assert fake.count("/repos/acme/widgets/contributors") == 1
+        assert fake.count("/users/") == len(USERS)
+    assert all(r == results[0] for r in results)
+    assert len(results[0]) == len(USERS)
+
+
+def test_concurrent_forced_refreshes_crawl_once(isolated_cache, use_fake_github, monkeypatch):
+    monkeypatch.setattr(utils, "REFRESH_COOLDOWN_SECONDS", 0)
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS}, latency=0.05)) as fake:
+        utils.get_all_contributors("acme/widgets")
+        run_concurrently(10, lambda: utils.get_all_contributors("acme/widgets", force_refresh=True))
+        assert fake.count("/repos/acme/widgets/contributors") == 2
+
+
+def test_followers_share_the_leaders_error(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS}, latency=0.05)) as fake:
+        fake.fail("/repos/acme/widgets/contributors", times=1)
+        results = run_concurrently(5, lambda: utils.get_all_contributors("acme/widgets"))
+        assert all(isinstance(r, GitHubError) for r in results)
+        assert fake.count("/repos/acme/widgets/contributors") == 1
+
+        # The failed flight is not remembered
+        assert len(utils.get_all_contributors("acme/widgets")) == len(USERS)
+
+
+def test_lock_holders_reuse_a_crawl_finished_while_waiting(isolated_cache, use_fake_github):
+    # Bypass in-process coalescing: each thread stands in for a separate worker
+    requested_at = utils.time.time()
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS}, latency=0.05)) as fake:
+        results = run_concurrently(
+            4, lambda: utils._refresh_contributors("acme/widgets", requested_at, True, None)
+        )
+        assert fake.count("/repos/acme/widgets/contributors") == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_single_flight_runs_again_after_completion():
+    flights = SingleFlight()
+    calls = []
+    assert flights.run("k", lambda: calls.append(1) or len(calls)) == 1
+    assert flights.run("k", lambda: calls.append(1) or len(calls)) == 2
+    assert not flights.in_flight("k")
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    active, peak = [0], [0]
+    guard = threading.Lock()
+
+    def hold():
+        with file_lock(str(tmp_path), "acme/widgets"):
+            with guard:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            threading.Event().wait(0.01)
+            with guard:
+                active[0] -= 1
+
+    run_concurrently(6, hold)
+    assert peak[0] == 1
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+import utils
+from fake_github import FakeGitHub
+
+CONTRIBUTORS = "/repos/acme/widgets/contributors"
+USERS = [(f"user{i}", "Lima, Peru") for i in range(3)]
+
+
+pytestmark = pytest.mark.usefixtures("github_client")
+
+
+def age_entry(repo, seconds):
+    entry = utils.repo_cache[repo]
+    entry["timestamp"] = time.time() - seconds
+    utils.repo_cache[repo] = entry
+    return entry["timestamp"]
+
+
+def wait_for_refresh(repo, older_than, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if utils.repo_cache[repo]["timestamp"] > older_than and repo not in utils._scheduled_refreshes:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"{repo} was not refreshed")
+
+
+def test_expired_entry_is_served_stale_and_refreshed(isolated_cache, use_fake_github):
+    users = list(USERS)
+    with use_fake_github(FakeGitHub({"acme/widgets": users}, latency=0.2)) as fake:
+        first, status = utils.get_contributors("acme/widgets")
+        assert status == utils.CACHE_MISS
+
+        users.append(("newcomer", "Quito, Ecuador"))
+        stamp = age_entry("acme/widgets", utils.CACHE_TTL_SECONDS + 60)
+
+        start = time.perf_counter()
+        stale, status = utils.get_contributors("acme/widgets")
+        assert time.perf_counter() - start < 0.1  # did not wait for GitHub
+        assert status == utils.CACHE_STALE
+        assert stale == first
+
+        wait_for_refresh("acme/widgets", stamp)
+        fresh, status = utils.get_contributors("acme/widgets")
+        assert status == utils.CACHE_HIT
+        assert fresh[-1] == {"login": "newcomer", "location": "Quito, Ecuador"}
+        assert fake.count(CONTRIBUTORS) == 2
+
+
+def test_burst_of_stale_hits_schedules_one_refresh(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS}, latency=0.1)) as fake:
+        utils.get_contributors("acme/widgets")
+        stamp = age_entry("acme/widgets", utils.CACHE_TTL_SECONDS + 60)
+
+        statuses = {utils.get_contributors("acme/widgets")[1] for _ in range(20)}
+        assert statuses == {utils.CACHE_STALE}
+
+        wait_for_refresh("acme/widgets", stamp)
+        assert fake.count(CONTRIBUTORS) == 2
+
+
+def test_entries_past_max_staleness_block_on_a_crawl(isolated_cache, use_fake_github):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS})) as fake:
+        utils.get_contributors("acme/widgets")
+        age_entry("acme/widgets", utils.CACHE_TTL_SECONDS + utils.CACHE_MAX_STALE_SECONDS + 1)
+
+        _, status = utils.get_contributors("acme/widgets")
+        assert status == utils.CACHE_MISS
+        assert fake.count(CONTRIBUTORS) == 2
+        assert not utils._scheduled_refreshes
+
+
+def test_forced_refresh_reports_bypass(isolated_cache, use_fake_github, monkeypatch):
+    monkeypatch.setattr(utils, "REFRESH_COOLDOWN_SECONDS", 0)
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS})):
+        utils.get_contributors("acme/widgets")
+        assert utils.get_contributors("acme/widgets", force_refresh=True)[1] == utils.CACHE_BYPASS
+
+
+def test_heatmap_reports_cache_status(isolated_cache, use_fake_github, client):
+    with use_fake_github(FakeGitHub({"acme/widgets": USERS})):
+        miss = client.get("/api/heatmap?repo=acme/widgets")
+        hit = client.get("/api/heatmap?repo=acme/widgets")
+        revalidated = client.get("/api/heatmap?repo=acme/widgets", headers={"If-None-Match": hit.headers["ETag"]})
+
+    assert miss.headers["X-Cache-Status"] == "MISS"
+    assert hit.headers["X-Cache-Status"] == "HIT"
+    assert revalidated.status_code == 304
+    assert revalidated.headers["X-Cache-Status"] == "HIT"
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import snapshot
+import utils
+import widget
+from map_lod import DETAIL_LEVELS
+from resolver import CountryResolver
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+
+
+@pytest.fixture
+def snapshot_file(monkeypatch, tmp_path):
+    """Point the snapshot loader at a scratch file."""
+    path = tmp_path / "startup.snapshot"
+    monkeypatch.setattr(snapshot, "SNAPSHOT_FILE", str(path))
+    snapshot._sections.cache_clear()
+    yield path
+    snapshot._sections.cache_clear()
+
+
+def test_import_defers_heavy_work(tmp_path):
+    # Only what is deferred is checked here; how long a cold start takes is
+    # timed by the startup.* benchmarks in benchmarks/bench.py
+    code = (
+        "import sys, main, utils, widget\n"
+        "print(sorted(m for m in ('pycountry', 'requests') if m in sys.modules))\n"
+        "print(utils.get_resolver.cache_info().currsize, widget.get_map_template.cache_info().currsize)\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.path.abspath(API_DIR)}
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True).stdout.split("\n")
+    assert out[0] == "[]"
+    assert out[1] == "0 0"
+
+
+def test_committed_snapshot_is_current():
+    assert snapshot.stale_sections() == [], "run: python api/snapshot.py"
+
+
+def test_committed_snapshot_matches_compiled_objects():
+    # A mismatch under a current key means a FORMAT needs bumping
+    compiled = CountryResolver(utils.COUNTRY_MAP, utils.LOCATION_BLOCKLIST, utils.load_country_index())
+    loaded = snapshot.load("resolver", utils._resolver_snapshot_key())
+    assert loaded.version == compiled.version
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", "locations.txt"), encoding="utf-8") as f:
+        for location in f:
+            assert loaded.resolve(location.strip()) == compiled.resolve(location.strip()), location
+
+    for detail in DETAIL_LEVELS:
+        for compact in (False, True):
+            template = snapshot.load(widget._template_section(detail, compact), widget._template_snapshot_key())
+            assert vars(template) == vars(widget.MapTemplate(widget.load_map_svg(detail), compact))
+
+
+def test_stale_missing_and_corrupt_snapshots_fall_back(snapshot_file):
+    assert snapshot.load("resolver", "key") is None
+
+    snapshot_file.write_bytes(snapshot.dumps({"resolver": ("old-key", {"x": 1}), "other": ("key", [1])}))
+    snapshot._sections.cache_clear()
+    assert snapshot.load("resolver", "key") is None
+    assert snapshot.load("other", "key") == [1]
+
+    snapshot_file.write_bytes(b"not a pickle")
+    snapshot._sections.cache_clear()
+    assert snapshot.load("other", "key") is None
+
+
+def test_fingerprint_tracks_parts_and_files(tmp_path):
+    path = tmp_path / "table.txt"
+    path.write_text("a")
+    before = snapshot.fingerprint("rules", paths=[str(path)])
+    assert snapshot.fingerprint("rules", paths=[str(path)]) == before
+    assert snapshot.fingerprint("other rules", paths=[str(path)]) != before
+    path.write_text("b")
+    assert snapshot.fingerprint("rules", paths=[str(path)]) != before
@@ -0,0 +1,102 @@
+import hashlib
+import re
+
+import widget
+from render_cases import CASES, EXPECTED_DIGESTS, RENDERERS
+
+SVG = "{http://www.w3.org/2000/svg}"
+GEOMETRY_ATTRS = ("class", "fill")
+
+
+def _shape_geometry(node):
+    """Tag and every attribute except paint/class of a shape."""
+    attrs = {k: v for k, v in node.attrib.items() if k not in GEOMETRY_ATTRS}
+    return node.tag.replace(SVG, ""), tuple(sorted(attrs.items()))
+
+
+def _transforms(node):
+    """Transforms from *node* up to (not including) the layer root."""
+    chain = []
+    while node is not None and node.get("id") != "map-geometry" and node.tag != f"{SVG}svg":
+        if node.get("transform"):
+            chain.append(node.get("transform"))
+        node = node.getparent()
+    return tuple(chain)
+
+
+def _inline_fills(svg_bytes):
+    root = widget.etree.fromstring(svg_bytes)
+    layer = next(g for g in root.iter(f"{SVG}g") if g.get("class") is None and any(
+        child.get("class") == "country-fill" for child in g.iter()))
+    shapes = [node for node in layer.iter() if node.get("class") == "country-fill"]
+    return layer.get("transform"), [
+        (_shape_geometry(node), _transforms(node)[:-1], node.get("fill")) for node in shapes
+    ]
+
+
+def _symbol_fills(svg_bytes):
+    """Effective fill of every geometry shape, resolved from the generated stylesheet."""
+    root = widget.etree.fromstring(svg_bytes)
+    geometry = next(node for node in root.iter() if node.get("id") == "map-geometry")
+    style = next(node.text for node in root.iter(f"{SVG}style") if ".map-fills" in node.text)
+    rules = dict(re.findall(r"\.c-([a-z]{2})\{fill:var\(--([a-z]{2})\)\}", style))
+    block = re.search(r"\.map-fills\{fill:([^;]+);(.*)\}", style)
+    empty_fill, variables = block.group(1), dict(re.findall(r"--([a-z]{2}):([^;]+);", block.group(2)))
+
+    fills = []
+    for node in geometry.iter():
+        if node.tag.replace(SVG, "") not in widget._SHAPE_TAGS:
+            continue
+        code = (node.get("class") or "")[2:]
+        fill = variables.get(rules[code], empty_fill) if code in rules else empty_fill
+        fills.append((_shape_geometry(node), _transforms(node), fill))
+    return fills
+
+
+def test_symbols_fill_every_shape_like_inline():
+    for name, counts in CASES.items():
+        for theme in ("light", "dark"):
+            for variant, render in RENDERERS.items():
+                inline_transform, inline = _inline_fills(render(counts, theme, mode="inline"))
+                symbols = render(counts, theme, mode="symbols")
+
+                assert _symbol_fills(symbols) == inline, f"{name}-{variant}-{theme}"
+                uses = re.findall(rb'<use href="#map-geometry" transform="([^"]+)" class="([^"]+)"/>', symbols)
+                assert uses == [
+                    (inline_transform.encode(), b"country-fill map-fills"),
+                    (inline_transform.encode(), b"country-outline"),
+                ]
+
+
+def test_symbols_define_geometry_once():
+    counts = CASES["many"]
+    inline = widget.render_map_only(counts, mode="inline")
+    symbols = widget.render_map_only(counts, mode="symbols")
+
+    assert symbols.count(b'id="map-geometry"') == 1
+    assert symbols.count(b"<path") * 2 == inline.count(b"<path")
+    assert len(symbols) < len(inline) * 0.6
+
+
+def test_symbols_outline_opacity_applies_per_stroke():
+    symbols = widget.render_map_only({}, "light", mode="symbols")
+    inline = widget.render_map_only({}, "light", mode="inline")
+
+    assert b"stroke-opacity: 0.8;" in symbols
+    assert b"stroke-opacity" not in inline
+
+
+def test_inline_mode_is_default_and_unchanged(monkeypatch):
+    monkeypatch.setattr(widget, "MAP_RENDER_MODE", "inline")
+    for name, counts in CASES.items():
+        for variant, render in RENDERERS.items():
+            key = f"{name}-{variant}-light"
+            assert hashlib.sha256(render(counts)).hexdigest() == EXPECTED_DIGESTS[key]
+
+
+def test_render_digest_depends_on_mode(monkeypatch):
+    counts = CASES["mixed"]
+    monkeypatch.setattr(widget, "MAP_RENDER_MODE", "inline")
+    inline = widget.render_digest("map", "light", counts)
+    monkeypatch.setattr(widget, "MAP_RENDER_MODE", "symbols")
+    assert widget.render_digest("map", "light", counts) != inline